@@ -16,6 +16,7 @@ class CommentInline(admin.TabularInline):
 class ModuleVideoInline(admin.TabularInline):
     model = ModuleVideo
     extra = 0
+    exclude = ('pathway',)
     ordering = ('order',)
 
 class ModuleQuestionInline(admin.TabularInline):
@@ -38,8 +39,8 @@ class PathwayModuleAdmin(admin.ModelAdmin):
 
 @admin.register(ModuleVideo)
 class ModuleVideoAdmin(admin.ModelAdmin):
-    list_display = ('module', 'title', 'order')
-    search_fields = ('title', 'module__title')
+    list_display = ('module', 'title', 'youtube_id', 'order')
+    search_fields = ('title', 'youtube_id', 'module__title')
 
 @admin.register(ModuleQuestion)
 class ModuleQuestionAdmin(admin.ModelAdmin):
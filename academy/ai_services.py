@@ -1,9 +1,12 @@
 import os
+import re
 import json
 import logging
-import requests
+from datetime import timedelta
 from googleapiclient.discovery import build
 
+from core.llm import get_llm_provider
+
 logger = logging.getLogger(__name__)
 
 def fetch_multiple_youtube_videos(search_query, num_videos=5, used_ids=None):
@@ -45,6 +48,56 @@ def fetch_multiple_youtube_videos(search_query, num_videos=5, used_ids=None):
     return videos
 
 
+YOUTUBE_VIDEOS_BATCH_SIZE = 50  # videos.list accepts at most 50 IDs per request
+
+ISO_DURATION_RE = re.compile(r'P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?')
+
+
+def parse_iso_duration(value):
+    """Convert a YouTube ISO 8601 duration such as 'PT1H2M3S' to a timedelta."""
+    match = ISO_DURATION_RE.fullmatch(value or '')
+    if not match or not any(match.groups()):
+        return None
+    days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return timedelta(days=days, hours=hours, minutes=minutes, seconds=seconds)
+
+
+def fetch_youtube_video_details(video_ids):
+    """
+    Fetch duration, thumbnails and embeddability for a list of video IDs.
+    Returns a dict keyed by video ID; IDs YouTube no longer returns are omitted.
+    """
+    api_key = os.getenv('YOUTUBE_API_KEY')
+    if not api_key or not video_ids:
+        return {}
+
+    details = {}
+    youtube = build('youtube', 'v3', developerKey=api_key)
+    for start in range(0, len(video_ids), YOUTUBE_VIDEOS_BATCH_SIZE):
+        batch = video_ids[start:start + YOUTUBE_VIDEOS_BATCH_SIZE]
+        try:
+            response = youtube.videos().list(
+                part="contentDetails,snippet,status",
+                id=",".join(batch),
+                maxResults=YOUTUBE_VIDEOS_BATCH_SIZE
+            ).execute()
+        except Exception as e:
+            logger.error(f"YouTube API Error fetching video details: {e}")
+            continue
+
+        for item in response.get('items', []):
+            thumbnails = item.get('snippet', {}).get('thumbnails', {})
+            high = thumbnails.get('high') or thumbnails.get('medium') or thumbnails.get('default') or {}
+            medium = thumbnails.get('medium') or thumbnails.get('default') or {}
+            details[item['id']] = {
+                'duration': parse_iso_duration(item.get('contentDetails', {}).get('duration')),
+                'thumbnail_url': high.get('url', ''),
+                'thumbnail_medium_url': medium.get('url', ''),
+                'embeddable': item.get('status', {}).get('embeddable', True),
+            }
+    return details
+
+
 def fetch_youtube_video(search_query, used_ids):
     """Legacy function - fetch single video."""
     videos = fetch_multiple_youtube_videos(search_query, num_videos=1, used_ids=used_ids)
@@ -56,9 +109,6 @@ def fetch_youtube_video(search_query, used_ids):
 def generate_module_content(module_title, previous_module_title=None, video_titles=None):
     """Generate module content with references to YouTube videos."""
     try:
-        gemini_api_key = os.getenv('GEMINI_API_KEY')
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={gemini_api_key}"
-        
         context_prompt = f"The student is learning about '{module_title}'."
         if previous_module_title:
             context_prompt = f"The student just finished a module on '{previous_module_title}' and is now starting a new module on '{module_title}'."
@@ -83,13 +133,7 @@ def generate_module_content(module_title, previous_module_title=None, video_titl
         Make the lesson comprehensive (500-800 words) but easy to understand.
         """
         
-        payload = {"contents": [{"parts": [{"text": prompt}]}]}
-        headers = {'Content-Type': 'application/json'}
-        response = requests.post(url, headers=headers, json=payload, timeout=90)
-        response.raise_for_status()
-        result_json = response.json()
-        
-        return result_json['candidates'][0]['content']['parts'][0]['text']
+        return get_llm_provider().generate(prompt, task='module_content', timeout=90)
         
     except Exception as e:
         logger.error(f"Error generating lesson content for '{module_title}': {e}")
@@ -99,9 +143,6 @@ def generate_module_content(module_title, previous_module_title=None, video_titl
 def answer_module_question(question, module_title, module_content=None):
     """Generate AI answer to a student's question about a module."""
     try:
-        gemini_api_key = os.getenv('GEMINI_API_KEY')
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={gemini_api_key}"
-        
         context = f"The student is studying '{module_title}'."
         if module_content:
             context += f"\n\nModule content:\n{module_content[:1000]}"
@@ -122,13 +163,7 @@ def answer_module_question(question, module_title, module_content=None):
         Be supportive and motivating in your response.
         """
         
-        payload = {"contents": [{"parts": [{"text": prompt}]}]}
-        headers = {'Content-Type': 'application/json'}
-        response = requests.post(url, headers=headers, json=payload, timeout=60)
-        response.raise_for_status()
-        result_json = response.json()
-        
-        return result_json['candidates'][0]['content']['parts'][0]['text']
+        return get_llm_provider().generate(prompt, task='module_answer', timeout=60)
         
     except Exception as e:
         logger.error(f"Error generating answer: {e}")
@@ -138,9 +173,6 @@ def answer_module_question(question, module_title, module_content=None):
 def generate_pathway_outline(goal, location, category=None):
     """Generate a comprehensive 6-module pathway for artisan business development."""
     try:
-        gemini_api_key = os.getenv('GEMINI_API_KEY')
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={gemini_api_key}"
-        
         goal_descriptions = {
             'start_small_business': 'starting a small business from scratch',
             'grow_existing_business': 'growing an existing business',
@@ -192,15 +224,9 @@ def generate_pathway_outline(goal, location, category=None):
         }}
         """
         
-        payload = {
-            "contents": [{"parts": [{"text": prompt}]}],
-            "generation_config": {"response_mime_type": "application/json"}
-        }
-        headers = {'Content-Type': 'application/json'}
-        response = requests.post(url, headers=headers, json=payload, timeout=60)
-        response.raise_for_status()
-        result_json = response.json()
-        json_response_text = result_json['candidates'][0]['content']['parts'][0]['text']
+        json_response_text = get_llm_provider().generate(
+            prompt, task='pathway_outline', json_output=True, timeout=60
+        )
         pathway_data = json.loads(json_response_text)
         return pathway_data
     except Exception as e:
@@ -211,9 +237,6 @@ def generate_pathway_outline(goal, location, category=None):
 def generate_module_quiz(module_title, module_content):
     """Generate a multiple choice quiz question for the module."""
     try:
-        gemini_api_key = os.getenv('GEMINI_API_KEY')
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={gemini_api_key}"
-        
         prompt = f"""
         You are an educational content creator designing a multiple choice quiz.
         
@@ -239,16 +262,9 @@ def generate_module_quiz(module_title, module_content):
         }}
         """
         
-        payload = {
-            "contents": [{"parts": [{"text": prompt}]}],
-            "generation_config": {"response_mime_type": "application/json"}
-        }
-        headers = {'Content-Type': 'application/json'}
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        result_json = response.json()
-        
-        quiz_text = result_json['candidates'][0]['content']['parts'][0]['text']
+        quiz_text = get_llm_provider().generate(
+            prompt, task='module_quiz', json_output=True, timeout=30
+        )
         quiz_data = json.loads(quiz_text)
         
         return quiz_data
@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import LearningPathway
+
+CATALOGUE_VERSION_KEY = 'academy:catalogue:version'
+CATALOGUE_PAGE_TIMEOUT = 60 * 5
+PATHWAY_PAGE_TIMEOUT = 60 * 60 * 24
+
+
+def _get_version(key):
+    return cache.get_or_set(key, 1, timeout=None)
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+
+
+def catalogue_first_page_key(category_slug=None):
+    """Cache key for the first page of the public pathway catalogue."""
+    version = _get_version(CATALOGUE_VERSION_KEY)
+    return f'academy:catalogue:v{version}:{category_slug or "all"}'
+
+
+def invalidate_catalogue():
+    """Orphan every cached catalogue page by bumping the version."""
+    _bump_version(CATALOGUE_VERSION_KEY)
+
+
+def get_pathway_version(pathway_id):
+    """
+    Content version of a pathway's public page: its updated_at, which every
+    module, video and comment change moves forward. None if there is no such
+    pathway. Read from the database, so all workers agree on it.
+    """
+    return LearningPathway.objects.filter(pk=pathway_id).values_list('updated_at', flat=True).first()
+
+
+def bump_pathway_version(pathway_id):
+    """Orphan the cached public page of a pathway."""
+    LearningPathway.objects.filter(pk=pathway_id).update(updated_at=timezone.now())
+
+
+def pathway_version_tag(version):
+    return int(version.timestamp() * 1_000_000)
+
+
+def pathway_page_key(pathway_id, version, language):
+    """Cache key for the anonymous rendering of a public pathway page."""
+    return f'academy:pathway:{pathway_id}:page:{pathway_version_tag(version)}:{language}'
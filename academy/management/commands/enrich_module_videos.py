@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from academy.ai_services import YOUTUBE_VIDEOS_BATCH_SIZE, fetch_youtube_video_details
+from academy.caching import bump_pathway_version
+from academy.models import ModuleVideo
+
+
+class Command(BaseCommand):
+    help = 'Store duration, thumbnails and embeddability for module videos (50 IDs per YouTube request)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--refresh', action='store_true', help='Re-fetch videos that already have metadata')
+        parser.add_argument('--limit', type=int, default=None, help='Maximum number of videos to process')
+
+    def handle(self, *args, **options):
+        videos = ModuleVideo.objects.exclude(youtube_id='').order_by('pk')
+        if not options['refresh']:
+            videos = videos.filter(metadata_fetched_at__isnull=True)
+        if options['limit']:
+            videos = videos[:options['limit']]
+
+        fields = ['duration', 'thumbnail_url', 'thumbnail_medium_url', 'embeddable', 'metadata_fetched_at']
+        batch = []
+        count = 0
+        for video in videos.only('pk', 'youtube_id', 'pathway_id').iterator(chunk_size=YOUTUBE_VIDEOS_BATCH_SIZE):
+            batch.append(video)
+            if len(batch) == YOUTUBE_VIDEOS_BATCH_SIZE:
+                count += self.enrich(batch, fields)
+                batch = []
+        if batch:
+            count += self.enrich(batch, fields)
+
+        self.stdout.write(self.style.SUCCESS(f'Enriched {count} module videos'))
+
+    def enrich(self, videos, fields):
+        details = fetch_youtube_video_details(list({video.youtube_id for video in videos}))
+        if not details:
+            # API key missing or request failed; leave these for the next run
+            return 0
+
+        now = timezone.now()
+        for video in videos:
+            info = details.get(video.youtube_id)
+            if info:
+                for field, value in info.items():
+                    setattr(video, field, value)
+            else:
+                # Removed or private videos are no longer returned by the API
+                video.embeddable = False
+            video.metadata_fetched_at = now
+        ModuleVideo.objects.bulk_update(videos, fields)
+        # bulk_update skips signals, so refresh the public pages here
+        for pathway_id in {video.pathway_id for video in videos if video.pathway_id}:
+            bump_pathway_version(pathway_id)
+        return len(videos)
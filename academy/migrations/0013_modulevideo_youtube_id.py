@@ -0,0 +1,55 @@
+# Generated manually to index video identity per pathway
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+YOUTUBE_ID_RE = re.compile(
+    r'(https?://)?(www\.)?'
+    r'(youtube|youtu|youtube-nocookie)\.(com|be)/'
+    r'(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
+)
+
+
+def backfill_youtube_ids(apps, schema_editor):
+    """Populate pathway and youtube_id; later duplicates within a pathway keep a blank id."""
+    ModuleVideo = apps.get_model('academy', 'ModuleVideo')
+    seen = set()
+    batch = []
+    videos = ModuleVideo.objects.select_related('module').order_by('module__pathway_id', 'module__order', 'order', 'pk')
+    for video in videos.iterator(chunk_size=2000):
+        video.pathway_id = video.module.pathway_id
+        match = YOUTUBE_ID_RE.search(video.video_url or '')
+        youtube_id = match.group(6) if match else ''
+        if youtube_id and (video.pathway_id, youtube_id) not in seen:
+            seen.add((video.pathway_id, youtube_id))
+            video.youtube_id = youtube_id
+        batch.append(video)
+        if len(batch) >= 2000:
+            ModuleVideo.objects.bulk_update(batch, ['pathway', 'youtube_id'])
+            batch = []
+    if batch:
+        ModuleVideo.objects.bulk_update(batch, ['pathway', 'youtube_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academy', '0012_modulequiz'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modulevideo',
+            name='pathway',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='videos', to='academy.learningpathway'),
+        ),
+        migrations.AddField(
+            model_name='modulevideo',
+            name='youtube_id',
+            field=models.CharField(blank=True, max_length=11, verbose_name='YouTube ID'),
+        ),
+        migrations.RunPython(backfill_youtube_ids, migrations.RunPython.noop),
+    ]
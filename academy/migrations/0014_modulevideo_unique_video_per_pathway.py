@@ -0,0 +1,18 @@
+# Generated manually; kept separate from the backfill so PostgreSQL does not
+# alter the table while deferred FK trigger events are pending.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academy', '0013_modulevideo_youtube_id'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='modulevideo',
+            constraint=models.UniqueConstraint(condition=models.Q(('youtube_id', ''), _negated=True), fields=('pathway', 'youtube_id'), name='unique_video_per_pathway'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academy', '0014_modulevideo_unique_video_per_pathway'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modulevideo',
+            name='duration',
+            field=models.DurationField(blank=True, null=True, verbose_name='Duration'),
+        ),
+        migrations.AddField(
+            model_name='modulevideo',
+            name='embeddable',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='modulevideo',
+            name='metadata_fetched_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='modulevideo',
+            name='thumbnail_medium_url',
+            field=models.URLField(blank=True, verbose_name='Medium Thumbnail URL'),
+        ),
+        migrations.AddField(
+            model_name='modulevideo',
+            name='thumbnail_url',
+            field=models.URLField(blank=True, verbose_name='Thumbnail URL'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academy', '0015_modulevideo_metadata'),
+        ('marketplace', '0007_alter_booking_options_alter_service_options'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='learningpathway',
+            index=models.Index(fields=['-created_at', '-id'], name='academy_lea_created_362854_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='learningpathway',
+            index=models.Index(fields=['category', '-created_at', '-id'], name='academy_lea_categor_992141_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academy', '0017_learningpathway_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='learningpathway',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
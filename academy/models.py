@@ -4,14 +4,24 @@ from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
 from django.urls import reverse
 
+from .youtube import get_yt_id
+
 class LearningPathway(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='learning_pathways')
     category = models.ForeignKey('marketplace.Category', on_delete=models.SET_NULL, null=True, blank=True, related_name='academy_pathways')
     goal = models.CharField(max_length=255)
     location = models.CharField(max_length=100, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also moved forward by academy.caching.bump_pathway_version when modules, videos or comments change
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     slug = models.SlugField(max_length=255, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['category', '-created_at', '-id']),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.goal)
@@ -46,13 +56,50 @@ class PathwayModule(models.Model):
 
 class ModuleVideo(models.Model):
     module = models.ForeignKey(PathwayModule, on_delete=models.CASCADE, related_name='videos')
+    # Denormalized from module.pathway so a video can only appear once per pathway
+    pathway = models.ForeignKey(LearningPathway, on_delete=models.CASCADE, related_name='videos', null=True, blank=True)
     title = models.CharField(_("Video Title"), max_length=255)
     video_url = models.URLField(_("Video URL"))
+    youtube_id = models.CharField(_("YouTube ID"), max_length=11, blank=True)
     order = models.PositiveIntegerField(default=0)
     description = models.TextField(_("Video Description"), blank=True)
     
+    # Filled in by the enrich_module_videos command from YouTube videos.list
+    duration = models.DurationField(_("Duration"), null=True, blank=True)
+    thumbnail_url = models.URLField(_("Thumbnail URL"), blank=True)
+    thumbnail_medium_url = models.URLField(_("Medium Thumbnail URL"), blank=True)
+    embeddable = models.BooleanField(default=True)
+    metadata_fetched_at = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         ordering = ['order']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['pathway', 'youtube_id'],
+                condition=~models.Q(youtube_id=''),
+                name='unique_video_per_pathway',
+            ),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so save() re-derives youtube_id when the URL is edited
+        if 'video_url' in field_names:
+            instance._loaded_video_url = instance.video_url
+        return instance
+
+    def save(self, *args, **kwargs):
+        url_changed = 'video_url' in self.__dict__ and self.video_url != getattr(self, '_loaded_video_url', self.video_url)
+        if not self.youtube_id or url_changed:
+            self.youtube_id = get_yt_id(self.video_url)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'video_url' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'youtube_id'}
+        if not self.pathway_id:
+            self.pathway_id = self.module.pathway_id
+        super().save(*args, **kwargs)
+        self._loaded_video_url = self.video_url
     
     def __str__(self):
         return f"{self.module.title} - Video {self.order + 1}"
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import bump_pathway_version, invalidate_catalogue
+from .models import Comment, LearningPathway, ModuleVideo, PathwayModule
+
+
+@receiver(post_save, sender=LearningPathway)
+@receiver(post_delete, sender=LearningPathway)
+def invalidate_pathway_catalogue(sender, instance, **kwargs):
+    """Drop the cached catalogue first pages when pathways are added or removed"""
+    # The pathway's own page version is its updated_at, already moved by the save
+    invalidate_catalogue()
+
+
+@receiver(post_save, sender=PathwayModule)
+@receiver(post_delete, sender=PathwayModule)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_public_pathway_page(sender, instance, **kwargs):
+    """Bump the public page version when a module or comment changes"""
+    bump_pathway_version(instance.pathway_id)
+
+
+@receiver(post_save, sender=ModuleVideo)
+@receiver(post_delete, sender=ModuleVideo)
+def invalidate_public_pathway_page_for_video(sender, instance, **kwargs):
+    """Bump the public page version when a video changes"""
+    bump_pathway_version(instance.pathway_id or instance.module.pathway_id)
@@ -1,7 +1,8 @@
 from django import template
 from django.utils.safestring import mark_safe
 import markdown
-import re
+
+from academy.youtube import get_yt_id
 
 register = template.Library()
 
@@ -13,19 +14,30 @@ def markdownify(text):
     html = markdown.markdown(text, extensions=['tables'])
     return mark_safe(html)
 
-@register.filter(name='get_yt_id')
-def get_yt_id(url):
+register.filter(name='get_yt_id')(get_yt_id)
+
+@register.filter(name='get_yt_thumbnail')
+def get_yt_thumbnail(url, quality='hqdefault'):
+    """
+    Companion to get_yt_id: returns the static i.ytimg.com thumbnail for a
+    YouTube URL, used by the click-to-load video facade.
+    """
+    video_id = get_yt_id(url)
+    if not video_id:
+        return ""
+    return f"https://i.ytimg.com/vi/{video_id}/{quality}.jpg"
+
+
+@register.filter(name='yt_duration')
+def yt_duration(value):
     """
-    Extracts the YouTube video ID from various URL formats using regex.
+    Formats a timedelta as m:ss, or h:mm:ss for videos over an hour.
     """
-    if not isinstance(url, str):
+    if not value:
         return ""
-    # --- THIS IS THE FIX: Using a raw string (r'...') to avoid warnings ---
-    youtube_regex = (
-        r'(https?://)?(www\.)?'
-        r'(youtube|youtu|youtube-nocookie)\.(com|be)/'
-        r'(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})')
-    match = re.search(youtube_regex, url)
-    if match:
-        return match.group(6)
-    return ""
\ No newline at end of file
+    total_seconds = int(value.total_seconds())
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
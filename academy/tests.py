@@ -1,3 +1,188 @@
+import importlib
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError
 from django.test import TestCase
+from django.urls import reverse
+
+from core.testing import without_static_manifest
+from marketplace.models import Category
+
+from .models import LearningPathway, ModuleVideo, PathwayModule
+
+
+@without_static_manifest
+class PathwayCatalogueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('learner', password='x')
+        cls.category = Category.objects.create(name='Tailoring', slug='tailoring')
+        cls.pathways = [
+            LearningPathway.objects.create(user=cls.user, goal=f'Goal {i}', category=cls.category if i % 2 else None)
+            for i in range(45)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pages_cover_every_pathway_once(self):
+        url, seen = reverse('academy:pathway-list'), []
+        response = self.client.get(url)
+        while True:
+            seen.extend(p.pk for p in response.context['pathways'])
+            cursor = response.context['next_cursor']
+            if not cursor:
+                break
+            response = self.client.get(url, {'before': cursor})
+        expected = [p.pk for p in sorted(self.pathways, key=lambda p: (p.created_at, p.pk), reverse=True)]
+        self.assertEqual(seen, expected)
+
+    def test_category_filter(self):
+        response = self.client.get(reverse('academy:pathway-list'), {'category': 'tailoring'})
+        self.assertEqual(response.context['active_category'], 'tailoring')
+        self.assertTrue(all(p.category_id == self.category.pk for p in response.context['pathways']))
+
+    def test_unknown_category_is_the_full_catalogue(self):
+        response = self.client.get(reverse('academy:pathway-list'), {'category': 'no-such-category'})
+        self.assertIsNone(response.context['active_category'])
+        self.assertEqual(len(response.context['pathways']), 20)
+
+    def test_malformed_cursor_starts_from_the_newest(self):
+        response = self.client.get(reverse('academy:pathway-list'), {'before': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['pathways']), 20)
+
+
+@without_static_manifest
+class PublicPathwayPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.pathway = LearningPathway.objects.create(user=User.objects.create_user('author'), goal='Learn welding')
+        self.url = self.pathway.get_public_url()
+
+    def test_etag_follows_content_and_is_private(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('private', first['Cache-Control'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        PathwayModule.objects.create(pathway=self.pathway, title='Safety first')
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertContains(second, 'Safety first')
+
+    def test_unknown_pathway_is_404(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('academy:public-pathway-detail', kwargs={'pk': 999999, 'slug': 'x'}))
+        self.assertEqual(response.status_code, 404)
+
+
+@mock.patch.dict('os.environ', {'YOUTUBE_API_KEY': 'test-key'})
+@mock.patch('academy.ai_services.build')
+class EnrichModuleVideosTests(TestCase):
+    def setUp(self):
+        self.pathway = LearningPathway.objects.create(user=User.objects.create_user('author'), goal='Learn welding')
+        module = PathwayModule.objects.create(pathway=self.pathway, title='Safety first')
+        self.live, self.removed = (
+            ModuleVideo.objects.create(module=module, title=title, video_url=f'https://www.youtube.com/watch?v={video_id}')
+            for title, video_id in (('Live', 'aaaaaaaaaaa'), ('Removed', 'bbbbbbbbbbb'))
+        )
+
+    def enrich(self):
+        out = StringIO()
+        call_command('enrich_module_videos', stdout=out)
+        return out.getvalue()
+
+    def test_metadata_is_stored_and_missing_videos_are_marked(self, build):
+        build.return_value.videos.return_value.list.return_value.execute.return_value = {'items': [{
+            'id': 'aaaaaaaaaaa',
+            'contentDetails': {'duration': 'PT4M13S'},
+            'snippet': {'thumbnails': {'high': {'url': 'https://i.ytimg.com/hq.jpg'}, 'medium': {'url': 'https://i.ytimg.com/mq.jpg'}}},
+            'status': {'embeddable': True},
+        }]}
+        LearningPathway.objects.filter(pk=self.pathway.pk).update(updated_at=self.pathway.created_at)
+
+        self.assertIn('Enriched 2 module videos', self.enrich())
+        self.live.refresh_from_db()
+        self.removed.refresh_from_db()
+        self.assertEqual(
+            (self.live.duration, self.live.thumbnail_url, self.live.thumbnail_medium_url, self.live.embeddable),
+            (timedelta(minutes=4, seconds=13), 'https://i.ytimg.com/hq.jpg', 'https://i.ytimg.com/mq.jpg', True),
+        )
+        self.assertFalse(self.removed.embeddable)
+        self.assertIsNotNone(self.removed.metadata_fetched_at)
+        # The cached public page is orphaned
+        self.assertGreater(LearningPathway.objects.get(pk=self.pathway.pk).updated_at, self.pathway.created_at)
+
+        # Enriched videos are not fetched again
+        self.assertIn('Enriched 0 module videos', self.enrich())
+        self.assertEqual(build.return_value.videos.return_value.list.call_count, 1)
+
+    def test_failed_request_leaves_videos_for_the_next_run(self, build):
+        build.return_value.videos.return_value.list.return_value.execute.side_effect = Exception('quota exceeded')
+
+        with self.assertLogs('academy.ai_services', 'ERROR'):
+            self.assertIn('Enriched 0 module videos', self.enrich())
+        self.assertFalse(ModuleVideo.objects.filter(metadata_fetched_at__isnull=False).exists())
+        self.assertTrue(ModuleVideo.objects.get(pk=self.removed.pk).embeddable)
+
+
+class ModuleVideoIdentityTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('author')
+        self.module = PathwayModule.objects.create(
+            pathway=LearningPathway.objects.create(user=user, goal='Learn welding'), title='Safety first',
+        )
+        self.other_module = PathwayModule.objects.create(
+            pathway=LearningPathway.objects.create(user=user, goal='Learn tailoring'), title='Measuring',
+        )
+
+    def video(self, module, video_id, **kwargs):
+        return ModuleVideo.objects.create(
+            module=module, title=video_id, video_url=f'https://youtu.be/{video_id}', **kwargs,
+        )
+
+    def test_youtube_id_follows_the_url(self):
+        video = self.video(self.module, 'aaaaaaaaaaa')
+        self.assertEqual((video.youtube_id, video.pathway_id), ('aaaaaaaaaaa', self.module.pathway_id))
+
+        video = ModuleVideo.objects.get(pk=video.pk)
+        video.video_url = 'https://www.youtube.com/watch?v=bbbbbbbbbbb'
+        video.save(update_fields=['video_url'])
+        self.assertEqual(ModuleVideo.objects.get(pk=video.pk).youtube_id, 'bbbbbbbbbbb')
+
+        video.title = 'Renamed'
+        video.save()
+        self.assertEqual(ModuleVideo.objects.get(pk=video.pk).youtube_id, 'bbbbbbbbbbb')
+
+    def test_a_video_appears_once_per_pathway(self):
+        self.video(self.module, 'aaaaaaaaaaa')
+        self.video(self.other_module, 'aaaaaaaaaaa')
+        ModuleVideo.objects.create(module=self.module, title='Not YouTube', video_url='https://vimeo.com/1')
+        ModuleVideo.objects.create(module=self.module, title='Not YouTube', video_url='https://vimeo.com/2')
+
+        with self.assertRaises(IntegrityError):
+            self.video(self.module, 'aaaaaaaaaaa')
+
+    def test_backfill_keeps_the_first_copy_of_a_duplicate(self):
+        migration = importlib.import_module('academy.migrations.0013_modulevideo_youtube_id')
+        # bulk_create skips save(), leaving the rows as they were before the migration
+        first, duplicate, other = ModuleVideo.objects.bulk_create([
+            ModuleVideo(module=self.module, title='First', video_url='https://youtu.be/aaaaaaaaaaa', order=0),
+            ModuleVideo(module=self.module, title='Again', video_url='https://www.youtube.com/embed/aaaaaaaaaaa', order=1),
+            ModuleVideo(module=self.other_module, title='Other', video_url='https://youtu.be/aaaaaaaaaaa', order=0),
+        ])
 
-# Create your tests here.
+        migration.backfill_youtube_ids(apps, None)
+        rows = {row['pk']: row for row in ModuleVideo.objects.values('pk', 'pathway_id', 'youtube_id')}
+        self.assertEqual(rows[first.pk], {'pk': first.pk, 'pathway_id': self.module.pathway_id, 'youtube_id': 'aaaaaaaaaaa'})
+        self.assertEqual(rows[duplicate.pk]['youtube_id'], '')
+        self.assertEqual(rows[duplicate.pk]['pathway_id'], self.module.pathway_id)
+        self.assertEqual(rows[other.pk]['youtube_id'], 'aaaaaaaaaaa')
@@ -1,5 +1,6 @@
 import base64
 import logging
+import re
 from pathlib import Path
 from datetime import date
 
@@ -9,7 +10,13 @@ logger = logging.getLogger(__name__)
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.cache import cache
+from django.db.models import Count, Q
 from django.http import HttpResponse, Http404
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.utils.translation import get_language
 from django.shortcuts import render, redirect, get_object_or_404
 from django.template.loader import render_to_string
 from django.urls import reverse_lazy
@@ -38,6 +45,17 @@ from .models import (
     UserBadge,
     Comment,
 )
+from .caching import (
+    CATALOGUE_PAGE_TIMEOUT,
+    PATHWAY_PAGE_TIMEOUT,
+    catalogue_first_page_key,
+    get_pathway_version,
+    pathway_page_key,
+    pathway_version_tag,
+)
+from core.pagination import decode_cursor, encode_cursor
+from marketplace.models import Category
+from notifications.grouping import notify
 from notifications.models import Notification  # Added import
 
 
@@ -49,15 +67,63 @@ class AcademyHomeView(generic.TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["recent_pathways"] = LearningPathway.objects.all().order_by("-created_at")[:5]
+        context["recent_pathways"] = (
+            LearningPathway.objects.select_related("user")
+            .only("id", "goal", "slug", "created_at", "user__id", "user__username")
+            .annotate(module_count=Count("modules"))
+            .order_by("-created_at")[:5]
+        )
         return context
 
 
+CSRF_INPUT_RE = re.compile(r'name="csrfmiddlewaretoken" value="[^"]*"')
+
+
 class PublicPathwayDetailView(generic.DetailView):
+    """
+    SEO landing page for a pathway. Anonymous renders are cached per content
+    version (updated_at, moved forward by academy.signals) and served with
+    ETag/Last-Modified so browsers and crawlers can revalidate with a 304.
+    """
     model = LearningPathway
     template_name = "academy/public_pathway_detail.html"
     context_object_name = "pathway"
 
+    def get_queryset(self):
+        return LearningPathway.objects.select_related("user").prefetch_related("modules__videos")
+
+    def get(self, request, *args, **kwargs):
+        # Logged-in users and pending flash messages get a personalised render
+        if request.user.is_authenticated or len(messages.get_messages(request)):
+            return super().get(request, *args, **kwargs)
+
+        pk = kwargs["pk"]
+        version = get_pathway_version(pk)
+        if version is None:
+            raise Http404
+        last_modified = int(version.timestamp())
+        etag = f'"pathway-{pk}-{pathway_version_tag(version)}-{get_language()}"'
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+        if response is None:
+            cache_key = pathway_page_key(pk, version, get_language())
+            content = cache.get(cache_key)
+            if content is None:
+                response = super().get(request, *args, **kwargs)
+                response.render()
+                cache.set(cache_key, response.content.decode(), PATHWAY_PAGE_TIMEOUT)
+            else:
+                # The cached page carries another visitor's CSRF token
+                token = get_token(request)
+                content = CSRF_INPUT_RE.sub(f'name="csrfmiddlewaretoken" value="{token}"', content)
+                response = HttpResponse(content)
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        # private: the page carries this visitor's CSRF token, so shared caches must not keep it
+        patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+        return response
+
 
 class AcademyDashboardView(LoginRequiredMixin, generic.TemplateView):
     template_name = "academy/dashboard.html"
@@ -84,10 +150,59 @@ class AcademyDashboardView(LoginRequiredMixin, generic.TemplateView):
 
 
 class PathwayListView(generic.ListView):
+    """
+    Public catalogue with keyset pagination on (created_at, pk), so deep
+    pages cost the same as the first one. The first page of each category
+    is cached until a pathway is created or deleted.
+    """
     model = LearningPathway
     template_name = "academy/pathway_list.html"
     context_object_name = "pathways"
-    queryset = LearningPathway.objects.all().order_by("-created_at")
+    page_size = 20
+
+    def get_queryset(self):
+        queryset = (
+            LearningPathway.objects.select_related("user")
+            .only("id", "goal", "slug", "created_at", "category_id", "user__id", "user__username")
+            .order_by("-created_at", "-pk")
+        )
+        if self.category_slug:
+            queryset = queryset.filter(category__slug=self.category_slug)
+
+        cursor = decode_cursor(self.request.GET.get("before", ""))
+        if cursor:
+            created_at, pk = cursor
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+        return queryset
+
+    def get_page(self):
+        """Fetch one extra row to know whether an older page exists."""
+        rows = list(self.get_queryset()[:self.page_size + 1])
+        return rows[:self.page_size], len(rows) > self.page_size
+
+    def get(self, request, *args, **kwargs):
+        categories = list(Category.objects.only("name", "slug").order_by("name"))
+        # Unknown slugs fall back to the full catalogue, so cache keys stay one per real category
+        category_slug = request.GET.get("category")
+        self.category_slug = category_slug if category_slug in {c.slug for c in categories} else None
+
+        if "before" in request.GET:
+            pathways, has_next = self.get_page()
+        else:
+            cache_key = catalogue_first_page_key(self.category_slug)
+            page = cache.get(cache_key)
+            if page is None:
+                page = self.get_page()
+                cache.set(cache_key, page, CATALOGUE_PAGE_TIMEOUT)
+            pathways, has_next = page
+
+        self.object_list = pathways
+        context = self.get_context_data(
+            active_category=self.category_slug,
+            categories=categories,
+            next_cursor=encode_cursor(pathways[-1]) if has_next else None,
+        )
+        return self.render_to_response(context)
 
 
 # -------------------------------
@@ -179,11 +294,9 @@ class PathwayDetailView(LoginRequiredMixin, generic.DetailView):
                 pathway.modules.filter(order__lt=unlocked_module.order).order_by("-order").first()
             )
             
-            used_video_ids = set()
-            for module in pathway.modules.all():
-                for video in module.videos.all():
-                    if "v=" in video.video_url:
-                        used_video_ids.add(video.video_url.split("v=")[-1])
+            used_video_ids = set(
+                ModuleVideo.objects.filter(pathway=pathway).exclude(youtube_id='').values_list('youtube_id', flat=True)
+            )
             
             try:
                 videos = fetch_multiple_youtube_videos(
@@ -203,14 +316,20 @@ class PathwayDetailView(LoginRequiredMixin, generic.DetailView):
                     unlocked_module.video_url = videos[0]['url']
                     unlocked_module.save()
                     
-                    for idx, video in enumerate(videos):
-                        ModuleVideo.objects.create(
+                    # unique_video_per_pathway rejects any video already used in this pathway.
+                    # bulk_create skips ModuleVideo.save(), so youtube_id is set here.
+                    ModuleVideo.objects.bulk_create([
+                        ModuleVideo(
                             module=unlocked_module,
+                            pathway=pathway,
                             title=video['title'],
                             video_url=video['url'],
+                            youtube_id=video['video_id'],
                             description=video['description'],
                             order=idx
                         )
+                        for idx, video in enumerate(videos)
+                    ], ignore_conflicts=True)
             except Exception as e:
                 logger.error(f"Error generating content/videos: {e}")
                 module_content = unlocked_module.written_content or "Content could not be generated. Please refresh the page."
@@ -255,10 +374,12 @@ class PathwayDetailView(LoginRequiredMixin, generic.DetailView):
 
             # --- CREATE NOTIFICATION ---
             if pathway.user != request.user:
-                Notification.objects.create(
+                notify(
                     recipient=pathway.user,
                     message=_(f"{request.user.username} commented on your pathway: '{pathway.goal}'"),
-                    link=pathway.get_absolute_url()
+                    link=pathway.get_absolute_url(),
+                    verb=Notification.Verb.COMMENT,
+                    target=pathway,
                 )
 
             messages.success(request, _("Your comment has been posted."))
@@ -0,0 +1,18 @@
+"""
+YouTube URL helpers shared by the academy models and templates.
+"""
+import re
+
+YOUTUBE_ID_RE = re.compile(
+    r'(https?://)?(www\.)?'
+    r'(youtube|youtu|youtube-nocookie)\.(com|be)/'
+    r'(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
+)
+
+
+def get_yt_id(url):
+    """The 11-character video ID of a YouTube URL, or '' if it is not one."""
+    if not isinstance(url, str):
+        return ""
+    match = YOUTUBE_ID_RE.search(url)
+    return match.group(6) if match else ""
@@ -33,7 +33,7 @@ class Post(models.Model):
 
     class Meta:
         ordering = ['-publish']
-        indexes = [models.Index(fields=['-publish'])]
+        indexes = [models.Index(fields=['-publish']), models.Index(fields=['updated'])]
 
     def save(self, *args, **kwargs):
         if not self.slug: self.slug = slugify(self.title)
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core.support_router import invalidate_support_index
+
+from .models import Post
+
+
+@receiver(post_init, sender=Post)
+def remember_status(sender, instance, **kwargs):
+    # None when status was deferred; treated as possibly published below
+    instance._original_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def refresh_support_index(sender, instance, **kwargs):
+    # Only published posts are in the support chat's help index, so drafts never touch it
+    was_published = instance._original_status in (None, Post.Status.PUBLISHED)
+    if instance.status == Post.Status.PUBLISHED or (was_published and not kwargs.get('created')):
+        invalidate_support_index()
+    instance._original_status = instance.status
@@ -7,8 +7,9 @@ from django.utils.translation import gettext_lazy as _
 
 from .models import Post, Comment
 from .forms import PostForm, CommentForm
+from notifications.grouping import notify
 from notifications.models import Notification
-from core.indexnow import submit_to_indexnow
+from core.indexnow import enqueue_indexnow
 
 
 class PostListView(generic.ListView):
@@ -57,10 +58,12 @@ class PostDetailView(generic.DetailView):
 
             # --- CREATE NOTIFICATION ---
             if post.author != request.user:
-                Notification.objects.create(
+                notify(
                     recipient=post.author,
                     message=_(f"{request.user.username} commented on your post: '{post.title}'"),
-                    link=post.get_absolute_url()
+                    link=post.get_absolute_url(),
+                    verb=Notification.Verb.COMMENT,
+                    target=post,
                 )
 
             messages.success(request, _("Your comment has been added."))
@@ -86,7 +89,7 @@ class PostCreateView(LoginRequiredMixin, UserPassesTestMixin, generic.CreateView
         
         if form.instance.status == Post.Status.PUBLISHED:
             try:
-                submit_to_indexnow(form.instance.get_absolute_url())
+                enqueue_indexnow(form.instance.get_absolute_url())
             except Exception:
                 pass
         
@@ -110,7 +113,7 @@ class PostUpdateView(LoginRequiredMixin, UserPassesTestMixin, generic.UpdateView
         
         if form.instance.status == Post.Status.PUBLISHED:
             try:
-                submit_to_indexnow(form.instance.get_absolute_url())
+                enqueue_indexnow(form.instance.get_absolute_url())
             except Exception:
                 pass
         
@@ -3,9 +3,10 @@ from django.contrib import messages
 from django.utils import timezone
 from django.urls import reverse
 from django.utils.html import format_html
-from .models import SEOSettings, IndexNowSubmission, SupportTicket
-from .indexnow import submit_to_indexnow, ping_search_engines
-from django.contrib.sites.models import Site
+from .models import SEOSettings, IndexNowSubmission, IndexNowQueueItem, SupportTicket, ChatConversation, ChatMessage, PlatformStatsSnapshot, OutboundEmail
+from .change_tracker import queue_changed_urls
+from .indexnow import enqueue_indexnow, ping_search_engines
+from .platform_stats import refresh_platform_stats
 
 
 @admin.register(SEOSettings)
@@ -13,15 +14,15 @@ class SEOSettingsAdmin(admin.ModelAdmin):
     list_display = ['id', 'auto_submit_to_indexnow', 'last_sitemap_ping', 'last_indexnow_submission']
     fieldsets = (
         ('IndexNow Settings', {
-            'fields': ('auto_submit_to_indexnow', 'indexnow_key', 'last_indexnow_submission')
+            'fields': ('auto_submit_to_indexnow', 'indexnow_key', 'last_indexnow_submission', 'indexnow_watermark')
         }),
         ('Sitemap Settings', {
             'fields': ('last_sitemap_ping',)
         }),
     )
-    readonly_fields = ('last_sitemap_ping', 'last_indexnow_submission')
+    readonly_fields = ('last_sitemap_ping', 'last_indexnow_submission', 'indexnow_watermark')
     
-    actions = ['ping_sitemap_to_search_engines', 'submit_all_urls_to_indexnow']
+    actions = ['ping_sitemap_to_search_engines', 'queue_changed_urls_for_indexnow']
     
     def has_add_permission(self, request):
         if SEOSettings.objects.exists():
@@ -42,23 +43,13 @@ class SEOSettingsAdmin(admin.ModelAdmin):
         except Exception as e:
             self.message_user(request, f"Error pinging sitemap: {e}", messages.ERROR)
     
-    @admin.action(description='Submit sitemap URLs to IndexNow')
-    def submit_all_urls_to_indexnow(self, request, queryset):
+    @admin.action(description='Queue URLs changed since the last submission for IndexNow')
+    def queue_changed_urls_for_indexnow(self, request, queryset):
         try:
-            site = Site.objects.get_current()
-            sitemap_url = f"/sitemap.xml"
-            success = submit_to_indexnow([sitemap_url])
-            
-            for obj in queryset:
-                obj.last_indexnow_submission = timezone.now()
-                obj.save()
-            
-            if success:
-                self.message_user(request, "Successfully submitted URLs to IndexNow!", messages.SUCCESS)
-            else:
-                self.message_user(request, "IndexNow submission completed with some errors. Check logs.", messages.WARNING)
+            count = queue_changed_urls()
+            self.message_user(request, f"Queued {count} changed URLs. The IndexNow worker will submit them shortly.", messages.SUCCESS)
         except Exception as e:
-            self.message_user(request, f"Error submitting to IndexNow: {e}", messages.ERROR)
+            self.message_user(request, f"Error queueing changed URLs: {e}", messages.ERROR)
 
 
 @admin.register(IndexNowSubmission)
@@ -85,15 +76,22 @@ class IndexNowSubmissionAdmin(admin.ModelAdmin):
         failed = queryset.filter(success=False)
         urls = [obj.url for obj in failed]
         if urls:
-            success = submit_to_indexnow(urls)
-            if success:
-                self.message_user(request, f"Retried {len(urls)} failed submissions", messages.SUCCESS)
-            else:
-                self.message_user(request, "Retry completed with errors", messages.WARNING)
+            enqueue_indexnow(urls)
+            self.message_user(request, f"Queued {len(urls)} failed submissions for retry", messages.SUCCESS)
         else:
             self.message_user(request, "No failed submissions to retry", messages.INFO)
 
 
+@admin.register(IndexNowQueueItem)
+class IndexNowQueueItemAdmin(admin.ModelAdmin):
+    list_display = ['url', 'queued_at', 'next_attempt_at', 'attempts']
+    search_fields = ['url']
+    readonly_fields = ['url', 'queued_at', 'next_attempt_at', 'attempts']
+    
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(SupportTicket)
 class SupportTicketAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'email', 'category', 'subject', 'status', 'created_at']
@@ -118,3 +116,54 @@ class SupportTicketAdmin(admin.ModelAdmin):
         }),
     )
 
+
+class ChatMessageInline(admin.TabularInline):
+    model = ChatMessage
+    extra = 0
+    readonly_fields = ['role', 'content', 'summarized', 'answered_locally', 'created_at']
+    can_delete = False
+
+
+@admin.register(ChatConversation)
+class ChatConversationAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'created_at', 'updated_at']
+    search_fields = ['user__username', 'summary']
+    readonly_fields = ['user', 'summary', 'created_at', 'updated_at']
+    inlines = [ChatMessageInline]
+
+
+@admin.register(PlatformStatsSnapshot)
+class PlatformStatsSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['total_users', 'total_artisans', 'total_services', 'total_pathways', 'categories', 'refreshed_at', 'updated_at']
+    readonly_fields = ['total_users', 'total_artisans', 'total_services', 'total_pathways', 'categories', 'refreshed_at', 'updated_at']
+    actions = ['recount']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    @admin.action(description='Recount all statistics now')
+    def recount(self, request, queryset):
+        refresh_platform_stats()
+        self.message_user(request, 'Platform stats recounted.', messages.SUCCESS)
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'recipients', 'status', 'attempts', 'created_at', 'sent_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['subject', 'to']
+    readonly_fields = ['subject', 'body', 'html_body', 'from_email', 'to', 'status', 'attempts', 'next_attempt_at', 'last_error', 'created_at', 'sent_at']
+    actions = ['retry_now']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def recipients(self, obj):
+        return ', '.join(obj.to)
+    
+    @admin.action(description='Retry selected unsent emails now')
+    def retry_now(self, request, queryset):
+        count = queryset.exclude(status=OutboundEmail.Status.SENT).update(
+            status=OutboundEmail.Status.PENDING, attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"Queued {count} emails for another attempt.", messages.SUCCESS)
@@ -1,4 +1,3 @@
-import google.generativeai as genai
 from django.conf import settings
 from django.contrib.auth.models import User
 from marketplace.models import Service, Booking, Category
@@ -7,13 +6,19 @@ from users.models import Profile
 from django.utils import timezone
 from datetime import timedelta
 import json
-
-# Configure Gemini AI
-genai.configure(api_key=settings.GEMINI_API_KEY)
+from .chat_memory import build_history, estimate_tokens, fit_to_tokens
+from .help_content import TASK_GUIDES
+from .llm import get_llm_provider
+from .platform_stats import get_platform_stats
 
 class AICustomerService:
     def __init__(self):
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        self.model_name = settings.GEMINI_CHAT_MODEL
+    
+    @property
+    def provider(self):
+        # Resolved per call so every request shares the process-level client registry
+        return get_llm_provider()
         
     def get_system_context(self, user=None):
         """Get context about the platform and user for better AI responses"""
@@ -57,99 +62,83 @@ class AICustomerService:
                 
         return context
     
-    def get_chat_response(self, user_message, user=None, conversation_history=None):
+    CHAT_GENERATION_CONFIG = {
+        "temperature": 0.7,
+        "max_output_tokens": 1000,
+    }
+    
+    def build_chat_prompt(self, user_message, user=None, conversation_history=None, conversation=None, grounding=None):
+        """
+        Assemble system context, help snippets, conversation memory and the
+        new message into one prompt of at most AI_CHAT_PROMPT_TOKENS. The new
+        message is kept whole; each earlier part is cut to what is left.
+        """
+        user_line = f"User: {user_message}"
+        budget = settings.AI_CHAT_PROMPT_TOKENS - estimate_tokens(user_line)
+        
+        system_context = fit_to_tokens(self.get_system_context(user), min(settings.AI_CHAT_SYSTEM_TOKENS, budget))
+        messages = [system_context]
+        budget -= estimate_tokens(system_context)
+        
+        if grounding:
+            help_block = fit_to_tokens(
+                "Relevant Kiri.ng help articles (prefer these over guessing):\n"
+                + "\n".join(f"- {snippet}" for snippet in grounding),
+                budget,
+            )
+            if help_block:
+                messages.append(help_block)
+                budget -= estimate_tokens(help_block)
+        
+        if conversation is not None:
+            # Server-side memory, trimmed to what is left of the prompt budget
+            messages.extend(build_history(conversation, budget))
+        elif conversation_history:
+            recent = []
+            for line in reversed(conversation_history):
+                if estimate_tokens(line) > budget:
+                    break
+                recent.append(line)
+                budget -= estimate_tokens(line)
+            messages.extend(recent[::-1])
+        
+        messages.append(user_line)
+        return "\n".join(messages)
+    
+    def get_chat_response(self, user_message, user=None, conversation_history=None, conversation=None, grounding=None):
         """Get AI response to user query"""
         try:
-            # Build conversation with context
-            system_context = self.get_system_context(user)
-            
-            # Prepare messages
-            messages = [system_context]
-            
-            if conversation_history:
-                messages.extend(conversation_history)
-            
-            messages.append(f"User: {user_message}")
+            prompt = self.build_chat_prompt(user_message, user, conversation_history, conversation, grounding)
             
             # Generate response
-            response = self.model.generate_content(
-                "\n".join(messages),
-                generation_config={
-                    "temperature": 0.7,
-                    "max_output_tokens": 1000,
-                }
+            return self.provider.generate(
+                prompt,
+                task='chat',
+                model=self.model_name,
+                generation_config=self.CHAT_GENERATION_CONFIG
             )
-            
-            return response.text
         except Exception as e:
             return f"I apologize, but I'm having trouble processing your request. Please try again or contact support at nwokikeonyeka@gmail.com. Error: {str(e)}"
     
+    def stream_chat_response(self, user_message, user=None, conversation=None, grounding=None):
+        """Yield the AI response in chunks as the model produces them"""
+        prompt = self.build_chat_prompt(user_message, user, conversation=conversation, grounding=grounding)
+        return self.provider.stream(
+            prompt,
+            task='chat',
+            model=self.model_name,
+            generation_config=self.CHAT_GENERATION_CONFIG
+        )
+    
     def help_with_task(self, task_type, user=None):
         """Provide specific help for common tasks"""
-        task_guides = {
-            "find_service": """
-            To find an artisan service:
-            1. Go to the Services tab at the bottom
-            2. Browse by category or use the search
-            3. Click on a service to see details
-            4. Click "Book This Service" to make a booking request
-            5. The artisan will contact you via your provided email/phone
-            """,
-            
-            "create_pathway": """
-            To create a learning pathway:
-            1. Go to Academy > My Dashboard
-            2. Click "Create New Pathway" (or "Get Started Now" if first time)
-            3. Enter your business goal or skill you want to learn
-            4. Our AI will generate a personalized learning pathway
-            5. Complete modules to track your progress
-            6. Earn a certificate when you finish!
-            """,
-            
-            "list_service": """
-            To list your service as an artisan:
-            1. Make sure you're verified (complete your profile with location)
-            2. Go to Services > My Services (if verified artisan)
-            3. Click "Add New Service"
-            4. Fill in service details, price, and upload images
-            5. Submit and your service will be live!
-            """,
-            
-            "refer_friend": """
-            To refer friends and earn benefits:
-            1. Go to Academy > My Dashboard
-            2. Click "Generate Referral URL"
-            3. Copy your unique referral link
-            4. Share it with friends
-            5. When they sign up, you both benefit!
-            6. Get 1 referral to unlock creating additional learning pathways
-            """,
-            
-            "edit_profile": """
-            To edit your profile:
-            1. Click your profile picture (top right)
-            2. Select "Edit Profile"
-            3. Update your information, bio, social media links
-            4. Upload a profile picture
-            5. Add certificates to showcase your skills
-            6. Save changes
-            """
-        }
-        
-        return task_guides.get(task_type, "Please specify what you need help with and I'll guide you through it.")
+        return TASK_GUIDES.get(task_type, "Please specify what you need help with and I'll guide you through it.")
     
     def get_platform_stats(self):
         """Get platform statistics for informational responses"""
         try:
-            stats = {
-                "total_services": Service.objects.count(),
-                "total_artisans": Profile.objects.filter(is_verified_artisan=True).count(),
-                "total_pathways": LearningPathway.objects.count(),
-                "total_users": User.objects.count(),
-                "categories": Category.objects.count(),
-            }
-            return stats
-        except:
+            return get_platform_stats()
+        except Exception:
             return {}
     
     def admin_query(self, query, user):
@@ -176,8 +165,7 @@ class AICustomerService:
             stats = self.get_platform_stats()
             context += f"\n\nCurrent Platform Stats: {stats}"
             
-            response = self.model.generate_content(context)
-            return response.text
+            return self.provider.generate(context, task='admin', model=self.model_name)
         except Exception as e:
             return f"Error processing admin query: {str(e)}"
     
@@ -185,19 +173,21 @@ class AICustomerService:
         """Create a support ticket for issues AI cannot handle and send email notifications"""
         try:
             from .models import SupportTicket
-            from django.core.mail import send_mail
+            from django.db import transaction
+            from .outbox import queue_email
             from notifications.models import Notification
             
-            ticket = SupportTicket.objects.create(
-                user=user if user and user.is_authenticated else None,
-                email=email,
-                category=category,
-                subject=subject,
-                description=description
-            )
+            # The ticket and its emails commit together; the outbox worker sends them
+            with transaction.atomic():
+                ticket = SupportTicket.objects.create(
+                    user=user if user and user.is_authenticated else None,
+                    email=email,
+                    category=category,
+                    subject=subject,
+                    description=description
+                )
             
-            try:
-                send_mail(
+                queue_email(
                     subject=f'Support Ticket #{ticket.pk} Created - {subject}',
                     message=f'''Hello,
 
@@ -219,10 +209,9 @@ Best regards,
 The Kiri.ng Team''',
                     from_email=settings.DEFAULT_FROM_EMAIL,
                     recipient_list=[email],
-                    fail_silently=False,
                 )
                 
-                send_mail(
+                queue_email(
                     subject=f'New Support Ticket #{ticket.pk} - Action Required',
                     message=f'''New support ticket created:
 
@@ -238,7 +227,6 @@ Description:
 Please review and respond within 24-48 hours.''',
                     from_email=settings.DEFAULT_FROM_EMAIL,
                     recipient_list=[settings.DEFAULT_FROM_EMAIL],
-                    fail_silently=False,
                 )
                 
                 if user and user.is_authenticated:
@@ -247,8 +235,6 @@ Please review and respond within 24-48 hours.''',
                         message=f'Your support ticket #{ticket.pk} has been created. We will contact you at {email} within 24-48 hours.',
                         link=None
                     )
-            except Exception as email_error:
-                pass
             
             return {
                 'success': True,
@@ -314,3 +300,14 @@ Please review and respond within 24-48 hours.''',
             return [{'id': s.id, 'title': s.title, 'artisan': s.artisan.username, 'price': str(s.price)} for s in services]
         except:
             return []
+
+
+_ai_service = None
+
+
+def get_ai_service():
+    """Return the shared AICustomerService (it holds no per-request state)."""
+    global _ai_service
+    if _ai_service is None:
+        _ai_service = AICustomerService()
+    return _ai_service
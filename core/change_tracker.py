@@ -0,0 +1,98 @@
+"""
+Finds public URLs whose content changed since the last IndexNow hand-off.
+
+Each source compares its modification timestamp with the watermark stored
+on SEOSettings, so a run only reads the rows that changed and its cost
+scales with change volume rather than catalogue size.
+"""
+import logging
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from .indexnow import enqueue_indexnow
+from .models import SEOSettings
+
+logger = logging.getLogger(__name__)
+
+# Re-read a little before the watermark so rows from transactions that
+# committed after a run started are not missed; the queue drops duplicates.
+WATERMARK_OVERLAP = timedelta(minutes=1)
+ENQUEUE_CHUNK_SIZE = 1000
+
+
+def _changed_posts(since, until):
+    from blog.models import Post
+
+    posts = Post.objects.filter(status=Post.Status.PUBLISHED, updated__lte=until)
+    if since:
+        posts = posts.filter(updated__gt=since)
+    for post in posts.only('slug', 'publish').iterator(chunk_size=ENQUEUE_CHUNK_SIZE):
+        yield post.get_absolute_url()
+
+
+def _changed_services(since, until):
+    from marketplace.models import Service
+
+    # Service has no active flag of its own; a deactivated artisan's services are not announced
+    services = Service.objects.filter(artisan__is_active=True, updated_at__lte=until)
+    if since:
+        services = services.filter(updated_at__gt=since)
+    for pk in services.values_list('pk', flat=True).iterator(chunk_size=ENQUEUE_CHUNK_SIZE):
+        yield reverse('marketplace:service-detail', kwargs={'pk': pk})
+
+
+def _changed_pathways(since, until):
+    from academy.models import LearningPathway
+
+    pathways = LearningPathway.objects.filter(updated_at__lte=until)
+    if since:
+        pathways = pathways.filter(updated_at__gt=since)
+    for pk, slug in pathways.values_list('pk', 'slug').iterator(chunk_size=ENQUEUE_CHUNK_SIZE):
+        yield reverse('academy:public-pathway-detail', kwargs={'pk': pk, 'slug': slug})
+
+
+def _changed_artisans(since, until):
+    users = User.objects.filter(is_active=True, profile__is_verified_artisan=True, profile__updated_at__lte=until)
+    if since:
+        users = users.filter(profile__updated_at__gt=since)
+    for username in users.values_list('username', flat=True).iterator(chunk_size=ENQUEUE_CHUNK_SIZE):
+        yield reverse('users:artisan-storefront', kwargs={'username': username})
+
+
+CHANGE_SOURCES = [_changed_posts, _changed_services, _changed_pathways, _changed_artisans]
+
+
+def iter_changed_urls(since, until):
+    """Yield relative URLs of public pages changed in (since, until]; since=None means everything."""
+    for source in CHANGE_SOURCES:
+        yield from source(since, until)
+
+
+def queue_changed_urls(full=False):
+    """
+    Queue every URL changed since the stored watermark for IndexNow, then
+    advance the watermark. The queue retries failed submissions itself, so
+    handing a URL to it counts as submitted. Returns the number of URLs queued.
+    """
+    seo_settings, _ = SEOSettings.objects.get_or_create(id=1)
+    until = timezone.now()
+    since = None if full or not seo_settings.indexnow_watermark else seo_settings.indexnow_watermark - WATERMARK_OVERLAP
+
+    count = 0
+    chunk = []
+    for url in iter_changed_urls(since, until):
+        chunk.append(url)
+        if len(chunk) == ENQUEUE_CHUNK_SIZE:
+            enqueue_indexnow(chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        enqueue_indexnow(chunk)
+        count += len(chunk)
+
+    SEOSettings.objects.filter(pk=seo_settings.pk).update(indexnow_watermark=until)
+    logger.info(f"Queued {count} changed URLs for IndexNow (since {since or 'the beginning'})")
+    return count
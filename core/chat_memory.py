@@ -0,0 +1,159 @@
+"""
+Server-side conversation memory for the Kiri AI support chat.
+
+The client only sends the new message and a conversation id. Every part of
+the prompt is cut to fit a fixed token budget, so prompt size stays bounded
+however long the conversation runs. Older turns are folded into a rolling
+summary by `manage.py compact_chat_conversations`, outside the request.
+"""
+import logging
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .llm import get_llm_provider
+from .models import ChatConversation, ChatMessage
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (about 4 characters per token for English text)."""
+    return len(text or '') // 4 + 1
+
+
+def fit_to_tokens(text, tokens):
+    """Cut text so that estimate_tokens() of the result is at most `tokens` ('' if nothing fits)."""
+    if tokens <= 0:
+        return ''
+    return text if estimate_tokens(text) <= tokens else text[:(tokens - 1) * 4]
+
+
+def get_conversation(conversation_id, user=None):
+    """Return the caller's conversation, or start a new one if the id is unknown."""
+    owner = user if user and user.is_authenticated else None
+    try:
+        conversation = ChatConversation.objects.get(pk=uuid.UUID(str(conversation_id)))
+        if conversation.user_id == (owner.pk if owner else None):
+            return conversation
+    except (ValueError, ChatConversation.DoesNotExist):
+        pass
+    return ChatConversation.objects.create(user=owner)
+
+
+def build_history(conversation, budget_tokens):
+    """
+    Return prompt lines for the conversation: the rolling summary followed by
+    as many of the most recent verbatim turns as fit in budget_tokens.
+    """
+    lines = []
+    if conversation.summary:
+        summary_line = fit_to_tokens(f"Summary of earlier conversation: {conversation.summary}", budget_tokens)
+        if summary_line:
+            lines.append(summary_line)
+            budget_tokens -= estimate_tokens(summary_line)
+
+    recent = []
+    messages = conversation.messages.filter(summarized=False).order_by('-created_at', '-id')
+    for message in messages[:settings.AI_CHAT_MAX_RECENT_MESSAGES]:
+        line = f"{'User' if message.role == ChatMessage.Role.USER else 'AI'}: {message.content}"
+        cost = estimate_tokens(line)
+        if cost > budget_tokens:
+            break
+        recent.append(line)
+        budget_tokens -= cost
+
+    return lines + recent[::-1]
+
+
+def record_turn(conversation, user_message, reply, answered_locally=False):
+    """Store one user/assistant exchange."""
+    ChatMessage.objects.bulk_create([
+        ChatMessage(conversation=conversation, role=ChatMessage.Role.USER, content=user_message),
+        ChatMessage(
+            conversation=conversation,
+            role=ChatMessage.Role.ASSISTANT,
+            content=reply,
+            answered_locally=answered_locally,
+        ),
+    ])
+    ChatConversation.objects.filter(pk=conversation.pk).update(
+        updated_at=timezone.now(),
+        pending_tokens=F('pending_tokens') + estimate_tokens(user_message) + estimate_tokens(reply),
+        pending_messages=F('pending_messages') + 2,
+    )
+
+
+def compact_conversation(conversation, provider):
+    """
+    Fold all but the most recent turns into the rolling summary once the
+    verbatim history grows past AI_CHAT_HISTORY_TOKENS. Runs in the
+    compaction worker; no lock is held during the model call, and the fold
+    is dropped if another worker folded the same turns first. Returns True
+    if the summary was updated.
+    """
+    pending = list(conversation.messages.filter(summarized=False).order_by('created_at', 'id'))
+    pending_tokens = sum(estimate_tokens(m.content) for m in pending)
+    keep = settings.AI_CHAT_KEEP_RECENT_MESSAGES
+    to_fold = pending[:-keep] if keep else pending
+    if pending_tokens <= settings.AI_CHAT_HISTORY_TOKENS or not to_fold:
+        ChatConversation.objects.filter(pk=conversation.pk).update(
+            pending_tokens=pending_tokens, pending_messages=len(pending),
+        )
+        return False
+
+    transcript = "\n".join(
+        f"{'User' if m.role == ChatMessage.Role.USER else 'AI'}: {m.content}" for m in to_fold
+    )
+    max_chars = settings.AI_CHAT_SUMMARY_TOKENS * 4
+    prompt = f"""
+    Update the running summary of a customer support chat on Kiri.ng.
+    Keep the user's goals, account details they mentioned, answers already given and any unresolved issues.
+    Write at most {settings.AI_CHAT_SUMMARY_TOKENS // 2} words.
+    
+    Current summary: {conversation.summary or "None"}
+    
+    New turns:
+    {transcript}
+    """
+    try:
+        summary = provider.generate(prompt, task='summary', model=settings.GEMINI_CHAT_MODEL, timeout=30)
+    except Exception as e:
+        logger.error(f"Error summarizing conversation {conversation.pk}: {e}")
+        # Fall back to keeping the tail of the transcript so the budget still holds
+        summary = f"{conversation.summary}\n{transcript}"[-max_chars:]
+
+    folded_tokens = sum(estimate_tokens(m.content) for m in to_fold)
+    with transaction.atomic():
+        folded = ChatMessage.objects.filter(pk__in=[m.pk for m in to_fold], summarized=False).update(summarized=True)
+        if folded != len(to_fold):
+            transaction.set_rollback(True)
+            return False
+        ChatConversation.objects.filter(pk=conversation.pk).update(
+            summary=summary.strip()[:max_chars],
+            pending_tokens=Greatest(F('pending_tokens') - folded_tokens, 0),
+            pending_messages=Greatest(F('pending_messages') - len(to_fold), 0),
+        )
+    return True
+
+
+def conversations_to_compact():
+    """
+    Conversations over the history budget that have turns to fold. One whose
+    kept recent turns alone exceed the budget is skipped until it grows.
+    """
+    return ChatConversation.objects.filter(
+        pending_tokens__gt=settings.AI_CHAT_HISTORY_TOKENS,
+        pending_messages__gt=settings.AI_CHAT_KEEP_RECENT_MESSAGES,
+    )
+
+
+def compact_pending_conversations(limit=100):
+    """Compact conversations whose verbatim history outgrew the budget; returns how many were folded."""
+    conversations = conversations_to_compact().order_by('updated_at')[:limit]
+    provider = get_llm_provider()
+    return sum(compact_conversation(conversation, provider) for conversation in conversations)
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    A new pathway orphans the cached catalogue pages by bumping a version
+    key, and every worker has to see the bump, not only the one that saved
+    it. That, like the page versions, counters and fragments cached the same
+    way, only works when every worker process reads the same cache.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.IS_PRODUCTION and backend.endswith('LocMemCache'):
+        return [Error(
+            'The default cache is per-process LocMemCache in production.',
+            hint='Set REDIS_URL so all workers share one cache.',
+            id='core.E001',
+        )]
+    return []
@@ -1,5 +1,6 @@
 from django.conf import settings
-from notifications.models import Notification
+from notifications.counters import get_unread_count
+from notifications.webpush import get_vapid_public_key
 
 def google_analytics(request):
     return {
@@ -9,10 +10,11 @@ def google_analytics(request):
 
 # --- THIS IS THE NEW FUNCTION ---
 def notifications(request):
+    # The dropdown items load lazily from notifications:dropdown; only the badge count is needed here
     if request.user.is_authenticated:
-        unread_notifications = Notification.objects.filter(recipient=request.user, is_read=False)
         return {
-            'unread_notifications': unread_notifications,
-            'unread_notification_count': unread_notifications.count(),
+            'unread_notification_count': get_unread_count(request.user),
+            'vapid_public_key': get_vapid_public_key(),
+            'notification_stream_enabled': settings.NOTIFICATION_STREAM_ENABLED,
         }
-    return {}
\ No newline at end of file
+    return {}
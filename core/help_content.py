@@ -0,0 +1,108 @@
+"""
+Static help content for Kiri AI: the step-by-step task guides behind the
+Quick Help buttons and the FAQ answers the support chat can give without
+calling the model.
+"""
+
+TASK_GUIDES = {
+    "find_service": """
+    To find an artisan service:
+    1. Go to the Services tab at the bottom
+    2. Browse by category or use the search
+    3. Click on a service to see details
+    4. Click "Book This Service" to make a booking request
+    5. The artisan will contact you via your provided email/phone
+    """,
+
+    "create_pathway": """
+    To create a learning pathway:
+    1. Go to Academy > My Dashboard
+    2. Click "Create New Pathway" (or "Get Started Now" if first time)
+    3. Enter your business goal or skill you want to learn
+    4. Our AI will generate a personalized learning pathway
+    5. Complete modules to track your progress
+    6. Earn a certificate when you finish!
+    """,
+
+    "list_service": """
+    To list your service as an artisan:
+    1. Make sure you're verified (complete your profile with location)
+    2. Go to Services > My Services (if verified artisan)
+    3. Click "Add New Service"
+    4. Fill in service details, price, and upload images
+    5. Submit and your service will be live!
+    """,
+
+    "refer_friend": """
+    To refer friends and earn benefits:
+    1. Go to Academy > My Dashboard
+    2. Click "Generate Referral URL"
+    3. Copy your unique referral link
+    4. Share it with friends
+    5. When they sign up, you both benefit!
+    6. Get 1 referral to unlock creating additional learning pathways
+    """,
+
+    "edit_profile": """
+    To edit your profile:
+    1. Click your profile picture (top right)
+    2. Select "Edit Profile"
+    3. Update your information, bio, social media links
+    4. Upload a profile picture
+    5. Add certificates to showcase your skills
+    6. Save changes
+    """
+}
+
+# How users usually phrase the question each task guide answers
+TASK_GUIDE_QUESTIONS = {
+    "find_service": "How do I find and book an artisan service?",
+    "create_pathway": "How do I create a new learning pathway in the academy?",
+    "list_service": "How do I list or add my service as an artisan?",
+    "refer_friend": "How do I refer a friend and get my referral link?",
+    "edit_profile": "How do I edit or update my profile?",
+}
+
+SUPPORT_FAQS = [
+    (
+        "How do I get verified as an artisan?",
+        "Complete your profile with an accurate location (street address and city). "
+        "Verification is automatic once you provide a valid address, and verified artisans "
+        "can list services and write blog posts.",
+    ),
+    (
+        "Who can write blog posts?",
+        "Only verified artisans can write blog posts. Complete your profile with your location "
+        "to get verified, then use the Blog tab to write your first post.",
+    ),
+    (
+        "How do I get a certificate for a learning pathway?",
+        "Complete every module in your learning pathway. Once the pathway is finished you can "
+        "download your PDF certificate from the pathway page.",
+    ),
+    (
+        "Why can't I create another learning pathway?",
+        "Additional learning pathways unlock after your first successful referral. Go to "
+        "Academy > My Dashboard, click \"Generate Referral URL\" and share the link with a friend.",
+    ),
+    (
+        "How do I install the Kiri.ng app on my phone?",
+        "Kiri.ng is a Progressive Web App. Open kiri.ng in your phone's browser and choose "
+        "\"Add to Home Screen\" (or \"Install app\") from the browser menu.",
+    ),
+    (
+        "How do I switch between dark mode and light mode?",
+        "Use the dark mode switch in the top navigation bar to switch between dark and light mode.",
+    ),
+    (
+        "Why am I not getting push notifications on my iPhone?",
+        "Web push notifications are not supported on iOS yet. You will still see all your "
+        "notifications in the bell menu when you open Kiri.ng.",
+    ),
+    (
+        "How do I contact Kiri.ng support?",
+        "Ask me here any time. For issues I cannot resolve I can create a support ticket, and "
+        "our team will contact you by email within 24-48 hours. You can also use the contact "
+        "form in the footer.",
+    ),
+]
@@ -3,64 +3,83 @@ import hashlib
 import os
 from django.conf import settings
 from django.contrib.sites.models import Site
+from django.core.cache import cache
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def get_indexnow_key():
-    """Get or generate IndexNow API key"""
+SEO_SETTINGS_VERSION_KEY = 'core:seo_settings:version'
+
+# Per-process copy of the SEOSettings row, reloaded when the version in the
+# shared cache changes (the row is saved or deleted)
+_seo_settings = {'version': None, 'value': None}
+
+
+def get_seo_settings():
+    """Return the SEOSettings singleton (or None), reading the database only after it changes"""
     from .models import SEOSettings
     
+    version = cache.get_or_set(SEO_SETTINGS_VERSION_KEY, 1, timeout=None)
+    if _seo_settings['version'] != version:
+        _seo_settings['value'] = SEOSettings.objects.first()
+        _seo_settings['version'] = version
+    return _seo_settings['value']
+
+
+def invalidate_seo_settings():
+    """Make every process reload SEOSettings on next use."""
+    try:
+        cache.incr(SEO_SETTINGS_VERSION_KEY)
+    except ValueError:
+        cache.set(SEO_SETTINGS_VERSION_KEY, 2, timeout=None)
+
+
+def default_indexnow_key():
+    """The key used when none is stored: INDEXNOW_KEY, or one derived from SECRET_KEY"""
+    return getattr(settings, 'INDEXNOW_KEY', None) or hashlib.md5(settings.SECRET_KEY.encode()).hexdigest()
+
+
+def get_indexnow_key():
+    """Get the IndexNow API key without touching the database on the hot path"""
     try:
-        seo_settings = SEOSettings.objects.first()
+        seo_settings = get_seo_settings()
         if seo_settings and seo_settings.indexnow_key:
             return seo_settings.indexnow_key
-    except:
-        pass
-    
-    key = getattr(settings, 'INDEXNOW_KEY', None)
-    if not key:
-        key = hashlib.md5(settings.SECRET_KEY.encode()).hexdigest()
-    
-    try:
-        seo_settings, created = SEOSettings.objects.get_or_create(id=1)
-        if not seo_settings.indexnow_key:
-            seo_settings.indexnow_key = key
-            seo_settings.save()
-    except:
-        pass
+    except Exception as e:
+        logger.error(f"Error loading SEO settings: {e}")
     
-    return key
+    return default_indexnow_key()
 
 
-def submit_to_indexnow(urls):
-    """
-    Submit URLs to IndexNow for instant indexing
-    Supported search engines: Bing, Yandex, Naver
-    """
-    from .models import IndexNowSubmission, SEOSettings
-    from django.utils import timezone
-    
-    if not urls:
-        return False
-    
-    if isinstance(urls, str):
-        urls = [urls]
-    
-    key = get_indexnow_key()
+INDEXNOW_ENDPOINTS = [
+    'https://api.indexnow.org/indexnow',
+    'https://www.bing.com/indexnow',
+]
+
+
+def get_site_host():
+    """Return the scheme and domain URLs are submitted under"""
     site = Site.objects.get_current()
     host = f"https://{site.domain}"
     
     if settings.DEBUG and 'REPLIT_DEV_DOMAIN' in os.environ:
         host = f"https://{os.environ['REPLIT_DEV_DOMAIN']}"
-    
-    full_urls = []
-    for url in urls:
-        if not url.startswith('http'):
-            url = f"{host}{url}"
-        full_urls.append(url)
-    
+    return host
+
+
+def _absolute_urls(urls, host):
+    if isinstance(urls, str):
+        urls = [urls]
+    return [url if url.startswith('http') else f"{host}{url}" for url in urls]
+
+
+def post_to_indexnow(full_urls, host):
+    """
+    POST one batch of absolute URLs, trying each endpoint in turn.
+    Returns (success, response_code, error_message, retry_after_seconds).
+    """
+    key = get_indexnow_key()
     data = {
         "host": host.replace('https://', '').replace('http://', ''),
         "key": key,
@@ -68,16 +87,11 @@ def submit_to_indexnow(urls):
         "urlList": full_urls
     }
     
-    indexnow_endpoints = [
-        'https://api.indexnow.org/indexnow',
-        'https://www.bing.com/indexnow',
-    ]
-    
-    success = False
     response_code = None
     error_message = ""
+    retry_after = None
     
-    for endpoint in indexnow_endpoints:
+    for endpoint in INDEXNOW_ENDPOINTS:
         try:
             response = requests.post(
                 endpoint,
@@ -88,37 +102,160 @@ def submit_to_indexnow(urls):
             response_code = response.status_code
             if response.status_code in [200, 202]:
                 logger.info(f"Successfully submitted {len(full_urls)} URLs to {endpoint}")
-                success = True
+                return True, response_code, "", None
+            
+            error_message = f"Failed with status {response.status_code}"
+            logger.warning(f"IndexNow submission to {endpoint} failed: {response.status_code}")
+            if response.status_code == 429:
+                header = response.headers.get('Retry-After', '')
+                retry_after = int(header) if header.isdigit() else None
+                # Endpoints share submissions, so a rate limit on one applies to all
                 break
-            else:
-                error_message = f"Failed with status {response.status_code}"
-                logger.warning(f"IndexNow submission to {endpoint} failed: {response.status_code}")
         except Exception as e:
             error_message = str(e)
             logger.error(f"Error submitting to IndexNow ({endpoint}): {e}")
     
-    for url in full_urls:
-        try:
-            IndexNowSubmission.objects.create(
-                url=url,
-                success=success,
-                response_code=response_code,
-                error_message=error_message
-            )
-        except:
-            pass
+    return False, response_code, error_message, retry_after
+
+
+def _log_submissions(full_urls, success, response_code, error_message):
+    from .models import IndexNowSubmission, SEOSettings
+    from django.utils import timezone
     
+    IndexNowSubmission.objects.bulk_create([
+        IndexNowSubmission(url=url, success=success, response_code=response_code, error_message=error_message)
+        for url in full_urls
+    ], batch_size=1000)
+    SEOSettings.objects.update(last_indexnow_submission=timezone.now())
+
+
+def submit_to_indexnow(urls):
+    """
+    Submit URLs to IndexNow immediately, in the caller's thread.
+    Supported search engines: Bing, Yandex, Naver
+    Prefer enqueue_indexnow() from request handlers.
+    """
+    if not urls:
+        return False
+    
+    host = get_site_host()
+    full_urls = _absolute_urls(urls, host)
+    
+    success, response_code, error_message, _ = post_to_indexnow(full_urls, host)
     try:
-        seo_settings = SEOSettings.objects.first()
-        if seo_settings:
-            seo_settings.last_indexnow_submission = timezone.now()
-            seo_settings.save()
-    except:
-        pass
+        _log_submissions(full_urls, success, response_code, error_message)
+    except Exception as e:
+        logger.error(f"Error logging IndexNow submission: {e}")
     
     return success
 
 
+def enqueue_indexnow(urls):
+    """
+    Queue URLs for the IndexNow worker (`manage.py flush_indexnow_queue`).
+    This is one local INSERT; a URL already waiting in the queue is left as is,
+    so repeated edits inside the coalescing window are submitted once.
+    """
+    from .models import IndexNowQueueItem
+    from django.utils import timezone
+    from datetime import timedelta
+    
+    if not urls:
+        return
+    
+    full_urls = _absolute_urls(urls, get_site_host())
+    not_before = timezone.now() + timedelta(seconds=settings.INDEXNOW_COALESCE_SECONDS)
+    IndexNowQueueItem.objects.bulk_create(
+        [IndexNowQueueItem(url=url, next_attempt_at=not_before) for url in dict.fromkeys(full_urls)],
+        ignore_conflicts=True,
+    )
+
+
+def _backoff_delay(attempts, retry_after=None):
+    delay = settings.INDEXNOW_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0)
+    if retry_after:
+        delay = max(delay, retry_after)
+    return min(delay, settings.INDEXNOW_MAX_BACKOFF_SECONDS)
+
+
+def _claim_indexnow_batch():
+    """
+    Lease up to INDEXNOW_BATCH_SIZE due queue items to this worker by pushing
+    their next_attempt_at INDEXNOW_LEASE_SECONDS ahead, so the row locks are
+    held only for this short transaction. Items a crashed worker leased
+    become due again when the lease runs out. Returns (pk, url, attempts) rows.
+    """
+    from .models import IndexNowQueueItem
+    from django.db import transaction
+    from django.utils import timezone
+    from datetime import timedelta
+    
+    with transaction.atomic():
+        now = timezone.now()
+        items = list(
+            IndexNowQueueItem.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('pk', 'url', 'attempts')[:settings.INDEXNOW_BATCH_SIZE]
+        )
+        IndexNowQueueItem.objects.filter(pk__in=[pk for pk, _, _ in items]).update(
+            next_attempt_at=now + timedelta(seconds=settings.INDEXNOW_LEASE_SECONDS)
+        )
+    return items
+
+
+def flush_indexnow_queue(max_batches=None):
+    """
+    Submit due queue items in batches of up to INDEXNOW_BATCH_SIZE URLs per POST.
+    Stops at the first 429 and reschedules the batch with exponential backoff.
+    The POST runs outside any transaction; see _claim_indexnow_batch().
+    Returns (submitted, rescheduled) URL counts.
+    """
+    from .models import IndexNowQueueItem
+    from django.db import transaction
+    from django.db.models import F
+    from django.utils import timezone
+    from datetime import timedelta
+    
+    host = get_site_host()
+    submitted = rescheduled = batches = 0
+    
+    while max_batches is None or batches < max_batches:
+        items = _claim_indexnow_batch()
+        if not items:
+            break
+        batches += 1
+        
+        pks = [pk for pk, _, _ in items]
+        full_urls = [url for _, url, _ in items]
+        success, response_code, error_message, retry_after = post_to_indexnow(full_urls, host)
+        
+        with transaction.atomic():
+            _log_submissions(full_urls, success, response_code, error_message)
+            
+            if success:
+                IndexNowQueueItem.objects.filter(pk__in=pks).delete()
+                submitted += len(pks)
+                continue
+            
+            attempts = max(a for _, _, a in items) + 1
+            dropped, _ = IndexNowQueueItem.objects.filter(
+                pk__in=pks, attempts__gte=settings.INDEXNOW_MAX_ATTEMPTS - 1
+            ).delete()
+            if dropped:
+                logger.warning(f"Dropped {dropped} URLs from the IndexNow queue after {settings.INDEXNOW_MAX_ATTEMPTS} attempts")
+            IndexNowQueueItem.objects.filter(pk__in=pks).update(
+                attempts=F('attempts') + 1,
+                next_attempt_at=timezone.now() + timedelta(seconds=_backoff_delay(attempts, retry_after)),
+            )
+            rescheduled += len(pks) - dropped
+        
+        # Whatever the failure (rate limit, outage), later batches would fail the same way
+        break
+    
+    return submitted, rescheduled
+
+
 def ping_search_engines():
     """Ping search engines about sitemap updates"""
     site = Site.objects.get_current()
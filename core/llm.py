@@ -0,0 +1,192 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+import google.generativeai as genai
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+# Process-level registry of SDK clients and providers. It is built lazily on
+# first use and rebuilt whenever the PID changes, so workers forked by
+# `gunicorn --preload` never share the master's gRPC channels.
+_registry = {'pid': None, 'models': {}, 'providers': {}}
+_registry_lock = threading.Lock()
+
+
+def _reset_lock_after_fork():
+    # A lock held by another thread at fork time would never be released in the child
+    global _registry_lock
+    _registry_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_lock_after_fork)
+
+
+def _ensure_registry():
+    """Configure the Gemini SDK once per process. Call with _registry_lock held."""
+    pid = os.getpid()
+    if _registry['pid'] != pid:
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        _registry['models'].clear()
+        _registry['providers'].clear()
+        _registry['pid'] = pid
+
+
+def get_gemini_model(model_name):
+    """Return the shared GenerativeModel for model_name, reusing its warm transport."""
+    with _registry_lock:
+        _ensure_registry()
+        model = _registry['models'].get(model_name)
+        if model is None:
+            model = _registry['models'][model_name] = genai.GenerativeModel(model_name)
+        return model
+
+
+class GeminiProvider:
+    """Sends prompts to Google Gemini."""
+    name = 'gemini'
+
+    def generate(self, prompt, task='text', model=None, json_output=False, generation_config=None, timeout=60):
+        """Return the generated text for a prompt (a JSON string when json_output is set)."""
+        config = dict(generation_config or {})
+        if json_output:
+            config['response_mime_type'] = 'application/json'
+
+        gemini_model = get_gemini_model(model or settings.GEMINI_MODEL)
+        response = gemini_model.generate_content(
+            prompt,
+            generation_config=config or None,
+            request_options={'timeout': timeout},
+        )
+        return response.text
+
+    def stream(self, prompt, task='text', model=None, generation_config=None, timeout=60):
+        """Yield text chunks as Gemini produces them."""
+        gemini_model = get_gemini_model(model or settings.GEMINI_MODEL)
+        response = gemini_model.generate_content(
+            prompt,
+            generation_config=generation_config or None,
+            request_options={'timeout': timeout},
+            stream=True,
+        )
+        # Closing this generator early (client went away) raises GeneratorExit at
+        # the yield, so no further chunks are read and the response is released
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class LocalProvider:
+    """
+    Deterministic offline backend for load testing.
+
+    Returns schema-valid fake outlines, lessons, quizzes and answers without
+    calling any API. The same prompt always produces the same response, and
+    every call sleeps for `latency` seconds to simulate the model round trip.
+    """
+    name = 'local'
+
+    TOPICS = [
+        'Mindset', 'Core Skills', 'Business Registration', 'Marketing',
+        'Pricing & Bookkeeping', 'Growth', 'Customer Care', 'Online Presence',
+    ]
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def generate(self, prompt, task='text', model=None, json_output=False, generation_config=None, timeout=60):
+        """Return a canned response for `task`, seeded from the prompt."""
+        if self.latency:
+            time.sleep(self.latency)
+        return self._render(prompt, task, json_output)
+
+    def stream(self, prompt, task='text', model=None, generation_config=None, timeout=60):
+        """Yield the canned response word by word, spreading the latency across chunks."""
+        words = self._render(prompt, task, json_output=False).split(' ')
+        for word in words:
+            if self.latency:
+                time.sleep(self.latency / len(words))
+            yield word + ' '
+
+    def _render(self, prompt, task, json_output):
+        seed = hashlib.sha256(f"{task}:{prompt}".encode()).hexdigest()
+        rng = random.Random(seed)
+        builder = getattr(self, f'_fake_{task}', self._fake_text)
+        payload = builder(rng)
+
+        if json_output and not isinstance(payload, str):
+            return json.dumps(payload)
+        return payload
+
+    def _fake_pathway_outline(self, rng):
+        topics = rng.sample(self.TOPICS, 6)
+        return {
+            "modules": [
+                {
+                    "title": f"Module {order + 1}: {topic}",
+                    "youtube_search_query": f"{topic.lower()} artisan business Nigeria",
+                    "steps": [f"{topic} step {step + 1}" for step in range(rng.randint(3, 4))],
+                }
+                for order, topic in enumerate(topics)
+            ]
+        }
+
+    def _fake_module_content(self, rng):
+        topic = rng.choice(self.TOPICS)
+        paragraphs = "\n\n".join(
+            f"This is simulated lesson paragraph {i + 1} about {topic.lower()}."
+            for i in range(rng.randint(4, 8))
+        )
+        return (
+            f"# {topic}\n\n{paragraphs}\n\n"
+            "## Questions to think about\n\n"
+            "1. How will you apply this in your business this week?\n"
+            "2. What is the first step you will take?\n"
+        )
+
+    def _fake_module_quiz(self, rng):
+        topic = rng.choice(self.TOPICS)
+        return {
+            "question": f"Which statement best describes {topic.lower()}?",
+            "option_a": "Simulated option A",
+            "option_b": "Simulated option B",
+            "option_c": "Simulated option C",
+            "option_d": "Simulated option D",
+            "correct_answer": rng.choice("ABCD"),
+        }
+
+    def _fake_module_answer(self, rng):
+        return f"This is a simulated instructor answer (#{rng.randint(1000, 9999)})."
+
+    def _fake_chat(self, rng):
+        return f"This is a simulated Kiri AI reply (#{rng.randint(1000, 9999)})."
+
+    def _fake_text(self, rng):
+        return f"This is a simulated response (#{rng.randint(1000, 9999)})."
+
+
+def get_llm_provider():
+    """Return the shared provider selected by settings.LLM_PROVIDER."""
+    backend = getattr(settings, 'LLM_PROVIDER', 'gemini')
+    latency = getattr(settings, 'LLM_LOCAL_LATENCY', 0.0)
+    key = (backend, latency)
+
+    with _registry_lock:
+        _ensure_registry()
+        provider = _registry['providers'].get(key)
+        if provider is None:
+            if backend == 'gemini':
+                provider = GeminiProvider()
+            elif backend == 'local':
+                provider = LocalProvider(latency=latency)
+            else:
+                raise ImproperlyConfigured(f"Unknown LLM_PROVIDER '{backend}'. Use 'gemini' or 'local'.")
+            _registry['providers'][key] = provider
+        return provider
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sitemap_builder import build_sitemaps
+
+
+class Command(BaseCommand):
+    help = 'Write the sitemap index and gzip\'d section pages (max 50,000 URLs each) to SITEMAP_ROOT'
+
+    def handle(self, *args, **options):
+        counts = build_sitemaps()
+        for section, count in counts.items():
+            self.stdout.write(f"{section}: {count} URLs")
+        self.stdout.write(self.style.SUCCESS(f'Sitemaps written to {settings.SITEMAP_ROOT}'))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.chat_memory import compact_pending_conversations
+
+
+class Command(BaseCommand):
+    help = 'Fold old AI support chat turns into rolling summaries once they outgrow the history budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running and compact every --interval seconds')
+        parser.add_argument('--interval', type=int, default=30, help='Seconds between passes with --loop')
+        parser.add_argument('--limit', type=int, default=100, help='Most conversations compacted per pass')
+
+    def handle(self, *args, **options):
+        while True:
+            compacted = compact_pending_conversations(limit=options['limit'])
+            if compacted:
+                self.stdout.write(f"Compacted {compacted} conversations")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Chat conversations compacted'))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.indexnow import flush_indexnow_queue
+
+
+class Command(BaseCommand):
+    help = 'Submit queued URL changes to IndexNow in batches of up to 10,000 URLs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running and flush the queue every --interval seconds')
+        parser.add_argument('--interval', type=int, default=60, help='Seconds between flushes with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            submitted, rescheduled = flush_indexnow_queue()
+            if submitted or rescheduled:
+                self.stdout.write(f"Submitted {submitted} URLs, rescheduled {rescheduled}")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('IndexNow queue flushed'))
@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import ChatConversation
+
+
+class Command(BaseCommand):
+    help = 'Delete anonymous AI support chats idle for more than N days, in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.AI_CHAT_ANONYMOUS_RETENTION_DAYS, help='Keep chats active more recently than this')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Conversations deleted per transaction')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        idle = ChatConversation.objects.filter(user__isnull=True, updated_at__lt=cutoff)
+        removed = 0
+        while True:
+            with transaction.atomic():
+                ids = list(idle.order_by('updated_at').values_list('pk', flat=True)[:options['chunk_size']])
+                if not ids:
+                    break
+                # Messages go with their conversation (on_delete=CASCADE)
+                ChatConversation.objects.filter(pk__in=ids).delete()
+            removed += len(ids)
+            self.stdout.write(f"Removed {removed} conversations so far")
+
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} anonymous conversations idle for over {options['days']} days"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.change_tracker import queue_changed_urls
+
+
+class Command(BaseCommand):
+    help = 'Queue public URLs changed since the last run for IndexNow (run before flush_indexnow_queue)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Ignore the watermark and queue every public URL')
+
+    def handle(self, *args, **options):
+        count = queue_changed_urls(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'Queued {count} changed URLs for IndexNow'))
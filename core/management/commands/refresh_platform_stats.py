@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.platform_stats import refresh_platform_stats
+
+
+class Command(BaseCommand):
+    help = 'Recount platform statistics and store a fresh snapshot (schedule periodically to correct drift)'
+
+    def handle(self, *args, **options):
+        stats = refresh_platform_stats()
+        for name, value in stats.items():
+            self.stdout.write(f"{name}: {value}")
+        self.stdout.write(self.style.SUCCESS('Platform stats snapshot refreshed'))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.outbox import deliver_outbox
+
+
+class Command(BaseCommand):
+    help = 'Send pending transactional emails from the outbox, retrying failures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running and drain the outbox every --interval seconds')
+        parser.add_argument('--interval', type=int, default=5, help='Seconds between passes with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, retried, dead = deliver_outbox()
+            if sent or retried or dead:
+                self.stdout.write(f"Sent {sent} emails, {retried} to retry, {dead} dead-lettered")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Email outbox drained'))
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from core.models import ChatMessage
+
+
+class Command(BaseCommand):
+    help = 'Report how many support chat replies were answered from the help index instead of the model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Number of days to report on')
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days'])
+        totals = ChatMessage.objects.filter(
+            role=ChatMessage.Role.ASSISTANT, created_at__gte=since
+        ).aggregate(
+            replies=Count('id'),
+            local=Count('id', filter=Q(answered_locally=True)),
+        )
+
+        replies, local = totals['replies'], totals['local']
+        rate = local / replies * 100 if replies else 0
+        self.stdout.write(f"Replies in the last {options['days']} days: {replies}")
+        self.stdout.write(f"Answered from the help index: {local}")
+        self.stdout.write(f"Sent to the model: {replies - local}")
+        self.stdout.write(self.style.SUCCESS(f"Deflection rate: {rate:.1f}%"))
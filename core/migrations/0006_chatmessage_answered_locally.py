@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_chatconversation_chatmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='answered_locally',
+            field=models.BooleanField(default=False, help_text='Answered from the help index without calling the model'),
+        ),
+    ]
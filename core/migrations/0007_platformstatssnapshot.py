@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_chatmessage_answered_locally'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformStatsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_services', models.PositiveIntegerField(default=0)),
+                ('total_artisans', models.PositiveIntegerField(default=0)),
+                ('total_pathways', models.PositiveIntegerField(default=0)),
+                ('total_users', models.PositiveIntegerField(default=0)),
+                ('categories', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(blank=True, help_text='Last full recount', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Platform Stats Snapshot',
+                'verbose_name_plural': 'Platform Stats Snapshot',
+            },
+        ),
+    ]
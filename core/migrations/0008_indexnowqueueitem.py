@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_platformstatssnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexNowQueueItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500, unique=True)),
+                ('queued_at', models.DateTimeField(auto_now_add=True)),
+                ('next_attempt_at', models.DateTimeField(help_text='Not submitted before this time (coalescing window or backoff)')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'IndexNow Queue Item',
+                'verbose_name_plural': 'IndexNow Queue',
+                'ordering': ['next_attempt_at'],
+                'indexes': [models.Index(fields=['next_attempt_at'], name='core_indexn_next_at_bcd6bf_idx')],
+            },
+        ),
+    ]
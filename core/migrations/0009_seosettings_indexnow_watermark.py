@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_indexnowqueueitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seosettings',
+            name='indexnow_watermark',
+            field=models.DateTimeField(blank=True, help_text='Content changed after this time has not been queued for IndexNow yet', null=True),
+        ),
+    ]
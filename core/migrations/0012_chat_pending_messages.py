@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:54
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_pending_messages(apps, schema_editor):
+    ChatConversation = apps.get_model('core', 'ChatConversation')
+    ChatMessage = apps.get_model('core', 'ChatMessage')
+    pending = (
+        ChatMessage.objects.filter(conversation=OuterRef('pk'), summarized=False)
+        .order_by().values('conversation').annotate(total=Count('pk')).values('total')
+    )
+    ChatConversation.objects.update(pending_messages=Coalesce(Subquery(pending), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_chat_pending_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatconversation',
+            name='pending_messages',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_pending_messages, migrations.RunPython.noop),
+    ]
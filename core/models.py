@@ -1,5 +1,8 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -24,6 +27,11 @@ class SEOSettings(models.Model):
         blank=True,
         help_text=_("Last IndexNow submission time")
     )
+    indexnow_watermark = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=_("Content changed after this time has not been queued for IndexNow yet")
+    )
     
     class Meta:
         verbose_name = _("SEO Settings")
@@ -33,11 +41,33 @@ class SEOSettings(models.Model):
         return "SEO Settings"
     
     def save(self, *args, **kwargs):
+        from .indexnow import default_indexnow_key
+        
         if not self.pk and SEOSettings.objects.exists():
             raise ValueError("Only one SEO Settings instance is allowed")
+        if not self.indexnow_key:
+            self.indexnow_key = default_indexnow_key()
         return super().save(*args, **kwargs)
 
 
+class PlatformStatsSnapshot(models.Model):
+    """Platform-wide counters, refreshed by `refresh_platform_stats` and kept current by signals"""
+    total_services = models.PositiveIntegerField(default=0)
+    total_artisans = models.PositiveIntegerField(default=0)
+    total_pathways = models.PositiveIntegerField(default=0)
+    total_users = models.PositiveIntegerField(default=0)
+    categories = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True, blank=True, help_text=_("Last full recount"))
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _("Platform Stats Snapshot")
+        verbose_name_plural = _("Platform Stats Snapshot")
+    
+    def __str__(self):
+        return "Platform Stats"
+
+
 class IndexNowSubmission(models.Model):
     """Track IndexNow submissions"""
     url = models.URLField(max_length=500)
@@ -56,6 +86,23 @@ class IndexNowSubmission(models.Model):
         return f"{status} {self.url} - {self.submitted_at.strftime('%Y-%m-%d %H:%M')}"
 
 
+class IndexNowQueueItem(models.Model):
+    """A changed URL waiting for the IndexNow worker; one row per URL coalesces repeat edits"""
+    url = models.URLField(max_length=500, unique=True)
+    queued_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(help_text=_("Not submitted before this time (coalescing window or backoff)"))
+    attempts = models.PositiveSmallIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [models.Index(fields=['next_attempt_at'])]
+        verbose_name = _("IndexNow Queue Item")
+        verbose_name_plural = _("IndexNow Queue")
+    
+    def __str__(self):
+        return self.url
+
+
 class SupportTicket(models.Model):
     class Status(models.TextChoices):
         OPEN = 'OPEN', _('Open')
@@ -90,3 +137,73 @@ class SupportTicket(models.Model):
     
     def __str__(self):
         return f"Ticket #{self.pk} - {self.subject}"
+
+
+class ChatConversation(models.Model):
+    """Server-side memory for a Kiri AI support chat"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_conversations', null=True, blank=True)
+    summary = models.TextField(blank=True, help_text=_("Rolling summary of turns no longer sent verbatim"))
+    # Estimated tokens and count of unsummarized messages; `manage.py compact_chat_conversations`
+    # picks up conversations over the token budget with more messages than it keeps verbatim
+    pending_tokens = models.PositiveIntegerField(default=0, db_index=True)
+    pending_messages = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    class Meta:
+        ordering = ['-updated_at']
+        verbose_name = _("Chat Conversation")
+        verbose_name_plural = _("Chat Conversations")
+    
+    def __str__(self):
+        return f"Conversation {self.pk} ({self.user.username if self.user else 'Anonymous'})"
+
+
+class ChatMessage(models.Model):
+    class Role(models.TextChoices):
+        USER = 'user', _('User')
+        ASSISTANT = 'assistant', _('Kiri AI')
+    
+    conversation = models.ForeignKey(ChatConversation, on_delete=models.CASCADE, related_name='messages')
+    role = models.CharField(max_length=10, choices=Role.choices)
+    content = models.TextField()
+    summarized = models.BooleanField(default=False, help_text=_("Folded into the conversation summary"))
+    answered_locally = models.BooleanField(default=False, help_text=_("Answered from the help index without calling the model"))
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [models.Index(fields=['conversation', 'summarized', 'created_at'])]
+    
+    def __str__(self):
+        return f"{self.get_role_display()}: {self.content[:30]}"
+
+
+class OutboundEmail(models.Model):
+    """Transactional email written with the change that caused it and sent by `manage.py send_outbox_emails`"""
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        SENT = 'SENT', _('Sent')
+        DEAD = 'DEAD', _('Dead (gave up)')
+    
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255, blank=True, help_text=_("Blank means DEFAULT_FROM_EMAIL"))
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+        verbose_name = _("Outbound Email")
+        verbose_name_plural = _("Email Outbox")
+    
+    def __str__(self):
+        return f"{self.subject} → {', '.join(self.to)}"
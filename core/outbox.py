@@ -0,0 +1,135 @@
+"""
+Transactional email outbox.
+
+queue_email() writes an OutboundEmail in the caller's transaction, so the
+email exists exactly when the change it announces was committed, and the
+request never waits on the email API. `manage.py send_outbox_emails` sends
+pending emails through EMAIL_BACKEND (anymail/Brevo) over one connection
+per batch, retries failures with exponential backoff and dead-letters the
+ones that keep failing. Each batch is leased to one worker in a short
+transaction and sent with no transaction open. Delivery is at-least-once:
+the batch of a worker killed mid-send is sent again once its lease expires.
+"""
+import logging
+from datetime import timedelta
+
+from anymail.exceptions import AnymailInvalidAddress, AnymailRecipientsRefused
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# Sending these again can never succeed
+PERMANENT_ERRORS = (AnymailInvalidAddress, AnymailRecipientsRefused)
+
+
+def queue_email(subject, message, recipient_list, from_email=None, html_message=None):
+    """Drop-in for send_mail() that stores the email for the outbox worker instead of sending it."""
+    return OutboundEmail.objects.create(
+        subject=str(subject),
+        body=str(message),
+        html_body=str(html_message or ''),
+        from_email=from_email or '',
+        to=list(recipient_list),
+    )
+
+
+def queue_message(message):
+    """Queue an EmailMessage built elsewhere (e.g. by allauth); cc, bcc and attachments are not kept."""
+    body, html = message.body, ''
+    if message.content_subtype == 'html':
+        body, html = strip_tags(message.body), message.body
+    for content, mimetype in getattr(message, 'alternatives', []):
+        if mimetype == 'text/html':
+            html = content
+    return queue_email(message.subject, body, message.to, from_email=message.from_email, html_message=html)
+
+
+def _build_message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject,
+        email.body,
+        email.from_email or None,
+        email.to,
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def _backoff_delay(attempts):
+    delay = settings.EMAIL_OUTBOX_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0)
+    return min(delay, settings.EMAIL_OUTBOX_MAX_BACKOFF_SECONDS)
+
+
+def _claim_outbox_batch():
+    """
+    Lease up to EMAIL_OUTBOX_BATCH_SIZE due emails to this worker: their
+    next_attempt_at moves EMAIL_OUTBOX_LEASE_SECONDS ahead and the attempt is
+    counted up front, so an email that keeps killing workers still ends up
+    dead-lettered. Row locks last only for this transaction.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.Status.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:settings.EMAIL_OUTBOX_BATCH_SIZE]
+        )
+        OutboundEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+            attempts=F('attempts') + 1,
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS),
+        )
+    for email in emails:
+        email.attempts += 1
+    return emails
+
+
+def deliver_outbox(max_batches=None):
+    """
+    Send due pending emails, EMAIL_OUTBOX_BATCH_SIZE at a time over one
+    backend connection. Returns (sent, retried, dead) counts.
+    """
+    sent = retried = dead = batches = 0
+
+    with get_connection() as connection:
+        while max_batches is None or batches < max_batches:
+            emails = _claim_outbox_batch()
+            if not emails:
+                break
+            batches += 1
+
+            for email in emails:
+                try:
+                    _build_message(email, connection).send()
+                except PERMANENT_ERRORS as e:
+                    email.status = OutboundEmail.Status.DEAD
+                    email.last_error = str(e)
+                    dead += 1
+                    logger.warning(f"Email {email.pk} rejected permanently: {e}")
+                except Exception as e:
+                    email.last_error = str(e)
+                    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                        email.status = OutboundEmail.Status.DEAD
+                        dead += 1
+                        logger.error(f"Email {email.pk} dead-lettered after {email.attempts} attempts: {e}")
+                    else:
+                        email.next_attempt_at = timezone.now() + timedelta(seconds=_backoff_delay(email.attempts))
+                        retried += 1
+                        logger.warning(f"Email {email.pk} failed (attempt {email.attempts}), will retry: {e}")
+                else:
+                    email.status = OutboundEmail.Status.SENT
+                    email.sent_at = timezone.now()
+                    email.last_error = ''
+                    sent += 1
+
+            OutboundEmail.objects.bulk_update(emails, ['status', 'next_attempt_at', 'last_error', 'sent_at'])
+
+    return sent, retried, dead
@@ -0,0 +1,23 @@
+"""
+Keyset pagination cursors shared by the paginated lists (pathway catalogue,
+notification inbox). A cursor is the last row's (created_at, pk) sort key
+written as "<microseconds since epoch>.<pk>".
+"""
+from datetime import datetime, timezone as dt_timezone
+
+
+def encode_cursor(obj):
+    """Encode an object's (created_at, pk) sort key as an opaque URL-safe cursor."""
+    created = obj.created_at
+    micros = int(created.timestamp()) * 1_000_000 + created.microsecond
+    return f"{micros}.{obj.pk}"
+
+
+def decode_cursor(cursor):
+    """Return (created_at, pk) for a cursor, or None if it is malformed."""
+    try:
+        micros, pk = (int(part) for part in cursor.split("."))
+        created = datetime.fromtimestamp(micros // 1_000_000, tz=dt_timezone.utc)
+        return created.replace(microsecond=micros % 1_000_000), pk
+    except (ValueError, OverflowError, OSError):
+        return None
@@ -0,0 +1,79 @@
+"""
+Platform-wide counts (services, artisans, pathways, users, categories).
+
+A full recount runs in the `refresh_platform_stats` management command.
+Between recounts, signals apply +1/-1 deltas to the stored snapshot, and
+readers get the snapshot from cache, so showing the counts never scans the
+large tables.
+"""
+import logging
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import PlatformStatsSnapshot
+
+logger = logging.getLogger(__name__)
+
+STATS_CACHE_KEY = 'core:platform_stats'
+STATS_CACHE_TIMEOUT = 60 * 60
+STAT_FIELDS = ['total_services', 'total_artisans', 'total_pathways', 'total_users', 'categories']
+
+
+def count_platform_stats():
+    """Recount every statistic from the source tables."""
+    from academy.models import LearningPathway
+    from marketplace.models import Category, Service
+    from users.models import Profile
+
+    return {
+        'total_services': Service.objects.count(),
+        'total_artisans': Profile.objects.filter(is_verified_artisan=True).count(),
+        'total_pathways': LearningPathway.objects.count(),
+        'total_users': User.objects.count(),
+        'categories': Category.objects.count(),
+    }
+
+
+def refresh_platform_stats():
+    """Replace the snapshot with a full recount and return the new stats."""
+    stats = count_platform_stats()
+    PlatformStatsSnapshot.objects.update_or_create(pk=1, defaults={**stats, 'refreshed_at': timezone.now()})
+    cache.set(STATS_CACHE_KEY, stats, STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def get_platform_stats():
+    """Return the platform stats without touching the counted tables."""
+    stats = cache.get(STATS_CACHE_KEY)
+    if stats is not None:
+        return stats
+
+    snapshot = PlatformStatsSnapshot.objects.filter(pk=1).values(*STAT_FIELDS).first()
+    if snapshot is None:
+        # First run before the refresh command has been scheduled
+        return refresh_platform_stats()
+
+    cache.set(STATS_CACHE_KEY, snapshot, STATS_CACHE_TIMEOUT)
+    return snapshot
+
+
+def adjust_platform_stats(**deltas):
+    """Apply counter deltas, e.g. adjust_platform_stats(total_users=1), once the transaction commits."""
+    changes = {name: Greatest(F(name) + delta, 0) for name, delta in deltas.items() if delta}
+    if not changes:
+        return
+
+    def apply():
+        try:
+            PlatformStatsSnapshot.objects.filter(pk=1).update(**changes, updated_at=timezone.now())
+            cache.delete(STATS_CACHE_KEY)
+        except Exception as e:
+            # The next full refresh corrects any drift
+            logger.error(f"Error updating platform stats: {e}")
+
+    transaction.on_commit(apply)
@@ -0,0 +1,62 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from academy.models import LearningPathway
+from marketplace.models import Category, Service
+from users.models import Profile
+
+from .indexnow import invalidate_seo_settings
+from .models import SEOSettings
+from .platform_stats import adjust_platform_stats
+
+COUNTED_MODELS = {
+    User: 'total_users',
+    Service: 'total_services',
+    LearningPathway: 'total_pathways',
+    Category: 'categories',
+}
+
+
+def count_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_platform_stats(**{COUNTED_MODELS[sender]: 1})
+
+
+def count_deleted(sender, instance, **kwargs):
+    adjust_platform_stats(**{COUNTED_MODELS[sender]: -1})
+
+
+for model in COUNTED_MODELS:
+    post_save.connect(count_created, sender=model, dispatch_uid=f'platform_stats_created_{model.__name__}')
+    post_delete.connect(count_deleted, sender=model, dispatch_uid=f'platform_stats_deleted_{model.__name__}')
+
+
+@receiver(post_init, sender=Profile)
+def remember_artisan_status(sender, instance, **kwargs):
+    # Lets post_save see whether verification changed without re-reading the row.
+    # Read from __dict__ so a deferred field is not loaded just for this.
+    instance._was_verified_artisan = instance.__dict__.get('is_verified_artisan')
+
+
+@receiver(post_save, sender=Profile)
+def count_verified_artisans(sender, instance, created, raw=False, **kwargs):
+    is_verified = instance.__dict__.get('is_verified_artisan')
+    was_verified = False if created else instance._was_verified_artisan
+    if raw or is_verified is None or was_verified is None:
+        return
+    if is_verified != was_verified:
+        adjust_platform_stats(total_artisans=1 if is_verified else -1)
+    instance._was_verified_artisan = is_verified
+
+
+@receiver(post_delete, sender=Profile)
+def uncount_verified_artisan(sender, instance, **kwargs):
+    if instance.is_verified_artisan:
+        adjust_platform_stats(total_artisans=-1)
+
+
+@receiver(post_save, sender=SEOSettings)
+@receiver(post_delete, sender=SEOSettings)
+def refresh_seo_settings(sender, instance, **kwargs):
+    invalidate_seo_settings()
@@ -0,0 +1,195 @@
+"""
+Builds the sitemap as static files so crawler requests never reach the database.
+
+`manage.py build_sitemaps` writes one gzip'd page per section per 50,000
+URLs plus an uncompressed sitemap index into SITEMAP_ROOT. core.views
+serves them straight from disk.
+"""
+import gzip
+import logging
+import os
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from .indexnow import get_site_host
+from .sitemaps import StaticViewSitemap
+
+logger = logging.getLogger(__name__)
+
+SITEMAP_MAX_URLS = 50000        # protocol limit per sitemap file
+SITEMAP_MAX_IMAGES_PER_URL = 1000
+SITEMAP_INDEX_NAME = 'sitemap.xml'
+QUERY_CHUNK_SIZE = 2000
+
+URLSET_OPEN = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+IMAGE_URLSET_OPEN = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+    'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">\n'
+)
+
+
+def _w3c(dt):
+    return dt.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%S+00:00') if dt else ''
+
+
+def _static_entries():
+    sitemap = StaticViewSitemap()
+    for item in sitemap.items():
+        yield sitemap.location(item), None, sitemap.changefreq, sitemap.priority, ()
+
+
+def _post_entries():
+    from blog.models import Post
+
+    posts = Post.objects.filter(status=Post.Status.PUBLISHED).only('slug', 'publish', 'updated').order_by('-publish')
+    for post in posts.iterator(chunk_size=QUERY_CHUNK_SIZE):
+        yield post.get_absolute_url(), post.updated, 'weekly', 0.7, ()
+
+
+def _service_entries():
+    from marketplace.models import Service
+
+    # Like core.change_tracker: a deactivated artisan's services are not published
+    services = Service.objects.filter(artisan__is_active=True).order_by('-created_at').values_list('pk', 'updated_at')
+    for pk, updated_at in services.iterator(chunk_size=QUERY_CHUNK_SIZE):
+        yield reverse('marketplace:service-detail', kwargs={'pk': pk}), updated_at, 'daily', 0.6, ()
+
+
+def _artisan_entries():
+    artisans = User.objects.filter(is_active=True, profile__is_verified_artisan=True).order_by('pk').values_list('username', 'profile__updated_at')
+    for username, updated_at in artisans.iterator(chunk_size=QUERY_CHUNK_SIZE):
+        yield reverse('users:artisan-storefront', kwargs={'username': username}), updated_at, 'weekly', 0.5, ()
+
+
+def _pathway_entries():
+    from academy.models import LearningPathway
+
+    pathways = LearningPathway.objects.order_by('-created_at').values_list('pk', 'slug', 'updated_at')
+    for pk, slug, updated_at in pathways.iterator(chunk_size=QUERY_CHUNK_SIZE):
+        yield reverse('academy:public-pathway-detail', kwargs={'pk': pk, 'slug': slug}), updated_at, 'weekly', 0.6, ()
+
+
+def _service_image_entries():
+    """Service pages with their primary and additional photos."""
+    from marketplace.models import Service, ServiceImage
+
+    storage = ServiceImage._meta.get_field('image').storage
+    extra_images = {}
+    for service_id, name in ServiceImage.objects.filter(service__artisan__is_active=True).order_by('service_id', 'order', 'created_at').values_list('service_id', 'image').iterator(chunk_size=QUERY_CHUNK_SIZE):
+        extra_images.setdefault(service_id, []).append(name)
+
+    services = Service.objects.filter(artisan__is_active=True).order_by('-created_at').values_list('pk', 'updated_at', 'image')
+    for pk, updated_at, image in services.iterator(chunk_size=QUERY_CHUNK_SIZE):
+        names = ([image] if image else []) + extra_images.get(pk, [])
+        if names:
+            images = [storage.url(name) for name in names[:SITEMAP_MAX_IMAGES_PER_URL]]
+            yield reverse('marketplace:service-detail', kwargs={'pk': pk}), updated_at, None, None, images
+
+
+SECTIONS = [
+    ('static', _static_entries),
+    ('blog', _post_entries),
+    ('services', _service_entries),
+    ('artisans', _artisan_entries),
+    ('pathways', _pathway_entries),
+    ('service-images', _service_image_entries),
+]
+
+
+def _url_xml(host, location, lastmod, changefreq, priority, images):
+    parts = [f"<url><loc>{escape(host + location)}</loc>"]
+    if lastmod:
+        parts.append(f"<lastmod>{_w3c(lastmod)}</lastmod>")
+    if changefreq:
+        parts.append(f"<changefreq>{changefreq}</changefreq>")
+    if priority is not None:
+        parts.append(f"<priority>{priority}</priority>")
+    for image in images:
+        parts.append(f"<image:image><image:loc>{escape(image)}</image:loc></image:image>")
+    parts.append("</url>\n")
+    return ''.join(parts)
+
+
+def _write_atomic(path, data):
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class _SectionWriter:
+    """Streams one section into numbered gzip'd pages of at most SITEMAP_MAX_URLS URLs."""
+
+    def __init__(self, root, section, host):
+        self.root = root
+        self.section = section
+        self.host = host
+        self.opening = IMAGE_URLSET_OPEN if section.endswith('images') else URLSET_OPEN
+        self.pages = []        # (filename, lastmod)
+        self._file = None
+
+    def add(self, location, lastmod, changefreq, priority, images):
+        if self._file is None:
+            self._filename = f"sitemap-{self.section}-{len(self.pages) + 1}.xml.gz"
+            self._tmp_path = self.root / f".{self._filename}.tmp"
+            self._file = gzip.open(self._tmp_path, 'wt', encoding='utf-8')
+            self._file.write(self.opening)
+            self._count = 0
+            self._lastmod = None
+
+        self._file.write(_url_xml(self.host, location, lastmod, changefreq, priority, images))
+        self._count += 1
+        if lastmod and (self._lastmod is None or lastmod > self._lastmod):
+            self._lastmod = lastmod
+        if self._count == SITEMAP_MAX_URLS:
+            self.close()
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.write('</urlset>\n')
+        self._file.close()
+        os.replace(self._tmp_path, self.root / self._filename)
+        self.pages.append((self._filename, self._lastmod))
+        self._file = None
+
+
+def build_sitemaps(root=None):
+    """Write every sitemap page and the index; returns {section: url_count}."""
+    root = Path(root or settings.SITEMAP_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    host = get_site_host()
+    built_at = datetime.now(dt_timezone.utc)
+
+    counts = {}
+    pages = []
+    for section, entries in SECTIONS:
+        writer = _SectionWriter(root, section, host)
+        count = 0
+        for entry in entries():
+            writer.add(*entry)
+            count += 1
+        writer.close()
+        counts[section] = count
+        pages.extend(writer.pages)
+
+    index = ['<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n']
+    for filename, lastmod in pages:
+        index.append(f"<sitemap><loc>{escape(f'{host}/{filename}')}</loc><lastmod>{_w3c(lastmod or built_at)}</lastmod></sitemap>\n")
+    index.append('</sitemapindex>\n')
+    _write_atomic(root / SITEMAP_INDEX_NAME, ''.join(index))
+
+    # Pages from a previous build that this one no longer needs
+    current = {filename for filename, _ in pages}
+    for stale in root.glob('sitemap-*.xml.gz'):
+        if stale.name not in current:
+            stale.unlink()
+
+    logger.info(f"Built {len(pages)} sitemap pages: {counts}")
+    return counts
@@ -70,3 +70,12 @@ class LearningPathwaySitemap(Sitemap):
 
     def lastmod(self, obj):
         return obj.created_at
+
+
+SITEMAPS = {
+    'static': StaticViewSitemap,
+    'blog': BlogPostSitemap,
+    'services': ServiceSitemap,
+    'artisans': ArtisanProfileSitemap,
+    'pathways': LearningPathwaySitemap,
+}
@@ -0,0 +1,170 @@
+"""
+Retrieval-first routing for the Kiri AI support chat.
+
+Task guides, FAQ answers and published blog posts are indexed with TF-IDF.
+A message that closely matches one of them is answered straight from the
+index; everything else goes to the model with the best matches attached as
+grounding. The index is built once per process. Publishing or unpublishing
+a post marks it stale; a background thread then rebuilds it while requests
+keep using the old one.
+
+Answers are plain text: blog titles and bodies are stripped of markup, and
+the chat page escapes everything before formatting it.
+"""
+import html
+import logging
+import textwrap
+import threading
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import linear_kernel
+
+from .help_content import SUPPORT_FAQS, TASK_GUIDE_QUESTIONS, TASK_GUIDES
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION_KEY = 'core:support_index:version'
+
+
+@dataclass
+class HelpDocument:
+    source: str          # 'guide', 'faq' or 'blog'
+    title: str
+    text: str
+    answer: str
+    url: str = ''
+
+
+@dataclass
+class RouteResult:
+    answer: str = ''                               # set when the message was answered locally
+    score: float = 0.0
+    snippets: list = field(default_factory=list)   # grounding for the model otherwise
+
+    @property
+    def deflected(self):
+        return bool(self.answer)
+
+
+class SupportIndex:
+    # Titles are phrased like the questions users ask, so they count for more than the body
+    TITLE_WEIGHT = 0.6
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.vectorizer = TfidfVectorizer(stop_words='english', sublinear_tf=True)
+        self.vectorizer.fit([f"{d.title} {d.text}" for d in documents])
+        self.titles = self.vectorizer.transform([d.title for d in documents])
+        self.bodies = self.vectorizer.transform([d.text for d in documents])
+
+    def search(self, query, limit=3):
+        """Return (score, document) pairs for the best matches, highest first."""
+        vector = self.vectorizer.transform([query])
+        scores = (
+            self.TITLE_WEIGHT * linear_kernel(vector, self.titles)[0]
+            + (1 - self.TITLE_WEIGHT) * linear_kernel(vector, self.bodies)[0]
+        )
+        ranked = scores.argsort()[::-1][:limit]
+        return [(float(scores[i]), self.documents[i]) for i in ranked if scores[i] > 0]
+
+
+def _plain_text(value):
+    # Unescape before stripping so encoded markup (&lt;script&gt;) is removed too
+    return strip_tags(html.unescape(strip_tags(value or ''))).strip()
+
+
+def _load_documents():
+    from blog.models import Post
+
+    documents = [
+        HelpDocument('guide', TASK_GUIDE_QUESTIONS.get(key, key.replace('_', ' ')), guide, textwrap.dedent(guide).strip())
+        for key, guide in TASK_GUIDES.items()
+    ]
+    documents += [
+        HelpDocument('faq', question, answer, answer)
+        for question, answer in SUPPORT_FAQS
+    ]
+
+    posts = Post.objects.filter(status=Post.Status.PUBLISHED).only('title', 'slug', 'body', 'publish')
+    for post in posts:
+        title, body = _plain_text(post.title), _plain_text(post.body)
+        excerpt = Truncator(body).words(60)
+        documents.append(HelpDocument(
+            'blog',
+            title,
+            body[:settings.SUPPORT_ROUTER_MAX_POST_CHARS],
+            f"This guide on our blog should help: **{title}**\n\n{excerpt}\n\nRead it here: {post.get_absolute_url()}",
+            url=post.get_absolute_url(),
+        ))
+    return documents
+
+
+_index = {'version': None, 'index': None}
+_index_lock = threading.Lock()
+
+
+def _rebuild_index(version):
+    """Build the index for `version` in a background thread. Called with _index_lock held."""
+    try:
+        _index['index'] = SupportIndex(_load_documents())
+        _index['version'] = version
+    except Exception as e:
+        logger.error(f"Error rebuilding support index: {e}")
+    finally:
+        connection.close()
+        _index_lock.release()
+
+
+def get_support_index():
+    """
+    Return this process's index. The first call builds it; after the blog
+    changes, the stale index keeps being served while one thread rebuilds it.
+    """
+    version = cache.get_or_set(INDEX_VERSION_KEY, 1, timeout=None)
+    if _index['index'] is None:
+        with _index_lock:
+            if _index['index'] is None:
+                _index['index'] = SupportIndex(_load_documents())
+                _index['version'] = version
+    elif _index['version'] != version and _index_lock.acquire(blocking=False):
+        threading.Thread(target=_rebuild_index, args=(version,), daemon=True).start()
+    return _index['index']
+
+
+def invalidate_support_index():
+    """Mark every process's index stale; each rebuilds it in the background on its next chat message."""
+    try:
+        cache.incr(INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(INDEX_VERSION_KEY, 2, timeout=None)
+
+
+def route_message(message):
+    """Answer message from the help index when confident, otherwise return grounding snippets."""
+    try:
+        matches = get_support_index().search(message)
+    except Exception as e:
+        logger.error(f"Error searching support index: {e}")
+        return RouteResult()
+
+    if not matches:
+        return RouteResult()
+
+    score, best = matches[0]
+    runner_up = matches[1][0] if len(matches) > 1 else 0.0
+    # Only answer locally when one document clearly wins; near-ties go to the model
+    if score >= settings.SUPPORT_ROUTER_ANSWER_THRESHOLD and score - runner_up >= settings.SUPPORT_ROUTER_MIN_MARGIN:
+        return RouteResult(answer=best.answer, score=score)
+
+    snippets = [
+        f"{doc.title}: {Truncator(doc.text.strip()).words(80)}" + (f" ({doc.url})" if doc.url else '')
+        for match_score, doc in matches
+        if match_score >= settings.SUPPORT_ROUTER_GROUNDING_THRESHOLD
+    ]
+    return RouteResult(score=score, snippets=snippets)
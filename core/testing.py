@@ -0,0 +1,10 @@
+"""Helpers shared by the apps' test suites."""
+from django.conf import settings
+from django.test import override_settings
+
+# Pages link static files through the manifest collectstatic writes, which
+# test runs do not have; tests that render pages use the plain storage
+without_static_manifest = override_settings(STORAGES={
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
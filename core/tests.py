@@ -1,3 +1,443 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from anymail.exceptions import AnymailRecipientsRefused
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from academy.ai_services import generate_module_quiz, generate_pathway_outline
+from academy.models import LearningPathway
+from blog.models import Post
+from marketplace.models import Service
+
+from . import indexnow, llm
+from .ai_customer_service import AICustomerService, get_ai_service
+from .chat_memory import (
+    compact_pending_conversations, conversations_to_compact, estimate_tokens, get_conversation, record_turn,
+)
+from .change_tracker import iter_changed_urls
+from .checks import check_shared_cache
+from .indexnow import _claim_indexnow_batch, flush_indexnow_queue, get_indexnow_key, get_seo_settings
+from .llm import GeminiProvider, LocalProvider, get_gemini_model, get_llm_provider
+from .models import ChatConversation, ChatMessage, IndexNowQueueItem, OutboundEmail, SEOSettings
+from .outbox import _claim_outbox_batch, deliver_outbox, queue_email
+from .sitemap_builder import SITEMAP_INDEX_NAME, build_sitemaps
+from .support_router import INDEX_VERSION_KEY, RouteResult, _load_documents
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+REDIS = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/0'}}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    @override_settings(IS_PRODUCTION=True, CACHES=LOCMEM)
+    def test_locmem_in_production_is_an_error(self):
+        self.assertEqual([e.id for e in check_shared_cache(None)], ['core.E001'])
+
+    @override_settings(IS_PRODUCTION=True, CACHES=REDIS)
+    def test_redis_in_production_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(IS_PRODUCTION=False, CACHES=LOCMEM)
+    def test_locmem_in_development_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+
+class LocalProviderTests(SimpleTestCase):
+    def setUp(self):
+        self.provider = LocalProvider()
+
+    def test_same_prompt_same_response(self):
+        first = self.provider.generate('Learn tailoring in Aba', task='module_content')
+        self.assertEqual(self.provider.generate('Learn tailoring in Aba', task='module_content'), first)
+        self.assertNotEqual(self.provider.generate('Learn welding in Kano', task='module_content'), first)
+
+    def test_json_tasks_follow_the_callers_schema(self):
+        outline = json.loads(self.provider.generate('outline', task='pathway_outline', json_output=True))
+        self.assertEqual(len(outline['modules']), 6)
+        for module in outline['modules']:
+            self.assertEqual(set(module), {'title', 'youtube_search_query', 'steps'})
+
+        quiz = json.loads(self.provider.generate('quiz', task='module_quiz', json_output=True))
+        self.assertIn(quiz['correct_answer'], 'ABCD')
+
+    def test_stream_yields_the_generated_text(self):
+        chunks = list(self.provider.stream('Hello', task='chat'))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(chunks).strip(), self.provider.generate('Hello', task='chat'))
+
+    @mock.patch('core.llm.time.sleep')
+    def test_latency_is_simulated(self, sleep):
+        LocalProvider(latency=0.5).generate('Hello')
+        sleep.assert_called_once_with(0.5)
+
+
+@override_settings(LLM_PROVIDER='local')
+class LLMProviderSelectionTests(SimpleTestCase):
+    def test_setting_selects_a_shared_provider(self):
+        provider = get_llm_provider()
+        self.assertIsInstance(provider, LocalProvider)
+        self.assertIs(get_llm_provider(), provider)
+
+    @override_settings(LLM_PROVIDER='openai')
+    def test_unknown_provider_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_llm_provider()
+
+    def test_academy_generation_runs_offline(self):
+        outline = generate_pathway_outline('learn_marketing', 'Aba', category='Tailoring')
+        self.assertEqual(len(outline['modules']), 6)
+        self.assertIn(generate_module_quiz('Pricing', 'Charge for materials and time')['correct_answer'], 'ABCD')
+
+
+@mock.patch('core.llm.genai')
+class GeminiClientRegistryTests(SimpleTestCase):
+    def setUp(self):
+        # Start from an empty registry and put the real one back afterwards
+        self.enterContext(mock.patch.dict(llm._registry, {'pid': None, 'models': {}, 'providers': {}}))
+
+    def test_models_are_shared_within_a_process(self, genai):
+        first = get_gemini_model('gemini-2.5-flash')
+        self.assertIs(get_gemini_model('gemini-2.5-flash'), first)
+        genai.configure.assert_called_once()
+        genai.GenerativeModel.assert_called_once_with('gemini-2.5-flash')
+
+        get_gemini_model('gemini-2.0-flash-exp')
+        self.assertEqual(genai.GenerativeModel.call_count, 2)
+
+    def test_forked_worker_builds_its_own_clients(self, genai):
+        get_gemini_model('gemini-2.5-flash')
+        provider = get_llm_provider()
+        with mock.patch('core.llm.os.getpid', return_value=os.getpid() + 1):
+            get_gemini_model('gemini-2.5-flash')
+            self.assertIsNot(get_llm_provider(), provider)
+        self.assertEqual(genai.configure.call_count, 2)
+        self.assertEqual(genai.GenerativeModel.call_count, 2)
+
+    @override_settings(LLM_PROVIDER='gemini', GEMINI_MODEL='gemini-2.5-flash')
+    def test_requests_reuse_the_shared_client(self, genai):
+        model = genai.GenerativeModel.return_value
+        model.generate_content.return_value.text = '{"ok": true}'
+
+        self.assertIs(get_ai_service(), get_ai_service())
+        self.assertIsInstance(get_ai_service().provider, GeminiProvider)
+        for _ in range(3):
+            self.assertEqual(get_llm_provider().generate('Hi', json_output=True, timeout=30), '{"ok": true}')
+
+        genai.GenerativeModel.assert_called_once_with('gemini-2.5-flash')
+        model.generate_content.assert_called_with(
+            'Hi', generation_config={'response_mime_type': 'application/json'}, request_options={'timeout': 30},
+        )
+
+
+@override_settings(
+    LLM_PROVIDER='local', AI_CHAT_PROMPT_TOKENS=300, AI_CHAT_SYSTEM_TOKENS=100,
+    AI_CHAT_HISTORY_TOKENS=200, AI_CHAT_SUMMARY_TOKENS=50, AI_CHAT_KEEP_RECENT_MESSAGES=2,
+)
+class ChatMemoryTests(TestCase):
+    def setUp(self):
+        self.conversation = get_conversation(None)
+        for i in range(10):
+            record_turn(self.conversation, f"question {i} " + 'x' * 200, f"answer {i} " + 'y' * 200)
+        self.conversation.refresh_from_db()
+
+    def test_prompt_stays_within_budget(self):
+        self.conversation.summary = 's' * 2000
+        prompt = AICustomerService().build_chat_prompt(
+            'How do I book?', conversation=self.conversation, grounding=['g' * 2000],
+        )
+        self.assertLessEqual(estimate_tokens(prompt), 300)
+        self.assertTrue(prompt.endswith('User: How do I book?'))
+
+    def test_worker_folds_old_turns(self):
+        self.assertGreater(self.conversation.pending_tokens, 200)
+        self.assertEqual(compact_pending_conversations(), 1)
+
+        self.conversation.refresh_from_db()
+        self.assertTrue(self.conversation.summary)
+        self.assertEqual(self.conversation.messages.filter(summarized=False).count(), 2)
+        self.assertLessEqual(self.conversation.pending_tokens, 200)
+        self.assertEqual(compact_pending_conversations(), 0)
+
+    def test_oversized_recent_turn_is_not_selected_again(self):
+        record_turn(self.conversation, 'Here is my whole CV ' + 'z' * 4000, 'Thanks, noted.')
+        self.assertEqual(compact_pending_conversations(), 1)
+
+        # The kept turns alone are over budget, but there is nothing left to fold
+        self.conversation.refresh_from_db()
+        self.assertGreater(self.conversation.pending_tokens, 200)
+        self.assertFalse(conversations_to_compact().exists())
+        self.assertEqual(compact_pending_conversations(), 0)
+
+        record_turn(self.conversation, 'One more question', 'One more answer')
+        self.assertEqual(compact_pending_conversations(), 1)
+
+    def test_prune_removes_only_idle_anonymous_chats(self):
+        stale = timezone.now() - timedelta(days=60)
+        ChatConversation.objects.filter(pk=self.conversation.pk).update(updated_at=stale)
+        fresh = get_conversation(None)
+
+        call_command('prune_chat_conversations', days=30, stdout=StringIO())
+        self.assertEqual(list(ChatConversation.objects.values_list('pk', flat=True)), [fresh.pk])
+        self.assertFalse(ChatMessage.objects.exists())
+
+
+class SupportRouterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('editor')
+
+    def test_blog_answers_carry_no_markup(self):
+        Post.objects.create(
+            author=self.author, status=Post.Status.PUBLISHED,
+            title='<img src=x onerror=alert(1)>Resetting your password',
+            body='<p>&lt;script&gt;alert(1)&lt;/script&gt;Open settings &amp; choose Security.</p>',
+        )
+        blog = next(d for d in _load_documents() if d.source == 'blog')
+        self.assertEqual(blog.title, 'Resetting your password')
+        self.assertNotIn('<', blog.answer)
+        self.assertIn('Open settings & choose Security.', blog.answer)
+
+    def test_only_published_posts_mark_the_index_stale(self):
+        version = cache.get_or_set(INDEX_VERSION_KEY, 1, timeout=None)
+        post = Post.objects.create(author=self.author, title='Draft', body='x')
+        post.body = 'y'
+        post.save()
+        self.assertEqual(cache.get(INDEX_VERSION_KEY), version)
+
+        post.status = Post.Status.PUBLISHED
+        post.save()
+        self.assertEqual(cache.get(INDEX_VERSION_KEY), version + 1)
+
+        post.status = Post.Status.DRAFT
+        post.save()
+        self.assertEqual(cache.get(INDEX_VERSION_KEY), version + 2)
+
+
+class IndexNowQueueTests(TestCase):
+    def setUp(self):
+        self.item = IndexNowQueueItem.objects.create(url='https://kiri.ng/a/', next_attempt_at=timezone.now())
+
+    def post_while_checking_lease(self, result):
+        def post(full_urls, host):
+            # The batch is leased: a second worker finds nothing due
+            self.assertEqual(_claim_indexnow_batch(), [])
+            return result
+        return mock.patch('core.indexnow.post_to_indexnow', side_effect=post)
+
+    def test_submitted_items_leave_the_queue(self):
+        with self.post_while_checking_lease((True, 200, '', None)):
+            self.assertEqual(flush_indexnow_queue(), (1, 0))
+        self.assertFalse(IndexNowQueueItem.objects.exists())
+
+    def test_failed_items_are_rescheduled_with_backoff(self):
+        with self.post_while_checking_lease((False, 429, 'Failed with status 429', 600)):
+            self.assertEqual(flush_indexnow_queue(), (0, 1))
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.attempts, 1)
+        self.assertGreater(self.item.next_attempt_at, timezone.now() + timedelta(seconds=500))
+
+
+@override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.email = queue_email('Booking confirmed', 'See you soon', ['client@example.com'])
+
+    def send_failing(self, error):
+        return mock.patch('core.outbox.EmailMultiAlternatives.send', side_effect=error)
+
+    def test_pending_email_is_sent_once(self):
+        self.assertEqual(deliver_outbox(), (1, 0, 0))
+        self.assertEqual(deliver_outbox(), (0, 0, 0))
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.status, OutboundEmail.Status.SENT)
+        self.assertEqual([m.to for m in mail.outbox], [['client@example.com']])
+
+    def test_failures_back_off_then_dead_letter(self):
+        with self.send_failing(ConnectionError('Brevo unavailable')):
+            self.assertEqual(deliver_outbox(), (0, 1, 0))
+            self.email.refresh_from_db()
+            self.assertEqual((self.email.status, self.email.attempts), (OutboundEmail.Status.PENDING, 1))
+            self.assertGreater(self.email.next_attempt_at, timezone.now())
+
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(deliver_outbox(), (0, 0, 1))
+        self.email.refresh_from_db()
+        self.assertEqual((self.email.status, self.email.attempts), (OutboundEmail.Status.DEAD, 2))
+        self.assertEqual(self.email.last_error, 'Brevo unavailable')
+
+    def test_refused_recipient_is_dead_lettered_at_once(self):
+        with self.send_failing(AnymailRecipientsRefused('refused')):
+            self.assertEqual(deliver_outbox(), (0, 0, 1))
+
+    def test_claimed_batch_is_leased(self):
+        self.assertEqual(len(_claim_outbox_batch()), 1)
+        self.assertEqual(deliver_outbox(), (0, 0, 0))
+        self.assertEqual(mail.outbox, [])
+
+
+class SEOSettingsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.enterContext(mock.patch.dict(indexnow._seo_settings, {'version': None, 'value': None}))
+
+    def test_key_file_is_served_without_queries(self):
+        SEOSettings.objects.create(indexnow_key='0123456789abcdef')
+        get_indexnow_key()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('core:indexnow-key', kwargs={'key': '0123456789abcdef'}))
+            self.assertEqual(self.client.get(reverse('core:indexnow-key', kwargs={'key': 'guess'})).status_code, 404)
+        self.assertEqual((response.status_code, response.content), (200, b'0123456789abcdef'))
+        self.assertEqual(response['Content-Type'], 'text/plain')
+
+    def test_saving_the_settings_reloads_them(self):
+        seo_settings = SEOSettings.objects.create(indexnow_key='old-key')
+        self.assertEqual(get_indexnow_key(), 'old-key')
+
+        seo_settings.indexnow_key = 'new-key'
+        seo_settings.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_indexnow_key(), 'new-key')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_seo_settings().indexnow_key, 'new-key')
+
+    @override_settings(INDEXNOW_KEY='from-environment')
+    def test_missing_settings_fall_back_to_the_configured_key(self):
+        self.assertEqual(get_indexnow_key(), 'from-environment')
+        # The missing row is remembered too
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_seo_settings())
+
+
+class ChangeTrackerTests(TestCase):
+    def test_services_of_deactivated_artisans_are_skipped(self):
+        active = Service.objects.create(artisan=User.objects.create_user('active'), title='Tailoring', description='x', price=10)
+        Service.objects.create(artisan=User.objects.create_user('gone', is_active=False), title='Welding', description='x', price=10)
+
+        urls = list(iter_changed_urls(None, timezone.now()))
+        self.assertEqual(urls, [reverse('marketplace:service-detail', kwargs={'pk': active.pk})])
+
+    def test_edited_pathways_are_resubmitted(self):
+        pathway = LearningPathway.objects.create(user=User.objects.create_user('learner'), goal='Learn tailoring')
+        url = reverse('academy:public-pathway-detail', kwargs={'pk': pathway.pk, 'slug': pathway.slug})
+        since = timezone.now()
+        self.assertNotIn(url, iter_changed_urls(since, since + timedelta(hours=1)))
+
+        LearningPathway.objects.filter(pk=pathway.pk).update(updated_at=since + timedelta(minutes=5))
+        self.assertIn(url, iter_changed_urls(since, since + timedelta(hours=1)))
+
+
+def parse_events(body):
+    """[(event, data)] from a server-sent events body."""
+    events = []
+    for frame in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in frame.split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+@override_settings(LLM_PROVIDER='local')
+@mock.patch('core.views.route_message', return_value=RouteResult())
+class AIChatStreamTests(TestCase):
+    url = reverse('core:ai-chat-stream')
+    payload = json.dumps({'message': 'How do I list a service?'})
+
+    def assert_streamed_reply(self, events):
+        self.assertEqual(events[0][0], 'start')
+        self.assertEqual(events[-1], ('done', {}))
+        deltas = [data['text'] for event, data in events[1:-1]]
+        self.assertTrue(deltas and all(event == 'delta' for event, _ in events[1:-1]))
+
+        conversation = ChatConversation.objects.get(pk=events[0][1]['conversation_id'])
+        user, reply = conversation.messages.order_by('created_at', 'id')
+        self.assertEqual(user.content, 'How do I list a service?')
+        self.assertEqual(reply.content, ''.join(deltas))
+
+    def test_reply_is_framed_as_events_and_stored(self, route):
+        response = self.client.post(self.url, self.payload, content_type='application/json')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assert_streamed_reply(parse_events(b''.join(response.streaming_content).decode()))
+
+    async def test_asgi_streams_chunk_by_chunk(self, route):
+        response = await AsyncClient().post(self.url, self.payload, content_type='application/json')
+        # An async iterator, so ASGI servers send each event as it is produced
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        await sync_to_async(self.assert_streamed_reply)(parse_events(body))
+
+    def test_model_failure_ends_with_an_error_event(self, route):
+        def failing_stream(*args, **kwargs):
+            yield 'Partial '
+            raise RuntimeError('model went away')
+
+        with mock.patch('core.ai_customer_service.AICustomerService.stream_chat_response', side_effect=failing_stream):
+            response = self.client.post(self.url, self.payload, content_type='application/json')
+            events = parse_events(b''.join(response.streaming_content).decode())
+
+        self.assertEqual([event for event, _ in events], ['start', 'delta', 'error'])
+        self.assertEqual(ChatMessage.objects.get(role=ChatMessage.Role.ASSISTANT).content, 'Partial ')
+
+    def test_disconnect_keeps_the_partial_reply(self, route):
+        response = self.client.post(self.url, self.payload, content_type='application/json')
+        stream = iter(response.streaming_content)
+        next(stream), next(stream)
+        response.close()
+        self.assertEqual(ChatMessage.objects.filter(role=ChatMessage.Role.ASSISTANT).count(), 1)
+
+
+class SitemapBuilderTests(TestCase):
+    def setUp(self):
+        self.root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.active, self.gone = User.objects.create_user('active'), User.objects.create_user('gone', is_active=False)
+        for user in (self.active, self.gone):
+            user.profile.is_verified_artisan = True
+            user.profile.save()
+        self.service = Service.objects.create(
+            artisan=self.active, title='Tailoring', description='x', price=10, image='service_images/suit.jpg',
+        )
+        self.hidden = Service.objects.create(
+            artisan=self.gone, title='Welding', description='x', price=10, image='service_images/weld.jpg',
+        )
+        self.pathway = LearningPathway.objects.create(user=self.active, goal='Learn tailoring')
+
+    def section(self, name):
+        with gzip.open(self.root / f'sitemap-{name}-1.xml.gz', 'rt', encoding='utf-8') as f:
+            return f.read()
+
+    def test_deactivated_accounts_are_left_out(self):
+        counts = build_sitemaps(self.root)
+        self.assertEqual((counts['services'], counts['artisans'], counts['service-images']), (1, 1, 1))
+
+        services = self.section('services')
+        self.assertIn(reverse('marketplace:service-detail', kwargs={'pk': self.service.pk}), services)
+        self.assertNotIn(reverse('marketplace:service-detail', kwargs={'pk': self.hidden.pk}), services)
+        artisans = self.section('artisans')
+        self.assertIn(reverse('users:artisan-storefront', kwargs={'username': 'active'}), artisans)
+        self.assertNotIn(reverse('users:artisan-storefront', kwargs={'username': 'gone'}), artisans)
+        self.assertNotIn('weld.jpg', self.section('service-images'))
+
+    def test_pathway_lastmod_follows_edits(self):
+        edited = timezone.now() + timedelta(days=3)
+        LearningPathway.objects.filter(pk=self.pathway.pk).update(updated_at=edited)
+        build_sitemaps(self.root)
+        self.assertIn(f"<lastmod>{edited.strftime('%Y-%m-%dT%H:%M:%S')}+00:00</lastmod>", self.section('pathways'))
+
+    def test_index_lists_pages_and_stale_pages_are_removed(self):
+        (self.root / 'sitemap-old-1.xml.gz').write_bytes(b'')
+        build_sitemaps(self.root)
+        index = (self.root / SITEMAP_INDEX_NAME).read_text()
+        self.assertIn('sitemap-services-1.xml.gz', index)
+        self.assertFalse((self.root / 'sitemap-old-1.xml.gz').exists())
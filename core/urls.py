@@ -11,6 +11,7 @@ urlpatterns = [
     path('contact-support/', views.contact_support, name='contact-support'),
     path('ai-support/', views.ai_support, name='ai-support'),
     path('api/ai-chat/', views.ai_chat, name='ai-chat'),
+    path('api/ai-chat/stream/', views.ai_chat_stream, name='ai-chat-stream'),
     path('api/ai-quick-help/', views.ai_quick_help, name='ai-quick-help'),
     path('<str:key>.txt', views.indexnow_key, name='indexnow-key'),
 ]
\ No newline at end of file
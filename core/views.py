@@ -1,12 +1,27 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.core.mail import send_mail
 from django.conf import settings
 from django.views.decorators.http import require_POST
-from django.http import JsonResponse
+from django.contrib.sitemaps.views import sitemap
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
 from django.views.decorators.csrf import csrf_exempt
+from django.views.static import was_modified_since
+from pathlib import Path
+import asyncio
 import json
-from .ai_customer_service import AICustomerService
+import logging
+from asgiref.sync import sync_to_async
+from .ai_customer_service import get_ai_service
+from .chat_memory import get_conversation, record_turn
+from .outbox import queue_email
+from .sitemap_builder import SITEMAP_INDEX_NAME
+from .sitemaps import SITEMAPS
+from .support_router import route_message
+
+logger = logging.getLogger(__name__)
 
 def home(request):
     return render(request, 'core/home.html', {'title': 'Kiri.ng – Empowering Artisans'})
@@ -24,12 +39,11 @@ def contact_support(request):
     message = request.POST.get('message')
     
     try:
-        send_mail(
+        queue_email(
             subject=f'Support Request from {name}',
             message=f'From: {name} ({email})\n\nMessage:\n{message}',
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[settings.DEFAULT_FROM_EMAIL],
-            fail_silently=False,
         )
         messages.success(request, 'Your message has been sent successfully! We\'ll get back to you soon.')
     except Exception as e:
@@ -49,10 +63,9 @@ def ai_chat(request):
     try:
         data = json.loads(request.body)
         user_message = data.get('message', '')
-        conversation_history = data.get('history', [])
         action = data.get('action', 'chat')
         
-        ai_service = AICustomerService()
+        ai_service = get_ai_service()
         
         if action == 'create_ticket':
             ticket_data = data.get('ticket_data', {})
@@ -65,17 +78,115 @@ def ai_chat(request):
             )
             return JsonResponse(result)
         
-        response = ai_service.get_chat_response(
-            user_message, 
-            user=request.user if request.user.is_authenticated else None,
-            conversation_history=conversation_history
-        )
+        if len(user_message) > settings.AI_CHAT_MAX_MESSAGE_CHARS:
+            return JsonResponse({'response': f'Please keep messages under {settings.AI_CHAT_MAX_MESSAGE_CHARS} characters.'}, status=400)
         
-        return JsonResponse({'response': response})
+        user = request.user if request.user.is_authenticated else None
+        conversation = get_conversation(data.get('conversation_id'), user)
+        route = route_message(user_message)
+        if route.deflected:
+            response = route.answer
+        else:
+            response = ai_service.get_chat_response(
+                user_message, 
+                user=user,
+                conversation=conversation,
+                grounding=route.snippets
+            )
+        record_turn(conversation, user_message, response, answered_locally=route.deflected)
+        
+        return JsonResponse({'response': response, 'conversation_id': str(conversation.pk)})
     except Exception as e:
         return JsonResponse({'response': f'Sorry, I encountered an error: {str(e)}'}, status=500)
 
 
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@require_POST
+def ai_chat_stream(request):
+    """Relay Kiri AI replies to the chat page as server-sent events while they are generated"""
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'response': 'Invalid request.'}, status=400)
+    
+    user_message = data.get('message', '')
+    if not user_message or len(user_message) > settings.AI_CHAT_MAX_MESSAGE_CHARS:
+        return JsonResponse({'response': f'Please send a message under {settings.AI_CHAT_MAX_MESSAGE_CHARS} characters.'}, status=400)
+    
+    user = request.user if request.user.is_authenticated else None
+    conversation = get_conversation(data.get('conversation_id'), user)
+    ai_service = get_ai_service()
+    
+    route = route_message(user_message)
+    error_message = "I'm having trouble processing your request. Please try again."
+    
+    def open_stream():
+        if route.deflected:
+            return iter([route.answer])
+        return ai_service.stream_chat_response(
+            user_message, user=user, conversation=conversation, grounding=route.snippets
+        )
+    
+    def finish(stream, chunks):
+        # Closing the provider's generator stops reading from the model
+        if hasattr(stream, 'close'):
+            stream.close()
+        if chunks:
+            record_turn(conversation, user_message, "".join(chunks), answered_locally=route.deflected)
+    
+    def events():
+        chunks = []
+        stream = None
+        yield _sse_event('start', {'conversation_id': str(conversation.pk)})
+        try:
+            stream = open_stream()
+            for chunk in stream:
+                chunks.append(chunk)
+                yield _sse_event('delta', {'text': chunk})
+            yield _sse_event('done', {})
+        except Exception as e:
+            logger.error(f"Error streaming AI chat response: {e}")
+            yield _sse_event('error', {'message': error_message})
+        finally:
+            # Also runs on GeneratorExit, when the WSGI server closes the response after a disconnect
+            finish(stream, chunks)
+    
+    async def async_events():
+        # Django reads a sync iterator whole under ASGI, so each chunk is pulled in a worker thread instead
+        chunks = []
+        stream = read = None
+        done = object()
+        yield _sse_event('start', {'conversation_id': str(conversation.pk)})
+        try:
+            stream = await sync_to_async(open_stream)()
+            while True:
+                read = asyncio.ensure_future(sync_to_async(next, thread_sensitive=False)(stream, done))
+                chunk = await asyncio.shield(read)
+                if chunk is done:
+                    break
+                chunks.append(chunk)
+                yield _sse_event('delta', {'text': chunk})
+            yield _sse_event('done', {})
+        except Exception as e:
+            logger.error(f"Error streaming AI chat response: {e}")
+            yield _sse_event('error', {'message': error_message})
+        finally:
+            # Also runs on CancelledError, raised here when the ASGI handler sees the client
+            # disconnect. A chunk still being read must arrive before the stream can be closed.
+            if read is not None and not read.done():
+                await asyncio.wait([read])
+            await sync_to_async(finish)(stream, chunks)
+    
+    asgi = isinstance(request, ASGIRequest)
+    response = StreamingHttpResponse(async_events() if asgi else events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+    return response
+
+
 @require_POST  
 def ai_quick_help(request):
     """Handle quick help requests"""
@@ -83,7 +194,7 @@ def ai_quick_help(request):
         data = json.loads(request.body)
         task_type = data.get('task_type', '')
         
-        ai_service = AICustomerService()
+        ai_service = get_ai_service()
         response = ai_service.help_with_task(
             task_type,
             user=request.user if request.user.is_authenticated else None
@@ -94,8 +205,28 @@ def ai_quick_help(request):
         return JsonResponse({'response': f'Error: {str(e)}'}, status=500)
 
 
+def sitemap_file(request, filename=SITEMAP_INDEX_NAME):
+    """Serve a pre-built sitemap file from SITEMAP_ROOT without touching the database"""
+    path = Path(settings.SITEMAP_ROOT) / filename
+    if not path.is_file():
+        if filename == SITEMAP_INDEX_NAME:
+            # Not built yet on this server; fall back to the live sitemap
+            return sitemap(request, sitemaps=SITEMAPS)
+        raise Http404
+    
+    mtime = path.stat().st_mtime
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), mtime):
+        return HttpResponseNotModified()
+    
+    content_type = 'application/xml' if filename.endswith('.xml') else 'application/gzip'
+    response = FileResponse(path.open('rb'), content_type=content_type)
+    response['Last-Modified'] = http_date(mtime)
+    patch_cache_control(response, public=True, max_age=60 * 60)
+    return response
+
+
 def indexnow_key(request, key):
-    """Serve IndexNow key verification file"""
+    """Serve IndexNow key verification file (from the cached key, never the database)"""
     from .indexnow import get_indexnow_key
     from django.http import HttpResponse
     
@@ -2,6 +2,12 @@
 ASGI config for kiriong project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server, e.g.
+
+    uvicorn kiriong.asgi:application --workers 4
+
+to get the live notification stream (notifications:stream); under WSGI that
+endpoint answers 204 and pages fall back to the badge rendered with them.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -13,4 +19,23 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kiriong.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from notifications.live import listener
+
+
+async def application(scope, receive, send):
+    if scope['type'] != 'lifespan':
+        await django_application(scope, receive, send)
+        return
+
+    # Django only speaks HTTP; answer the server's startup/shutdown handshake
+    # here and stop the live-update poller on shutdown
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await listener.stop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
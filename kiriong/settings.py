@@ -11,6 +11,27 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # --- API Keys and Secrets ---
 SECRET_KEY = config('SECRET_KEY', default='django-insecure-dev-key-change-in-production')
 GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
+GEMINI_MODEL = config('GEMINI_MODEL', default='gemini-2.5-flash')
+GEMINI_CHAT_MODEL = config('GEMINI_CHAT_MODEL', default='gemini-2.0-flash-exp')
+# 'gemini' for production, 'local' for deterministic offline load testing
+LLM_PROVIDER = config('LLM_PROVIDER', default='gemini')
+LLM_LOCAL_LATENCY = config('LLM_LOCAL_LATENCY', default=0.0, cast=float)  # simulated seconds per call
+
+# AI support chat memory (token counts are estimates, ~4 characters per token)
+AI_CHAT_PROMPT_TOKENS = 6000          # hard cap on system context + history + new message
+AI_CHAT_SYSTEM_TOKENS = 1500          # most of that budget the system context may take
+AI_CHAT_HISTORY_TOKENS = 2000         # verbatim history size that triggers summarization
+AI_CHAT_SUMMARY_TOKENS = 400          # maximum size of the rolling summary
+AI_CHAT_KEEP_RECENT_MESSAGES = 4      # turns kept verbatim after summarizing
+AI_CHAT_MAX_RECENT_MESSAGES = 20      # most verbatim messages ever sent to the model
+AI_CHAT_MAX_MESSAGE_CHARS = 2000      # longest message accepted from the client
+AI_CHAT_ANONYMOUS_RETENTION_DAYS = 30 # `manage.py prune_chat_conversations` removes idle anonymous chats after this
+
+# AI support chat retrieval (TF-IDF cosine similarity, 0-1)
+SUPPORT_ROUTER_ANSWER_THRESHOLD = config('SUPPORT_ROUTER_ANSWER_THRESHOLD', default=0.45, cast=float)  # answer locally at or above this
+SUPPORT_ROUTER_MIN_MARGIN = 0.15          # lead the best match needs over the runner-up
+SUPPORT_ROUTER_GROUNDING_THRESHOLD = 0.1   # weakest match still attached to the model prompt
+SUPPORT_ROUTER_MAX_POST_CHARS = 5000       # blog post text indexed per post
 YOUTUBE_API_KEY = config('YOUTUBE_API_KEY', default='')
 BREVO_API_KEY = config('BREVO_API_KEY', default='')
 RECAPTCHA_PUBLIC_KEY = config('RECAPTCHA_PUBLIC_KEY', default='6LeIxAcTAAAAAJcZVRqyHh71UMIEGNQ_MXjiZKhI')
@@ -163,6 +184,70 @@ else:
         }
     }
 
+# --- Cache ---
+# Set REDIS_URL in production so cached pages and counters are shared across gunicorn workers
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'kiri-ng',
+        }
+    }
+
+# --- Notifications ---
+NOTIFICATION_RETENTION_DAYS = 90     # default for `manage.py prune_notifications`
+
+# Web Push, delivered by `manage.py send_push_notifications`. Generate a key
+# with `manage.py generate_vapid_key`; pushes are off while it is empty.
+VAPID_PRIVATE_KEY = config('VAPID_PRIVATE_KEY', default='')   # base64url raw P-256 private key
+VAPID_SUBJECT = config('VAPID_SUBJECT', default='mailto:support@kiri.ng')
+PUSH_BATCH_SIZE = 100                # queued notifications claimed per worker pass
+PUSH_SEND_CONCURRENCY = 8            # parallel requests to push services
+PUSH_TTL_SECONDS = 60 * 60 * 24      # how long push services hold a message for an offline device
+PUSH_BACKOFF_SECONDS = 30            # first retry delay after a 429/5xx, doubled per attempt
+PUSH_MAX_ATTEMPTS = 5
+PUSH_LEASE_SECONDS = 300             # a worker owns the batch it claimed this long
+# Subscription endpoints must be on one of these hosts or a subdomain (FCM,
+# Mozilla autopush, Apple, WNS); anything else is refused so the worker never
+# POSTs to an address a client chose
+PUSH_SERVICE_HOSTS = ['fcm.googleapis.com', 'push.services.mozilla.com', 'push.apple.com', 'notify.windows.com']
+
+# Live updates (notifications:stream, needs an ASGI server)
+# Pages open the stream only when this is on; turn it on once the site is served by kiriong.asgi
+NOTIFICATION_STREAM_ENABLED = config('NOTIFICATION_STREAM_ENABLED', default=False, cast=bool)
+NOTIFICATION_STREAM_POLL_SECONDS = 2       # how often each process checks for changes
+NOTIFICATION_STREAM_HEARTBEAT_SECONDS = 25 # keep-alive comment on idle streams, under typical proxy timeouts
+
+# --- Reverse geocoding (location verification) ---
+GEOCODER_BOUNDARIES_PATH = config('GEOCODER_BOUNDARIES_PATH', default=str(BASE_DIR / 'users' / 'data' / 'nigeria_lgas.geojson.gz'))
+GEOCODER_GRID_DECIMALS = 3           # cache cell size, ~110 m at 3 decimal places
+GEOCODER_NOMINATIM_TIMEOUT = 5       # seconds; the fallback never holds a worker longer
+GEOCODER_NOMINATIM_WAIT = 2          # seconds to wait for the 1 request/second Nominatim slot
+
+# --- Referrals ---
+REFERRAL_LEADERBOARD_SIZE = 100      # rows kept by `manage.py refresh_referral_leaderboard`
+REFERRAL_TREE_MAX_DEPTH = 5          # levels followed for network sizes and the referral network page
+
+# --- Sitemaps ---
+# Built by `manage.py build_sitemaps` and served from disk at /sitemap.xml
+SITEMAP_ROOT = config('SITEMAP_ROOT', default=str(BASE_DIR / 'sitemaps'))
+
+# --- IndexNow ---
+INDEXNOW_BATCH_SIZE = 10000          # most URLs IndexNow accepts in one POST
+INDEXNOW_COALESCE_SECONDS = 60       # repeat edits to a URL within this window are submitted once
+INDEXNOW_BACKOFF_SECONDS = 60        # first retry delay after a 429 or failure, doubled per attempt
+INDEXNOW_MAX_BACKOFF_SECONDS = 60 * 60 * 6
+INDEXNOW_MAX_ATTEMPTS = 8            # failed URLs are dropped (and logged) after this many tries
+INDEXNOW_LEASE_SECONDS = 120         # a worker owns the batch it claimed this long (covers the POST timeouts)
+
 # --- CKEditor ---
 CKEDITOR_5_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 CKEDITOR_5_FILE_UPLOAD_PERMISSION = 'authenticated'  # Allow authenticated users to upload
@@ -230,6 +315,12 @@ MEDIA_ROOT = BASE_DIR / 'media'
 EMAIL_BACKEND = 'anymail.backends.brevo.EmailBackend'
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='nwokikeonyeka@gmail.com')
 ANYMAIL = {"BREVO_API_KEY": BREVO_API_KEY}
+# Outbox drained by `manage.py send_outbox_emails`; requests never wait on Brevo
+EMAIL_OUTBOX_BATCH_SIZE = 50          # emails claimed per worker pass, sent over one connection
+EMAIL_OUTBOX_BACKOFF_SECONDS = 60     # first retry delay, doubled per attempt
+EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = 60 * 60
+EMAIL_OUTBOX_MAX_ATTEMPTS = 8         # then the email is dead-lettered for review in the admin
+EMAIL_OUTBOX_LEASE_SECONDS = 300      # a worker owns the batch it claimed this long
 
 # --- Cloudinary ---
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
@@ -1,26 +1,12 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
-from django.contrib.sitemaps.views import sitemap
 from users.auth_forms import CustomLoginForm
 from blog.upload_views import custom_upload_file
-from core.sitemaps import (
-    StaticViewSitemap,
-    BlogPostSitemap,
-    ServiceSitemap,
-    ArtisanProfileSitemap,
-    LearningPathwaySitemap
-)
-
-sitemaps = {
-    'static': StaticViewSitemap,
-    'blog': BlogPostSitemap,
-    'services': ServiceSitemap,
-    'artisans': ArtisanProfileSitemap,
-    'pathways': LearningPathwaySitemap,
-}
+from core.views import sitemap_file
+from notifications.views import push_subscribe
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -36,12 +22,15 @@ urlpatterns = [
     path('blog/', include('blog.urls')),
     path("ckeditor5/", include('django_ckeditor_5.urls')),
     path('notifications/', include('notifications.urls', namespace='notifications')),
+    path('api/push-subscribe/', push_subscribe, name='push-subscribe'),
     
     # Allauth now handles ALL account management correctly and finds all your styled templates.
     path('accounts/', include('allauth.urls')),
     
     # SEO URL
-    path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
+    # Pre-built by `manage.py build_sitemaps`
+    path('sitemap.xml', sitemap_file, name='django.contrib.sitemaps.views.sitemap'),
+    re_path(r'^(?P<filename>sitemap-[\w-]+\.xml\.gz)$', sitemap_file, name='sitemap-page'),
 ]
 
 if settings.DEBUG:
@@ -20,7 +20,7 @@ class Service(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, help_text=_("Price in NGN"))
     image = models.ImageField(upload_to='service_images/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = 'Service'
@@ -1,3 +1,36 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+
+from core.models import PlatformStatsSnapshot
+from core.platform_stats import STATS_CACHE_KEY
+from core.testing import without_static_manifest
+
+
+@without_static_manifest
+class HomePageStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_home_page_shows_platform_stats(self):
+        response = self.client.get(reverse('core:home'))
+        self.assertEqual(response.context['platform_stats']['total_services'], 0)
+        self.assertContains(response, 'verified artisans')
+
+    def test_refresh_command_corrects_the_cached_stats(self):
+        User.objects.create_user('artisan')
+        PlatformStatsSnapshot.objects.update_or_create(pk=1, defaults={'total_users': 40})
+        cache.set(STATS_CACHE_KEY, {'total_users': 40})
+
+        call_command('refresh_platform_stats', stdout=StringIO())
+        self.assertEqual(cache.get(STATS_CACHE_KEY)['total_users'], 1)
+        self.assertEqual(PlatformStatsSnapshot.objects.get(pk=1).total_users, 1)
+        self.assertEqual(self.client.get(reverse('core:home')).context['platform_stats']['total_users'], 1)
 
-# Create your tests here.
+    def test_service_list_does_not(self):
+        response = self.client.get(reverse('marketplace:service-list'))
+        self.assertNotIn('platform_stats', response.context)
@@ -9,10 +9,13 @@ from .forms import ServiceForm, BookingForm
 from django.db.models import Count, Q
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from django.core.mail import send_mail
+from django.db import transaction
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
+from notifications.grouping import notify
 from notifications.models import Notification   # ✅ Added import
+from core.outbox import queue_email
+from core.platform_stats import get_platform_stats
 
 
 class ServiceListView(generic.ListView):
@@ -49,6 +52,9 @@ class ServiceListView(generic.ListView):
         context = super().get_context_data(**kwargs)
         context['categories'] = Category.objects.all()
         context['active_category'] = self.kwargs.get('category_slug')
+        if self.request.resolver_match.url_name == 'home':
+            # The site's home page is this list served at '/'; only it shows the platform totals
+            context['platform_stats'] = get_platform_stats()
         
         from users.models import Profile
         states = Profile.objects.exclude(state='').values_list('state', flat=True).distinct().order_by('state')
@@ -101,31 +107,34 @@ class ServiceDetailView(generic.DetailView):
                 booking.customer_name = request.user.get_full_name()
                 booking.customer_email = request.user.email
 
-            booking.save()
-
-            # ✅ Create a notification for the artisan
-            Notification.objects.create(
-                recipient=self.object.artisan,
-                message=_(f"You have a new booking request for '{self.object.title}' from {booking.customer_name}."),
-                link=reverse('marketplace:service-detail', kwargs={'pk': self.object.pk})
-            )
-
-            # --- existing email sending logic ---
-            subject = _("New Booking Request")
-            context = {
-                "booking": booking,
-                "artisan_name": self.object.artisan.get_full_name() or self.object.artisan.username,
-                "service_title": self.object.title
-            }
-            html_message = render_to_string("marketplace/booking_notification_email.html", context)
-            plain_message = strip_tags(html_message)
-            send_mail(
-                subject,
-                plain_message,
-                None,  # from email (uses DEFAULT_FROM_EMAIL)
-                [self.object.artisan.email],
-                html_message=html_message,
-            )
+            # The booking, the artisan's notification and email commit together
+            with transaction.atomic():
+                booking.save()
+
+                # ✅ Create a notification for the artisan
+                notify(
+                    recipient=self.object.artisan,
+                    message=_(f"You have a new booking request for '{self.object.title}' from {booking.customer_name}."),
+                    link=reverse('marketplace:service-detail', kwargs={'pk': self.object.pk}),
+                    verb=Notification.Verb.BOOKING,
+                    target=self.object,
+                )
+
+                # --- booking email, sent by the outbox worker ---
+                subject = _("New Booking Request")
+                context = {
+                    "booking": booking,
+                    "artisan_name": self.object.artisan.get_full_name() or self.object.artisan.username,
+                    "service_title": self.object.title
+                }
+                html_message = render_to_string("marketplace/booking_notification_email.html", context)
+                plain_message = strip_tags(html_message)
+                queue_email(
+                    subject,
+                    plain_message,
+                    [self.object.artisan.email],
+                    html_message=html_message,
+                )
 
             messages.success(request, _("Your booking request has been sent! The artisan will contact you shortly."))
             return redirect('marketplace:service-detail', pk=self.object.pk)
@@ -1,3 +1,22 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import PushQueueItem, PushSubscription
+
+
+@admin.register(PushSubscription)
+class PushSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'endpoint', 'created_at', 'last_success_at']
+    search_fields = ['user__username', 'endpoint']
+    readonly_fields = ['user', 'endpoint', 'p256dh', 'auth', 'created_at', 'last_success_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(PushQueueItem)
+class PushQueueItemAdmin(admin.ModelAdmin):
+    list_display = ['notification', 'queued_at', 'next_attempt_at', 'attempts']
+    readonly_fields = ['notification', 'queued_at', 'next_attempt_at', 'attempts']
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,45 @@
+"""
+Per-user unread notification counts, kept in the cache so the navbar badge
+costs no query on ordinary page views.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from .live import announce_change
+
+UNREAD_COUNT_TIMEOUT = 60 * 10
+
+
+def _key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def get_unread_count(user):
+    """Return the user's unread count, counting from the database only on a cache miss."""
+    from .models import Notification
+
+    key = _key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(recipient=user, is_read=False).count()
+        cache.set(key, count, UNREAD_COUNT_TIMEOUT)
+    return count
+
+
+def increment_unread_count(user_id, delta=1):
+    """Adjust a cached count after commit (a missing count is left to be recounted) and tell open streams."""
+    def apply():
+        try:
+            if cache.incr(_key(user_id), delta) < 0:
+                cache.delete(_key(user_id))
+        except ValueError:
+            pass
+
+    transaction.on_commit(apply)
+    announce_change(user_id)
+
+
+def reset_unread_count(user_id):
+    """Drop the cached count so the next read recounts it (use after bulk updates)."""
+    transaction.on_commit(lambda: cache.delete(_key(user_id)))
+    announce_change(user_id)
@@ -0,0 +1,74 @@
+"""
+Merges repeated events into one unread notification per recipient, verb
+and target, so ten comments on a post are one inbox row instead of ten.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .live import announce_change
+from .models import Notification
+from .webpush import push_enabled, queue_push
+
+# Each retry needs another request to open or read the group in between,
+# so a few rounds are plenty; past that something else is wrong
+GROUP_WRITE_ATTEMPTS = 3
+
+
+def _open_group(recipient, verb, content_type, object_id):
+    return Notification.objects.filter(
+        recipient=recipient,
+        verb=verb,
+        target_content_type=content_type,
+        target_object_id=object_id,
+        is_read=False,
+    )
+
+
+def _merge(recipient, group, fields):
+    if not group.update(**fields):
+        return False
+    announce_change(recipient.pk)
+    if push_enabled():
+        # Re-announce the group with its new count; the device replaces the old push
+        queue_push(group.values_list('pk', flat=True).first())
+    return True
+
+
+def notify(recipient, message, link=None, verb=Notification.Verb.OTHER, target=None):
+    """
+    Record an event for `recipient`. With a verb, an unread notification for
+    the same verb and target absorbs the event in a single UPDATE (latest
+    message and link, actor_count + 1, moved to the top of the inbox); only
+    the first event of a group INSERTs a row. Returns True if a row was created.
+    """
+    if not verb:
+        Notification.objects.create(recipient=recipient, message=message, link=link)
+        return True
+
+    content_type = ContentType.objects.get_for_model(target) if target is not None else None
+    object_id = target.pk if target is not None else None
+    group = _open_group(recipient, verb, content_type, object_id)
+    merge = dict(actor_count=F('actor_count') + 1, message=message, link=link, created_at=timezone.now())
+
+    # A concurrent request can open the group between our UPDATE and INSERT
+    # (IntegrityError), and it can be read again before we retry the UPDATE,
+    # so alternate a few times until one of them lands
+    for attempt in range(GROUP_WRITE_ATTEMPTS):
+        if _merge(recipient, group, merge):
+            return False
+        try:
+            with transaction.atomic():
+                Notification.objects.create(
+                    recipient=recipient,
+                    verb=verb,
+                    target_content_type=content_type,
+                    target_object_id=object_id,
+                    message=message,
+                    link=link,
+                )
+            return True
+        except IntegrityError:
+            if attempt == GROUP_WRITE_ATTEMPTS - 1:
+                raise
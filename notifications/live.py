@@ -0,0 +1,102 @@
+"""
+Live notification updates over server-sent events (notifications:stream).
+
+Idle streams never touch the database. Every notification change bumps a
+shared change sequence in the cache and records it against the recipient.
+One poller per server process reads that sequence; only when it moves does
+it look up which connected users changed and wake just their streams.
+A thousand idle connections therefore cost one cache read per poll interval.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CHANGE_SEQ_KEY = 'notifications:live:seq'
+USER_CHANGE_TIMEOUT = 60 * 60
+
+
+def _user_key(user_id):
+    return f'notifications:live:user:{user_id}'
+
+
+def announce_change(user_id):
+    """Wake the user's open streams once the current transaction commits."""
+    def apply():
+        try:
+            seq = cache.incr(CHANGE_SEQ_KEY)
+        except ValueError:
+            seq = 1
+            cache.set(CHANGE_SEQ_KEY, seq, timeout=None)
+        cache.set(_user_key(user_id), seq, USER_CHANGE_TIMEOUT)
+
+    transaction.on_commit(apply)
+
+
+class ChangeListener:
+    """Per-process fan-out from the shared change sequence to open streams."""
+
+    def __init__(self):
+        self._waiters = {}   # user_id -> set of asyncio.Event, one per open stream
+        self._seen = {}      # user_id -> last change sequence delivered
+        self._task = None
+        # The poller decides to exit and subscribe decides whether to start
+        # one under this lock, so a new stream never finds a poller on its way out
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._waiters.setdefault(user_id, set()).add(event)
+            if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+                self._task = loop.create_task(self._poll())
+        return event
+
+    def unsubscribe(self, user_id, event):
+        with self._lock:
+            waiters = self._waiters.get(user_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._waiters[user_id]
+                    self._seen.pop(user_id, None)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _keep_polling(self):
+        """True while streams are open; otherwise the poller gives up its slot and exits."""
+        with self._lock:
+            if self._waiters:
+                return True
+            if self._task is asyncio.current_task():
+                self._task = None
+            return False
+
+    async def _poll(self):
+        last_seq = await cache.aget(CHANGE_SEQ_KEY)
+        while self._keep_polling():
+            await asyncio.sleep(settings.NOTIFICATION_STREAM_POLL_SECONDS)
+            seq = await cache.aget(CHANGE_SEQ_KEY)
+            if seq == last_seq:
+                continue
+            last_seq = seq
+
+            with self._lock:
+                keys = {_user_key(user_id): user_id for user_id in self._waiters}
+            changes = await cache.aget_many(list(keys))
+            with self._lock:
+                for key, user_seq in changes.items():
+                    user_id = keys[key]
+                    if user_seq != self._seen.get(user_id):
+                        self._seen[user_id] = user_seq
+                        for event in self._waiters.get(user_id, ()):
+                            event.set()
+
+
+listener = ChangeListener()
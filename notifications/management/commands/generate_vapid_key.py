@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from notifications.webpush import generate_vapid_key
+
+
+class Command(BaseCommand):
+    help = 'Generate a VAPID key pair for Web Push'
+
+    def handle(self, *args, **options):
+        private_key, public_key = generate_vapid_key()
+        self.stdout.write(f"VAPID_PRIVATE_KEY={private_key}")
+        self.stdout.write(f"Public key (sent to browsers automatically): {public_key}")
+        self.stdout.write(self.style.WARNING('Changing the key invalidates every existing browser subscription.'))
@@ -0,0 +1,54 @@
+import gzip
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.models import Notification
+
+# Every column, so an archived row can be restored as it was
+ARCHIVE_FIELDS = [
+    'id', 'recipient_id', 'verb', 'target_content_type_id', 'target_object_id',
+    'actor_count', 'message', 'link', 'is_read', 'created_at',
+]
+
+
+class Command(BaseCommand):
+    help = 'Delete (optionally archiving first) notifications older than N days, in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS, help='Keep notifications newer than this')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows deleted per transaction')
+        parser.add_argument('--include-unread', action='store_true', help='Also remove old notifications that were never read')
+        parser.add_argument('--archive', metavar='PATH', help='Append removed rows to this gzip JSON-lines file first')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        old = Notification.objects.filter(created_at__lt=cutoff)
+        if not options['include_unread']:
+            old = old.filter(is_read=True)
+
+        archive = gzip.open(options['archive'], 'at', encoding='utf-8') if options['archive'] else None
+        removed = 0
+        try:
+            while True:
+                with transaction.atomic():
+                    rows = list(
+                        old.order_by('pk').values(*ARCHIVE_FIELDS)[:options['chunk_size']]
+                    )
+                    if not rows:
+                        break
+                    if archive:
+                        for row in rows:
+                            archive.write(json.dumps(row, default=str) + '\n')
+                    Notification.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+                removed += len(rows)
+                self.stdout.write(f"Removed {removed} notifications so far")
+        finally:
+            if archive:
+                archive.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} notifications older than {options['days']} days"))
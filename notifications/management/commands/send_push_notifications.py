@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.webpush import deliver_push_queue, push_enabled
+
+
+class Command(BaseCommand):
+    help = 'Send queued notifications to subscribed browsers with Web Push'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running and send new notifications every --interval seconds')
+        parser.add_argument('--interval', type=int, default=5, help='Seconds between passes with --loop')
+
+    def handle(self, *args, **options):
+        if not push_enabled():
+            self.stdout.write(self.style.WARNING('VAPID_PRIVATE_KEY is not set; push notifications are off'))
+            return
+
+        while True:
+            sent, rescheduled, pruned = deliver_push_queue()
+            if sent or rescheduled or pruned:
+                self.stdout.write(f"Sent {sent} pushes, rescheduled {rescheduled} notifications, pruned {pruned} subscriptions")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Push queue delivered'))
@@ -1,9 +1,25 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 from django.utils.translation import gettext_lazy as _
 
 class Notification(models.Model):
+    class Verb(models.TextChoices):
+        OTHER = '', _('Other')
+        COMMENT = 'comment', _('Comment')
+        BOOKING = 'booking', _('Booking request')
+        REFERRAL = 'referral', _('Referral signup')
+
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    verb = models.CharField(max_length=20, choices=Verb.choices, default=Verb.OTHER, blank=True)
+    # What the notification is about (a post, a service, ...); unread
+    # notifications with the same verb and target are merged into one row
+    target_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
+    target_object_id = models.PositiveBigIntegerField(null=True, blank=True)
+    target = GenericForeignKey('target_content_type', 'target_object_id')
+    actor_count = models.PositiveIntegerField(default=1, help_text=_("Number of events merged into this notification"))
     message = models.TextField()
     link = models.URLField(blank=True, null=True, help_text=_("Link to the relevant page"))
     is_read = models.BooleanField(default=False)
@@ -11,6 +27,49 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Unread badge, dropdown and read-marking
+            models.Index(fields=['recipient', 'is_read', 'created_at']),
+            # Keyset-paginated inbox
+            models.Index(fields=['recipient', '-created_at', '-id']),
+        ]
+        constraints = [
+            # At most one open group per recipient, verb and target
+            models.UniqueConstraint(
+                fields=['recipient', 'verb', 'target_content_type', 'target_object_id'],
+                condition=Q(is_read=False) & ~Q(verb=''),
+                name='unique_unread_notification_group',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Notification for {self.recipient.username}: {self.message[:30]}"
+
+    @property
+    def others_count(self):
+        """Events merged into this one besides the latest, whose text is in `message`."""
+        return self.actor_count - 1
+
+
+class PushSubscription(models.Model):
+    """A browser's Web Push subscription (PushSubscription.toJSON() from static/js/custom.js)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='push_subscriptions')
+    endpoint = models.URLField(max_length=1000, unique=True)
+    p256dh = models.CharField(max_length=255, help_text=_("Browser's public ECDH key, base64url"))
+    auth = models.CharField(max_length=64, help_text=_("Browser's auth secret, base64url"))
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_success_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Push subscription for {self.user.username}"
+
+
+class PushQueueItem(models.Model):
+    """A notification waiting for `manage.py send_push_notifications`; one row per notification."""
+    notification = models.OneToOneField(Notification, on_delete=models.CASCADE, related_name='push_queue_item')
+    queued_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
 
     def __str__(self):
-        return f"Notification for {self.recipient.username}: {self.message[:30]}"
\ No newline at end of file
+        return f"Push for notification {self.notification_id}"
@@ -0,0 +1,123 @@
+"""
+A local stand-in for a browser push service, for tests and development.
+
+LocalPushService listens on 127.0.0.1, hands out subscriptions with fresh
+browser-side keys, checks the VAPID header and decrypts every message it
+receives, so the whole delivery path runs without a browser or the network:
+
+    with LocalPushService() as service:
+        PushSubscription.objects.create(user=user, **service.subscribe())
+        deliver_push_queue()
+        service.messages  # [{'token': ..., 'headers': ..., 'payload': {...}}]
+"""
+import json
+import os
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from .webpush import _hkdf, _public_bytes, b64url_decode, b64url_encode
+
+
+def decrypt_payload(body, private_key, auth_secret):
+    """Reverse webpush.encrypt_payload() for a single-record aes128gcm body."""
+    salt, key_length = body[:16], body[20]
+    sender_public, ciphertext = body[21:21 + key_length], body[21 + key_length:]
+    sender_key = ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256R1(), sender_public)
+    shared_secret = private_key.exchange(ec.ECDH(), sender_key)
+
+    ikm = _hkdf(auth_secret, shared_secret, b'WebPush: info\x00' + _public_bytes(private_key) + sender_public, 32)
+    cek = _hkdf(salt, ikm, b'Content-Encoding: aes128gcm\x00', 16)
+    nonce = _hkdf(salt, ikm, b'Content-Encoding: nonce\x00', 12)
+    plaintext = AESGCM(cek).decrypt(nonce, ciphertext, None).rstrip(b'\x00')
+    return plaintext[:-1]  # drop the \x02 last-record delimiter
+
+
+class LocalPushService:
+    def __init__(self, port=0):
+        self.subscriptions = {}  # token -> (private key, auth secret)
+        # token -> HTTP status to answer with instead of 201 (e.g. 410 to simulate an expired subscription)
+        self.responses = {}
+        self.messages = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def subscribe(self):
+        """Create a subscription; returns the PushSubscription fields (endpoint, p256dh, auth)."""
+        token = secrets.token_urlsafe(16)
+        private_key = ec.generate_private_key(ec.SECP256R1())
+        auth_secret = os.urandom(16)
+        self.subscriptions[token] = (private_key, auth_secret)
+        return {
+            'endpoint': f"{self.url}/push/{token}",
+            'p256dh': b64url_encode(_public_bytes(private_key)),
+            'auth': b64url_encode(auth_secret),
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _receive(self, token, headers, body):
+        if token not in self.subscriptions:
+            return 404
+        if token in self.responses:
+            return self.responses[token]
+        if not _valid_vapid(headers.get('Authorization', ''), self.url):
+            return 403
+        private_key, auth_secret = self.subscriptions[token]
+        try:
+            payload = json.loads(decrypt_payload(body, private_key, auth_secret))
+        except Exception:
+            return 400
+        with self._lock:
+            self.messages.append({'token': token, 'headers': dict(headers), 'payload': payload})
+        return 201
+
+    def _handler_class(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                token = self.path.rsplit('/', 1)[-1]
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                self.send_response(service._receive(token, self.headers, body))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def _valid_vapid(authorization, audience):
+    """Check a `vapid t=<jwt>, k=<public key>` header the way a push service would."""
+    try:
+        fields = dict(part.strip().split('=', 1) for part in authorization[len('vapid '):].split(','))
+        public_key = ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256R1(), b64url_decode(fields['k']))
+        jwt.decode(fields['t'], public_key, algorithms=['ES256'], audience=audience)
+        return authorization.startswith('vapid ')
+    except (KeyError, ValueError, jwt.InvalidTokenError):
+        return False
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .counters import increment_unread_count, reset_unread_count
+from .models import Notification
+from .webpush import queue_push
+
+
+@receiver(post_save, sender=Notification)
+def count_new_notification(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created and not instance.is_read:
+        increment_unread_count(instance.recipient_id)
+        queue_push(instance.pk)
+    elif not created:
+        # Saving an existing row may have flipped is_read
+        reset_unread_count(instance.recipient_id)
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    if not instance.is_read:
+        increment_unread_count(instance.recipient_id, -1)
@@ -1,3 +1,359 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+from unittest import mock
+from datetime import timedelta
+from io import StringIO
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import grouping
+from .counters import get_unread_count
+from .grouping import notify
+from .live import ChangeListener, announce_change
+from core.pagination import decode_cursor, encode_cursor
+from core.testing import without_static_manifest
+
+from .models import Notification, PushQueueItem, PushSubscription
+from .push_sink import LocalPushService
+from .webpush import _claim_push_batch, deliver_push_queue, generate_vapid_key
+
+VAPID_PRIVATE_KEY = generate_vapid_key()[0]
+
+
+@override_settings(VAPID_PRIVATE_KEY=VAPID_PRIVATE_KEY)
+class PushSubscribeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('subscriber', password='x')
+        self.client.force_login(self.user)
+
+    def subscribe(self, fields):
+        body = {'endpoint': fields['endpoint'], 'keys': {'p256dh': fields['p256dh'], 'auth': fields['auth']}}
+        return self.client.post(reverse('push-subscribe'), json.dumps(body), content_type='application/json')
+
+    def test_endpoints_off_known_push_services_are_refused(self):
+        for endpoint in [
+            'https://169.254.169.254/latest/meta-data',
+            'https://fcm.googleapis.com.attacker.example/x',
+            'https://user@fcm.googleapis.com/x',
+            'http://fcm.googleapis.com/fcm/send/x',
+        ]:
+            response = self.subscribe({'endpoint': endpoint, 'p256dh': 'a', 'auth': 'b'})
+            self.assertEqual(response.status_code, 400, endpoint)
+        self.assertFalse(PushSubscription.objects.exists())
+
+    def test_known_push_service_is_accepted(self):
+        response = self.subscribe({'endpoint': 'https://fcm.googleapis.com/fcm/send/abc', 'p256dh': 'a', 'auth': 'b'})
+        self.assertEqual(response.status_code, 201)
+
+    @override_settings(DEBUG=True, PUSH_SERVICE_HOSTS=['127.0.0.1'])
+    def test_subscription_receives_pushes(self):
+        with LocalPushService() as service:
+            self.assertEqual(self.subscribe(service.subscribe()).status_code, 201)
+            with self.captureOnCommitCallbacks(execute=True):
+                notify(self.user, 'Your booking was confirmed', link='/bookings/1/')
+
+            self.assertEqual(deliver_push_queue(), (1, 0, 0))
+        self.assertEqual(service.messages[0]['payload']['body'], 'Your booking was confirmed')
+        self.assertFalse(PushQueueItem.objects.exists())
+
+    @override_settings(DEBUG=True, PUSH_SERVICE_HOSTS=['127.0.0.1'])
+    def test_failed_push_is_leased_then_rescheduled(self):
+        with LocalPushService() as service:
+            fields = service.subscribe()
+            service.responses[fields['endpoint'].rsplit('/', 1)[-1]] = 503
+            PushSubscription.objects.create(user=self.user, **fields)
+            with self.captureOnCommitCallbacks(execute=True):
+                notify(self.user, 'Hello')
+
+            items = _claim_push_batch()
+            self.assertEqual(len(items), 1)
+            # Leased: neither a second claim nor a worker pass sees it until the lease ends
+            self.assertEqual(_claim_push_batch(), [])
+            self.assertEqual(deliver_push_queue(), (0, 0, 0))
+
+            PushQueueItem.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(deliver_push_queue(), (0, 1, 0))
+        item = PushQueueItem.objects.get()
+        self.assertEqual(item.attempts, 1)
+        self.assertGreater(item.next_attempt_at, timezone.now())
+
+    @override_settings(DEBUG=True, PUSH_SERVICE_HOSTS=['127.0.0.1'])
+    def test_stored_foreign_endpoint_is_pruned_unsent(self):
+        with LocalPushService() as service:
+            fields = service.subscribe()
+            PushSubscription.objects.create(user=self.user, **fields)
+            with self.settings(PUSH_SERVICE_HOSTS=['fcm.googleapis.com']):
+                with self.captureOnCommitCallbacks(execute=True):
+                    notify(self.user, 'Hello')
+                self.assertEqual(deliver_push_queue(), (0, 0, 1))
+        self.assertEqual(service.messages, [])
+        self.assertFalse(PushSubscription.objects.exists())
+
+
+@without_static_manifest
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('reader')
+        self.client.force_login(self.user)
+
+    def notify(self, message, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.create(recipient=self.user, message=message, **kwargs)
+
+    def test_count_is_cached_and_moved_by_changes(self):
+        self.notify('First')
+        self.assertEqual(get_unread_count(self.user), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.user), 1)
+
+        self.notify('Second')
+        self.notify('Already seen', is_read=True)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.user), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('notifications:notification-list'))
+        self.assertEqual(get_unread_count(self.user), 0)
+
+    def test_pages_show_the_badge_without_reading_notifications(self):
+        self.notify('Ada requested a booking')
+        get_unread_count(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('core:home'))
+        self.assertEqual(response.context['unread_notification_count'], 1)
+        self.assertNotIn('Ada requested a booking', response.content.decode())
+        self.assertContains(response, f'data-url="{reverse("notifications:dropdown")}"')
+        self.assertFalse([q for q in queries.captured_queries if Notification._meta.db_table in q['sql']])
+
+    def test_dropdown_lists_the_latest_unread(self):
+        for i in range(7):
+            self.notify(f'Event {i}')
+        self.notify('Read event', is_read=True)
+
+        response = self.client.get(reverse('notifications:dropdown'))
+        self.assertEqual([n.message for n in response.context['notifications']], [f'Event {i}' for i in range(6, 1, -1)])
+        self.assertNotContains(response, 'Read event')
+
+    def test_dropdown_needs_a_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('notifications:dropdown')).status_code, 302)
+
+
+@without_static_manifest
+class NotificationInboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='x')
+        self.client.force_login(self.user)
+        Notification.objects.bulk_create([
+            Notification(recipient=self.user, message=f'Event {i}') for i in range(45)
+        ])
+        # Ties on created_at must still page by pk
+        Notification.objects.update(created_at=timezone.now())
+
+    def test_cursor_pages_cover_every_notification_once(self):
+        url, seen = reverse('notifications:notification-list'), []
+        response = self.client.get(url)
+        while True:
+            seen.extend(n.pk for n in response.context['notifications'])
+            cursor = response.context['next_cursor']
+            if not cursor:
+                break
+            response = self.client.get(url, {'before': cursor})
+        self.assertEqual(seen, sorted(Notification.objects.values_list('pk', flat=True), reverse=True))
+        self.assertFalse(Notification.objects.filter(is_read=False).exists())
+
+    def test_cursor_round_trip_and_garbage(self):
+        notification = Notification.objects.first()
+        self.assertEqual(decode_cursor(encode_cursor(notification)), (notification.created_at, notification.pk))
+        for garbage in ['', 'abc', '1.2.3', '99999999999999999999999.1']:
+            self.assertIsNone(decode_cursor(garbage))
+
+
+class PruneNotificationsTests(TestCase):
+    def test_only_read_notifications_past_retention_are_removed(self):
+        user = User.objects.create_user('reader')
+        old = timezone.now() - timedelta(days=settings.NOTIFICATION_RETENTION_DAYS + 1)
+        recent = timezone.now() - timedelta(days=settings.NOTIFICATION_RETENTION_DAYS - 1)
+        for message, is_read, created_at in (
+            ('old read', True, old), ('old unread', False, old), ('recent read', True, recent),
+        ):
+            Notification.objects.filter(pk=Notification.objects.create(recipient=user, message=message).pk).update(
+                is_read=is_read, created_at=created_at,
+            )
+
+        call_command('prune_notifications', stdout=StringIO())
+        self.assertEqual(
+            sorted(Notification.objects.values_list('message', flat=True)), ['old unread', 'recent read'],
+        )
+
+    def test_archive_keeps_every_column(self):
+        user = User.objects.create_user('archived')
+        notify(user, 'First comment', verb=Notification.Verb.REFERRAL, target=user)
+        notify(user, 'Second comment', verb=Notification.Verb.REFERRAL, target=user)
+        Notification.objects.update(is_read=True, created_at=timezone.now() - timedelta(days=400))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'archive.jsonl.gz')
+            call_command('prune_notifications', days=90, archive=path, stdout=StringIO())
+            with gzip.open(path, 'rt') as archive:
+                rows = [json.loads(line) for line in archive]
+
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['verb'], Notification.Verb.REFERRAL)
+        self.assertEqual(rows[0]['target_object_id'], user.pk)
+        self.assertIsNotNone(rows[0]['target_content_type_id'])
+        self.assertEqual(rows[0]['actor_count'], 2)
+
+
+class NotificationGroupingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('author')
+        self.target = User.objects.create_user('commenter')
+
+    def notify(self, message):
+        return notify(self.user, message, link='/x/', verb=Notification.Verb.REFERRAL, target=self.target)
+
+    def test_repeat_events_merge_into_one_unread_row(self):
+        self.assertTrue(self.notify('First'))
+        self.assertFalse(self.notify('Second'))
+        notification = Notification.objects.get()
+        self.assertEqual((notification.message, notification.actor_count), ('Second', 2))
+
+    def test_read_group_starts_a_new_one(self):
+        self.notify('First')
+        Notification.objects.update(is_read=True)
+        self.assertTrue(self.notify('Second'))
+        self.assertEqual(Notification.objects.filter(is_read=False).get().actor_count, 1)
+
+    def test_group_read_during_a_race_still_records_the_event(self):
+        self.notify('First')
+        real_merge, calls = grouping._merge, []
+
+        def racing_merge(recipient, group, fields):
+            calls.append(1)
+            if len(calls) == 1:
+                return False  # our UPDATE ran before the other request's INSERT
+            Notification.objects.update(is_read=True)  # the recipient reads it before we retry
+            return real_merge(recipient, group, fields)
+
+        with mock.patch.object(grouping, '_merge', side_effect=racing_merge):
+            self.assertTrue(self.notify('Second'))
+        self.assertEqual(Notification.objects.filter(is_read=False).get().message, 'Second')
+
+    def test_retries_are_bounded(self):
+        self.notify('First')
+        with mock.patch.object(grouping, '_merge', return_value=False) as merge:
+            with self.assertRaises(IntegrityError):
+                self.notify('Second')
+        self.assertEqual(merge.call_count, grouping.GROUP_WRITE_ATTEMPTS)
+        self.assertEqual(Notification.objects.get().message, 'First')
+
+
+@without_static_manifest
+class NotificationStreamTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('listener'))
+
+    def test_pages_do_not_open_the_stream_by_default(self):
+        self.assertNotContains(self.client.get(reverse('core:home')), 'data-stream-url')
+
+    @override_settings(NOTIFICATION_STREAM_ENABLED=True)
+    def test_pages_open_the_stream_when_enabled(self):
+        self.assertContains(self.client.get(reverse('core:home')), f'data-stream-url="{reverse("notifications:stream")}"')
+
+    def test_wsgi_requests_get_no_stream(self):
+        with self.settings(NOTIFICATION_STREAM_ENABLED=True):
+            self.assertEqual(self.client.get(reverse('notifications:stream')).status_code, 204)
+
+
+def next_event(events):
+    return asyncio.wait_for(anext(events), timeout=5)
+
+
+@override_settings(NOTIFICATION_STREAM_ENABLED=True, NOTIFICATION_STREAM_POLL_SECONDS=0.01)
+class NotificationEventStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('listener')
+        self.enterContext(mock.patch('notifications.views.listener', ChangeListener()))
+
+    def notify(self, message, **kwargs):
+        # Streams are woken by the commit, which TestCase never reaches
+        with self.captureOnCommitCallbacks(execute=True):
+            notify(self.user, message, **kwargs)
+
+    async def open_stream(self, **headers):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('notifications:stream'), headers=headers)
+        self.assertEqual((response['Content-Type'], response['Cache-Control']), ('text/event-stream', 'no-cache'))
+        return aiter(response.streaming_content)
+
+    async def test_count_then_each_change(self):
+        events = await self.open_stream()
+        self.assertEqual(await next_event(events), b'event: unread\ndata: {"count": 0}\n\n')
+
+        await sync_to_async(self.notify)('Ada requested a booking', link='/bookings/1/', verb=Notification.Verb.BOOKING)
+        notification = await Notification.objects.aget()
+        self.assertEqual(await next_event(events), b'event: unread\ndata: {"count": 1}\n\n')
+        self.assertEqual(await next_event(events), (
+            f'id: {encode_cursor(notification)}\nevent: booking\n'
+            f'data: {{"id": {notification.pk}, "verb": "booking", "message": "Ada requested a booking", '
+            f'"link": "/bookings/1/", "actor_count": 1}}\n\n'
+        ).encode())
+
+    async def test_reconnect_resumes_after_last_event_id(self):
+        for message in ('First', 'Second'):
+            await sync_to_async(self.notify)(message, verb='')
+        first = await Notification.objects.aget(message='First')
+
+        events = await self.open_stream(**{'Last-Event-ID': encode_cursor(first)})
+        self.assertEqual(await next_event(events), b'event: unread\ndata: {"count": 2}\n\n')
+        self.assertIn(b'"message": "Second"', await next_event(events))
+
+
+@override_settings(NOTIFICATION_STREAM_POLL_SECONDS=0.01)
+class ChangeListenerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.listener = ChangeListener()
+
+    async def announce(self, user_id):
+        # Let the poller read the starting sequence first
+        await asyncio.sleep(0.05)
+        await sync_to_async(announce_change)(user_id)
+
+    async def test_change_wakes_only_that_users_streams(self):
+        ada, bob = self.listener.subscribe(1), self.listener.subscribe(2)
+        await self.announce(1)
+        await asyncio.wait_for(ada.wait(), timeout=5)
+        self.assertFalse(bob.is_set())
+        await self.listener.stop()
+
+    async def test_stream_opened_after_the_poller_exits_gets_a_new_one(self):
+        first = self.listener.subscribe(1)
+        poller = self.listener._task
+        self.listener.unsubscribe(1, first)
+        await asyncio.wait_for(poller, timeout=5)
+        self.assertIsNone(self.listener._task)
+
+        second = self.listener.subscribe(1)
+        self.assertFalse(self.listener._task.done())
+        await self.announce(1)
+        await asyncio.wait_for(second.wait(), timeout=5)
+        await self.listener.stop()
 
-# Create your tests here.
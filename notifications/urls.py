@@ -5,4 +5,6 @@ app_name = 'notifications'
 
 urlpatterns = [
     path('', views.NotificationListView.as_view(), name='notification-list'),
-]
\ No newline at end of file
+    path('dropdown/', views.notification_dropdown, name='dropdown'),
+    path('stream/', views.notification_stream, name='stream'),
+]
@@ -1,16 +1,160 @@
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q
 from django.shortcuts import render, redirect
 from django.views import generic
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from .models import Notification
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+from core.pagination import decode_cursor, encode_cursor
+from .counters import get_unread_count, reset_unread_count
+from .live import listener
+from .models import Notification, PushSubscription
+from .webpush import is_push_service_endpoint
+
 
 class NotificationListView(LoginRequiredMixin, generic.ListView):
+    """
+    Inbox with keyset pagination on (created_at, pk). Only the notifications
+    shown on the page being viewed are marked read.
+    """
     model = Notification
     template_name = 'notifications/notification_list.html'
     context_object_name = 'notifications'
+    page_size = 20
 
     def get_queryset(self):
-        # Mark all unread notifications as read when the user visits this page
-        unread_notifications = Notification.objects.filter(recipient=self.request.user, is_read=False)
-        unread_notifications.update(is_read=True)
-        # Return all notifications for the user
-        return Notification.objects.filter(recipient=self.request.user)
\ No newline at end of file
+        queryset = (
+            Notification.objects.filter(recipient=self.request.user)
+            .only('id', 'message', 'link', 'is_read', 'created_at', 'actor_count')
+            .order_by('-created_at', '-pk')
+        )
+        cursor = decode_cursor(self.request.GET.get('before', ''))
+        if cursor:
+            created_at, pk = cursor
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+        return queryset
+
+    def get(self, request, *args, **kwargs):
+        # Fetch one extra row to know whether an older page exists
+        rows = list(self.get_queryset()[:self.page_size + 1])
+        notifications, has_next = rows[:self.page_size], len(rows) > self.page_size
+
+        # Rows keep their unread styling for this render; they are read from now on
+        unread_ids = [n.pk for n in notifications if not n.is_read]
+        if unread_ids and Notification.objects.filter(pk__in=unread_ids, is_read=False).update(is_read=True):
+            reset_unread_count(request.user.pk)
+
+        self.object_list = notifications
+        context = self.get_context_data(
+            next_cursor=encode_cursor(notifications[-1]) if has_next else None,
+        )
+        return self.render_to_response(context)
+
+
+@login_required
+def notification_dropdown(request):
+    """The latest unread notifications for the navbar bell, fetched when it is opened"""
+    notifications = (
+        Notification.objects.filter(recipient=request.user, is_read=False)
+        .only('message', 'link', 'created_at', 'actor_count')[:5]
+    )
+    return render(request, 'notifications/dropdown_items.html', {'notifications': notifications})
+
+
+@require_POST
+def push_subscribe(request):
+    """Store the browser's push subscription, POSTed as JSON by static/js/custom.js"""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    try:
+        data = json.loads(request.body)
+        endpoint, p256dh, auth = data['endpoint'], data['keys']['p256dh'], data['keys']['auth']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Invalid subscription.'}, status=400)
+    if not all(isinstance(value, str) for value in (endpoint, p256dh, auth)) or len(endpoint) > 1000 or len(p256dh) > 255 or len(auth) > 64:
+        return JsonResponse({'error': 'Invalid subscription.'}, status=400)
+    # The worker POSTs to this URL, so only known push services are accepted
+    if not is_push_service_endpoint(endpoint):
+        return JsonResponse({'error': 'Invalid subscription.'}, status=400)
+
+    # A browser's endpoint follows whoever is logged in on it now
+    PushSubscription.objects.update_or_create(
+        endpoint=endpoint, defaults={'user': request.user, 'p256dh': p256dh, 'auth': auth}
+    )
+    return JsonResponse({'status': 'subscribed'}, status=201)
+
+
+STREAM_BATCH_SIZE = 20
+
+
+def _sse_event(event, data, event_id=None):
+    prefix = f"id: {event_id}\n" if event_id else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _pending_updates(user, cursor):
+    """Unread notifications created or merged after the cursor (oldest first), and the unread count"""
+    created_at, pk = cursor
+    notifications = list(
+        Notification.objects.filter(recipient=user, is_read=False)
+        .filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+        .only('id', 'verb', 'message', 'link', 'actor_count', 'created_at')
+        .order_by('created_at', 'pk')[:STREAM_BATCH_SIZE]
+    )
+    return notifications, get_unread_count(user)
+
+
+async def _notification_events(user, cursor):
+    wake = listener.subscribe(user.pk)
+    last_count = None
+    try:
+        while True:
+            # Cleared before reading so a change that lands mid-query wakes us again
+            wake.clear()
+            notifications, count = await sync_to_async(_pending_updates)(user, cursor)
+            if count != last_count:
+                last_count = count
+                yield _sse_event('unread', {'count': count})
+            for notification in notifications:
+                cursor = (notification.created_at, notification.pk)
+                event = 'booking' if notification.verb == Notification.Verb.BOOKING else 'notification'
+                yield _sse_event(event, {
+                    'id': notification.pk,
+                    'verb': notification.verb,
+                    'message': notification.message,
+                    'link': notification.link,
+                    'actor_count': notification.actor_count,
+                }, event_id=encode_cursor(notification))
+            if len(notifications) == STREAM_BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=settings.NOTIFICATION_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+    finally:
+        listener.unsubscribe(user.pk, wake)
+
+
+async def notification_stream(request):
+    """
+    Server-sent events with the unread count (`unread`) and each new or merged
+    notification (`booking` for booking requests, `notification` otherwise).
+    Merged notifications keep their id but move forward in time, so the stream
+    resumes from Last-Event-ID on the inbox's (created_at, id) key.
+    """
+    user = await request.auser()
+    # Only an ASGI server can hold the stream open (see kiriong/asgi.py); EventSource stops retrying on 204
+    if not user.is_authenticated or not settings.NOTIFICATION_STREAM_ENABLED or not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    cursor = decode_cursor(request.headers.get('Last-Event-ID', '')) or (timezone.now(), 0)
+    response = StreamingHttpResponse(_notification_events(user, cursor), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+    return response
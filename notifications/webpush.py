@@ -0,0 +1,286 @@
+"""
+Web Push delivery for the service worker's `push` handler.
+
+Messages are signed with VAPID (RFC 8292) and encrypted with aes128gcm
+(RFC 8291) using the cryptography and PyJWT packages already installed.
+New notifications are queued in PushQueueItem and sent by
+`manage.py send_push_notifications`, never from the request that created them.
+"""
+import base64
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+import jwt
+import requests
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RECORD_SIZE = 4096
+MAX_BODY_CHARS = 500                 # keeps every payload inside one 4 KB record
+VAPID_TOKEN_LIFETIME = 60 * 60 * 12  # push services reject tokens valid for more than 24h
+GONE_STATUSES = {404, 410}           # the subscription expired or was revoked
+
+# Per-process VAPID key and signed tokens per push service origin
+_vapid = {'source': None, 'private_key': None, 'public_key': '', 'tokens': {}}
+
+
+def b64url_encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def b64url_decode(value):
+    return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+
+
+def _hkdf(salt, ikm, info, length):
+    return HKDF(algorithm=hashes.SHA256(), length=length, salt=salt, info=info).derive(ikm)
+
+
+def _public_bytes(private_key):
+    return private_key.public_key().public_bytes(serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint)
+
+
+def generate_vapid_key():
+    """Return a new (private, public) VAPID key pair as base64url strings."""
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    private_value = private_key.private_numbers().private_value.to_bytes(32, 'big')
+    return b64url_encode(private_value), b64url_encode(_public_bytes(private_key))
+
+
+def push_enabled():
+    return bool(settings.VAPID_PRIVATE_KEY)
+
+
+def is_push_service_endpoint(endpoint):
+    """True if endpoint is a plain URL on a known push service (PUSH_SERVICE_HOSTS)."""
+    try:
+        parts = urlsplit(endpoint)
+        host = (parts.hostname or '').lower()
+        parts.port  # raises ValueError for a malformed port
+    except ValueError:
+        return False
+    # Push services are always HTTPS; plain HTTP only for a local stand-in while developing
+    if parts.scheme != 'https' and not (settings.DEBUG and parts.scheme == 'http'):
+        return False
+    if parts.username or parts.password:
+        return False
+    return any(host == allowed or host.endswith(f'.{allowed}') for allowed in settings.PUSH_SERVICE_HOSTS)
+
+
+def _load_vapid_key():
+    if _vapid['source'] != settings.VAPID_PRIVATE_KEY:
+        private_key = ec.derive_private_key(int.from_bytes(b64url_decode(settings.VAPID_PRIVATE_KEY), 'big'), ec.SECP256R1())
+        _vapid.update(
+            source=settings.VAPID_PRIVATE_KEY,
+            private_key=private_key,
+            public_key=b64url_encode(_public_bytes(private_key)),
+            tokens={},
+        )
+    return _vapid['private_key']
+
+
+def get_vapid_public_key():
+    """The applicationServerKey browsers subscribe with, or '' while push is off."""
+    if not push_enabled():
+        return ''
+    _load_vapid_key()
+    return _vapid['public_key']
+
+
+def vapid_authorization(endpoint):
+    """Authorization header for an endpoint; one token is reused per push service until it nears expiry."""
+    private_key = _load_vapid_key()
+    parts = urlsplit(endpoint)
+    audience = f"{parts.scheme}://{parts.netloc}"
+    token, expires = _vapid['tokens'].get(audience, (None, 0))
+    now = int(time.time())
+    if expires - now < 60 * 60:
+        expires = now + VAPID_TOKEN_LIFETIME
+        token = jwt.encode({'aud': audience, 'exp': expires, 'sub': settings.VAPID_SUBJECT}, private_key, algorithm='ES256')
+        _vapid['tokens'][audience] = (token, expires)
+    return f"vapid t={token}, k={_vapid['public_key']}"
+
+
+def encrypt_payload(payload, p256dh, auth):
+    """Encrypt bytes for one subscription as a single aes128gcm record (RFC 8291)."""
+    receiver_public = b64url_decode(p256dh)
+    receiver_key = ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256R1(), receiver_public)
+    sender_key = ec.generate_private_key(ec.SECP256R1())
+    sender_public = _public_bytes(sender_key)
+    shared_secret = sender_key.exchange(ec.ECDH(), receiver_key)
+
+    ikm = _hkdf(b64url_decode(auth), shared_secret, b'WebPush: info\x00' + receiver_public + sender_public, 32)
+    salt = os.urandom(16)
+    cek = _hkdf(salt, ikm, b'Content-Encoding: aes128gcm\x00', 16)
+    nonce = _hkdf(salt, ikm, b'Content-Encoding: nonce\x00', 12)
+    # \x02 marks the last (and only) record
+    ciphertext = AESGCM(cek).encrypt(nonce, payload + b'\x02', None)
+    return salt + RECORD_SIZE.to_bytes(4, 'big') + bytes([len(sender_public)]) + sender_public + ciphertext
+
+
+def build_payload(notification):
+    """The JSON the service worker's push handler reads (title, body, url, tag)."""
+    body = notification.message
+    if notification.others_count:
+        body = f"{body} (+{notification.others_count} more)"
+    return json.dumps({
+        'title': 'Kiri.ng',
+        'body': body[:MAX_BODY_CHARS],
+        'url': notification.link or '/',
+        # A grouped notification replaces its earlier push on the device
+        'tag': f'notification-{notification.pk}',
+    }).encode()
+
+
+def send_web_push(session, subscription, payload, topic=None):
+    """POST one encrypted message. Returns the push service's status code, or None on a network error."""
+    if not is_push_service_endpoint(subscription.endpoint):
+        # Stored before the host check existed, or the allowed hosts changed
+        logger.warning(f"Push subscription {subscription.pk} is not on a known push service")
+        return 410
+    try:
+        body = encrypt_payload(payload, subscription.p256dh, subscription.auth)
+    except ValueError as e:
+        # Keys the browser never could have produced; nothing will ever be delivered
+        logger.warning(f"Invalid keys on push subscription {subscription.pk}: {e}")
+        return 410
+
+    headers = {
+        'Authorization': vapid_authorization(subscription.endpoint),
+        'Content-Encoding': 'aes128gcm',
+        'Content-Type': 'application/octet-stream',
+        'TTL': str(settings.PUSH_TTL_SECONDS),
+        'Urgency': 'normal',
+    }
+    if topic:
+        headers['Topic'] = topic
+    try:
+        # Never follow a redirect away from the push service
+        return session.post(subscription.endpoint, data=body, headers=headers, timeout=10, allow_redirects=False).status_code
+    except requests.RequestException as e:
+        logger.warning(f"Error sending push to subscription {subscription.pk}: {e}")
+        return None
+
+
+def queue_push(notification_id):
+    """Queue a notification for push delivery once the current transaction commits."""
+    from .models import PushQueueItem
+
+    if not push_enabled():
+        return
+    transaction.on_commit(lambda: PushQueueItem.objects.bulk_create(
+        [PushQueueItem(notification_id=notification_id, next_attempt_at=timezone.now())],
+        ignore_conflicts=True,
+    ))
+
+
+def _backoff_delay(attempts):
+    return settings.PUSH_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0)
+
+
+def _claim_push_batch():
+    """
+    Lease up to PUSH_BATCH_SIZE due queue items to this worker by pushing
+    their next_attempt_at PUSH_LEASE_SECONDS ahead; the row locks last only
+    for this short transaction. Items a crashed worker leased become due
+    again when the lease runs out.
+    """
+    from .models import PushQueueItem
+
+    with transaction.atomic():
+        now = timezone.now()
+        items = list(
+            PushQueueItem.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(next_attempt_at__lte=now)
+            .select_related('notification')
+            .order_by('next_attempt_at')[:settings.PUSH_BATCH_SIZE]
+        )
+        PushQueueItem.objects.filter(pk__in=[item.pk for item in items]).update(
+            next_attempt_at=now + timedelta(seconds=settings.PUSH_LEASE_SECONDS)
+        )
+    return items
+
+
+def deliver_push_queue(max_batches=None):
+    """
+    Send due queued notifications to every subscription of their recipients,
+    PUSH_BATCH_SIZE notifications per pass over one keep-alive connection pool.
+    Subscriptions the push service reports gone are deleted. A notification
+    that hit a 429, 5xx or network error is retried with exponential backoff;
+    devices that already received it just replace it (same tag). Requests are
+    sent outside any transaction; see _claim_push_batch().
+    Returns (sent, rescheduled, pruned).
+    """
+    from .models import PushQueueItem, PushSubscription
+
+    sent = rescheduled = pruned = batches = 0
+    concurrency = settings.PUSH_SEND_CONCURRENCY
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        session.mount('https://', HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency))
+
+        while max_batches is None or batches < max_batches:
+            items = _claim_push_batch()
+            if not items:
+                break
+            batches += 1
+
+            # Read before the worker got to them: nothing to announce
+            notifications = [item.notification for item in items if not item.notification.is_read]
+            subscriptions = {}
+            for subscription in PushSubscription.objects.filter(user_id__in={n.recipient_id for n in notifications}):
+                subscriptions.setdefault(subscription.user_id, []).append(subscription)
+
+            jobs = [(n, subscription) for n in notifications for subscription in subscriptions.get(n.recipient_id, [])]
+            statuses = pool.map(
+                lambda job: send_web_push(session, job[1], build_payload(job[0]), topic=f"n{job[0].pk}"),
+                jobs,
+            )
+
+            delivered, gone, failed = set(), set(), set()
+            for (notification, subscription), status in zip(jobs, statuses):
+                if status is not None and 200 <= status < 300:
+                    delivered.add(subscription.pk)
+                    sent += 1
+                elif status in GONE_STATUSES:
+                    gone.add(subscription.pk)
+                elif status is None or status == 429 or status >= 500:
+                    failed.add(notification.pk)
+                else:
+                    # 400/413 and the like: resending the same request would fail again
+                    logger.warning(f"Push service rejected notification {notification.pk} with status {status}")
+
+            retry = []
+            for item in items:
+                if item.notification_id not in failed:
+                    continue
+                if item.attempts + 1 >= settings.PUSH_MAX_ATTEMPTS:
+                    logger.warning(f"Dropped push for notification {item.notification_id} after {settings.PUSH_MAX_ATTEMPTS} attempts")
+                    continue
+                item.attempts += 1
+                item.next_attempt_at = timezone.now() + timedelta(seconds=_backoff_delay(item.attempts))
+                retry.append(item)
+
+            with transaction.atomic():
+                if delivered:
+                    PushSubscription.objects.filter(pk__in=delivered).update(last_success_at=timezone.now())
+                if gone:
+                    PushSubscription.objects.filter(pk__in=gone).delete()
+                    pruned += len(gone)
+                PushQueueItem.objects.bulk_update(retry, ['attempts', 'next_attempt_at'])
+                PushQueueItem.objects.filter(pk__in=[item.pk for item in items]).exclude(pk__in=[item.pk for item in retry]).delete()
+            rescheduled += len(retry)
+
+    return sent, rescheduled, pruned
@@ -60,9 +60,11 @@ function requestNotificationPermission() {
 }
 
 function subscribeToPushNotifications() {
-    if ('serviceWorker' in navigator && 'PushManager' in window) {
+    // Rendered by base.html only when the server has a VAPID key configured
+    const vapidMeta = document.querySelector('meta[name="vapid-public-key"]');
+    if (vapidMeta && 'serviceWorker' in navigator && 'PushManager' in window) {
         navigator.serviceWorker.ready.then(registration => {
-            const vapidPublicKey = 'BEl62iUYgUivxIkv69yViEuiBIa-Ib9-SkvMeAtA3LFgDhVxRr6-sWBkGGk0kqMG8dUG0gk5cGfE1RmJqzqBQqg';
+            const vapidPublicKey = vapidMeta.content;
             
             registration.pushManager.subscribe({
                 userVisibleOnly: true,
@@ -296,6 +298,92 @@ document.addEventListener('DOMContentLoaded', function () {
     if (loadingIndicator) setTimeout(() => window.location.reload(), 7000);
 
 
+    // =============================
+    // YouTube Facades (load iframe on click)
+    // =============================
+    document.querySelectorAll('.yt-facade').forEach(facade => {
+        const btn = facade.querySelector('button.yt-facade-btn');
+        if (!btn) return;
+        btn.addEventListener('click', function () {
+            const iframe = document.createElement('iframe');
+            iframe.src = `https://www.youtube.com/embed/${facade.dataset.ytId}?autoplay=1`;
+            iframe.title = facade.dataset.title || 'YouTube video player';
+            iframe.setAttribute('frameborder', '0');
+            iframe.setAttribute('allow', 'accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture');
+            iframe.setAttribute('allowfullscreen', '');
+            facade.replaceChildren(iframe);
+        });
+    });
+
+
+    // =============================
+    // Notification Dropdown (loaded when first opened)
+    // =============================
+    const notificationDropdown = document.getElementById('notification-dropdown');
+    if (notificationDropdown) {
+        const initialPlaceholder = document.getElementById('notification-dropdown-items');
+        const placeholderTemplate = initialPlaceholder ? initialPlaceholder.cloneNode(true) : null;
+
+        notificationDropdown.addEventListener('show.bs.dropdown', function () {
+            const placeholder = document.getElementById('notification-dropdown-items');
+            if (!placeholder) return;
+            fetch(placeholder.dataset.url, { credentials: 'same-origin' })
+                .then(response => response.ok ? response.text() : Promise.reject(response.status))
+                .then(html => { placeholder.outerHTML = html; })
+                .catch(error => console.error('Error loading notifications:', error));
+        });
+
+        // =============================
+        // Live Notification Updates (server-sent events)
+        // =============================
+        // Put the placeholder back so the next open fetches the new items
+        const resetDropdownItems = () => {
+            const loaded = notificationDropdown.querySelectorAll('[data-notification-item]');
+            if (!loaded.length || !placeholderTemplate) return;
+            loaded[0].before(placeholderTemplate.cloneNode(true));
+            loaded.forEach(item => item.remove());
+        };
+
+        if (window.EventSource && notificationDropdown.dataset.streamUrl) {
+            const stream = new EventSource(notificationDropdown.dataset.streamUrl);
+            const badge = document.getElementById('notification-badge');
+
+            stream.addEventListener('unread', event => {
+                const { count } = JSON.parse(event.data);
+                if (badge) {
+                    badge.textContent = count;
+                    badge.classList.toggle('d-none', count === 0);
+                }
+                resetDropdownItems();
+            });
+
+            stream.addEventListener('booking', event => {
+                const alerts = document.getElementById('live-booking-alerts');
+                if (!alerts) return;
+                const data = JSON.parse(event.data);
+                const alert = document.createElement('div');
+                alert.className = 'alert alert-info alert-dismissible fade show';
+                alert.setAttribute('role', 'alert');
+                const text = data.link ? document.createElement('a') : document.createElement('span');
+                text.textContent = data.actor_count > 1 ? `${data.message} (+${data.actor_count - 1} more)` : data.message;
+                if (data.link) text.href = data.link;
+                const close = document.createElement('button');
+                close.type = 'button';
+                close.className = 'btn-close';
+                close.setAttribute('data-bs-dismiss', 'alert');
+                close.setAttribute('aria-label', 'Close');
+                alert.append(text, close);
+                // A merged booking replaces its earlier alert
+                const previous = alerts.querySelector(`[data-notification-id="${data.id}"]`);
+                alert.dataset.notificationId = data.id;
+                previous ? previous.replaceWith(alert) : alerts.prepend(alert);
+            });
+
+            window.addEventListener('pagehide', () => stream.close());
+        }
+    }
+
+
     // =============================
     // Button Click Visual Feedback
     // =============================
@@ -1,9 +1,10 @@
 from allauth.socialaccount.adapter import DefaultSocialAccountAdapter
 from allauth.account.adapter import DefaultAccountAdapter
+from allauth.core import context as allauth_context
+from django.contrib.sites.shortcuts import get_current_site
 from django.contrib.auth.models import User
-from .models import Profile
-from notifications.models import Notification
-from django.utils.translation import gettext_lazy as _
+from .referrals import attribute_session_referral
+from core.outbox import queue_message
 
 
 class CustomSocialAccountAdapter(DefaultSocialAccountAdapter):
@@ -24,32 +25,7 @@ class CustomSocialAccountAdapter(DefaultSocialAccountAdapter):
     def save_user(self, request, sociallogin, form=None):
         """Save social login user and handle referral username"""
         user = super().save_user(request, sociallogin, form)
-        
-        referral_code = request.session.get('referral_code')
-        if referral_code:
-            try:
-                # Try to find referrer by username (new system) or referral_code (legacy)
-                try:
-                    referrer_user = User.objects.get(username=referral_code)
-                except User.DoesNotExist:
-                    referrer_profile = Profile.objects.get(referral_code=referral_code)
-                    referrer_user = referrer_profile.user
-                
-                profile, created = Profile.objects.get_or_create(user=user)
-                
-                if not profile.referred_by:
-                    profile.referred_by = referrer_user
-                    profile.save()
-                    
-                    Notification.objects.create(
-                        recipient=referrer_user,
-                        message=_(f"Congratulations! {user.username or user.email} signed up using your referral link.")
-                    )
-                    
-                del request.session['referral_code']
-            except (User.DoesNotExist, Profile.DoesNotExist):
-                pass
-        
+        attribute_session_referral(request, user)
         return user
 
 
@@ -66,3 +42,14 @@ class CustomAccountAdapter(DefaultAccountAdapter):
     def is_safe_url(self, url):
         """Override to allow custom redirects"""
         return super().is_safe_url(url)
+
+    def send_mail(self, template_prefix, email, context):
+        """Queue allauth's emails (confirmation, password reset) in the outbox instead of sending inline"""
+        request = allauth_context.request
+        ctx = {
+            "request": request,
+            "email": email,
+            "current_site": get_current_site(request),
+        }
+        ctx.update(context)
+        queue_message(self.render_mail(template_prefix, email, ctx))
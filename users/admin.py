@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Profile, SocialMediaLink, Certificate
+from .models import Profile, ReferralLeaderboardEntry, SocialMediaLink, Certificate
 
 class SocialMediaLinkInline(admin.TabularInline):
     model = SocialMediaLink
@@ -17,7 +17,7 @@ class ProfileAdmin(admin.ModelAdmin):
     Admin configuration for the Profile model.
     """
     # This tells the admin what columns to show in the list of profiles.
-    list_display = ('user', 'is_verified_artisan', 'state', 'city')
+    list_display = ('user', 'is_verified_artisan', 'state', 'city', 'referral_count')
     
     # This adds a filter sidebar to easily find users.
     list_filter = ('is_verified_artisan', 'state')
@@ -31,4 +31,14 @@ class ProfileAdmin(admin.ModelAdmin):
 class SocialMediaLinkAdmin(admin.ModelAdmin):
     list_display = ('profile', 'platform', 'url', 'is_primary')
     list_filter = ('platform', 'is_primary')
-    search_fields = ('profile__user__username', 'url')
\ No newline at end of file
+    search_fields = ('profile__user__username', 'url')
+
+@admin.register(ReferralLeaderboardEntry)
+class ReferralLeaderboardEntryAdmin(admin.ModelAdmin):
+    """Read-only view of the leaderboard; rebuild it with `manage.py refresh_referral_leaderboard`."""
+    list_display = ('rank', 'user', 'direct_referrals', 'network_size', 'refreshed_at')
+    search_fields = ('user__username',)
+    readonly_fields = ('rank', 'user', 'direct_referrals', 'network_size', 'refreshed_at')
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,23 @@
+import time
+
+from django.core.cache import cache
+
+STOREFRONT_FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+
+def _storefront_version_key(user_id):
+    return f'users:storefront:{user_id}:version'
+
+
+def get_storefront_version(user_id):
+    """
+    Content version of an artisan's storefront sections: the Unix time of the
+    last profile, service, certificate, social link or pathway change.
+    Part of the storefront's fragment cache keys.
+    """
+    return cache.get_or_set(_storefront_version_key(user_id), time.time(), timeout=None)
+
+
+def bump_storefront_version(user_id):
+    """Orphan the cached storefront sections of an artisan."""
+    cache.set(_storefront_version_key(user_id), time.time(), timeout=None)
@@ -0,0 +1,171 @@
+"""
+Reverse geocoding for artisan location verification.
+
+reverse_geocode() tries, in order:
+1. the shared cache, keyed on a grid cell of rounded coordinates
+2. point-in-polygon against the Nigerian LGA boundaries in
+   GEOCODER_BOUNDARIES_PATH (see `manage.py import_lga_boundaries`)
+3. Nominatim, at most one request per second site-wide, with a strict timeout
+
+Most lookups are answered by 1 or 2 without leaving the process.
+"""
+import gzip
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_TIMEOUT = 60 * 60 * 24 * 30
+NOMINATIM_URL = 'https://nominatim.openstreetmap.org/reverse'
+NOMINATIM_LOCK_KEY = 'geocoding:nominatim:lock'
+NIGERIA_BBOX = (2.6, 4.2, 14.7, 13.9)  # min lon, min lat, max lon, max lat
+
+
+@dataclass(frozen=True)
+class Place:
+    city: str
+    state: str
+    source: str  # 'cache', 'boundaries' or 'nominatim'
+
+
+def _cell_key(latitude, longitude):
+    decimals = settings.GEOCODER_GRID_DECIMALS
+    return f"geocoding:cell:{decimals}:{round(latitude, decimals)}:{round(longitude, decimals)}"
+
+
+# ---------------------------------------------------------------------------
+# Offline boundaries
+# ---------------------------------------------------------------------------
+
+def _in_ring(x, y, ring):
+    """Ray casting: is (x, y) inside the closed ring [[x, y], ...]?"""
+    inside = False
+    x1, y1 = ring[-1]
+    for x2, y2 in ring:
+        if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+            inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+def _in_polygon(x, y, polygon):
+    # First ring is the outline, the rest are holes
+    return _in_ring(x, y, polygon[0]) and not any(_in_ring(x, y, hole) for hole in polygon[1:])
+
+
+class BoundaryIndex:
+    """LGA polygons with bounding boxes, so a lookup only ray-casts the few candidates."""
+
+    def __init__(self, features):
+        self.areas = []
+        for feature in features:
+            geometry = feature['geometry']
+            polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+            xs = [x for polygon in polygons for x, _ in polygon[0]]
+            ys = [y for polygon in polygons for _, y in polygon[0]]
+            properties = feature['properties']
+            self.areas.append(((min(xs), min(ys), max(xs), max(ys)), polygons, properties['lga'], properties['state']))
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        opener = gzip.open if path.suffix == '.gz' else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            return cls(json.load(f)['features'])
+
+    def lookup(self, latitude, longitude):
+        """Return (lga, state) containing the point, or None."""
+        for (min_x, min_y, max_x, max_y), polygons, lga, state in self.areas:
+            if min_x <= longitude <= max_x and min_y <= latitude <= max_y:
+                if any(_in_polygon(longitude, latitude, polygon) for polygon in polygons):
+                    return lga, state
+        return None
+
+
+# Loaded once per process on first use; False when no boundary file is installed
+_boundaries = {'index': None}
+
+
+def get_boundary_index():
+    if _boundaries['index'] is None:
+        path = Path(settings.GEOCODER_BOUNDARIES_PATH)
+        if path.exists():
+            _boundaries['index'] = BoundaryIndex.load(path)
+            logger.info(f"Loaded {len(_boundaries['index'].areas)} LGA boundaries from {path}")
+        else:
+            logger.warning(f"No LGA boundary file at {path}; reverse geocoding falls back to Nominatim")
+            _boundaries['index'] = False
+    return _boundaries['index'] or None
+
+
+# ---------------------------------------------------------------------------
+# Nominatim fallback
+# ---------------------------------------------------------------------------
+
+def _acquire_nominatim_slot():
+    """Wait up to GEOCODER_NOMINATIM_WAIT seconds for the site-wide one-request-per-second slot."""
+    deadline = time.monotonic() + settings.GEOCODER_NOMINATIM_WAIT
+    while True:
+        if cache.add(NOMINATIM_LOCK_KEY, 1, timeout=1):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.2)
+
+
+def _nominatim_lookup(latitude, longitude):
+    if not _acquire_nominatim_slot():
+        logger.warning("Nominatim rate limit reached; reverse geocoding skipped")
+        return None
+    try:
+        response = requests.get(
+            NOMINATIM_URL,
+            params={'format': 'json', 'lat': latitude, 'lon': longitude, 'zoom': 18},
+            headers={'User-Agent': 'Kiri.ng/1.0'},
+            timeout=settings.GEOCODER_NOMINATIM_TIMEOUT,
+        )
+        response.raise_for_status()
+        address_data = response.json().get('address', {})
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f"Nominatim reverse geocoding failed: {e}")
+        return None
+
+    city = (
+        address_data.get('city') or address_data.get('village') or
+        address_data.get('county') or address_data.get('town') or
+        address_data.get('locality') or address_data.get('municipality') or
+        address_data.get('district') or address_data.get('suburb') or ''
+    )
+    state = (
+        address_data.get('state') or address_data.get('region') or
+        address_data.get('state_district') or ''
+    )
+    return city, state
+
+
+def reverse_geocode(latitude, longitude):
+    """Return the Place for the coordinates, or None if it could not be determined right now."""
+    key = _cell_key(latitude, longitude)
+    cached = cache.get(key)
+    if cached:
+        return Place(*cached, source='cache')
+
+    found, source = None, None
+    min_lon, min_lat, max_lon, max_lat = NIGERIA_BBOX
+    index = get_boundary_index()
+    if index and min_lat <= latitude <= max_lat and min_lon <= longitude <= max_lon:
+        found, source = index.lookup(latitude, longitude), 'boundaries'
+    if found is None:
+        found, source = _nominatim_lookup(latitude, longitude), 'nominatim'
+    if found is None:
+        return None
+
+    cache.set(key, found, CACHE_TIMEOUT)
+    return Place(*found, source=source)
@@ -0,0 +1,98 @@
+import gzip
+import io
+import json
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from users.geocoding import BoundaryIndex
+
+
+def _state_name(name):
+    """Match the names Nominatim returns, e.g. 'Lagos State', 'Federal Capital Territory'."""
+    name = name.strip()
+    if name.upper() in ('FCT', 'FCT ABUJA', 'ABUJA', 'FEDERAL CAPITAL TERRITORY'):
+        return 'Federal Capital Territory'
+    return name if name.lower().endswith(' state') else f"{name} State"
+
+
+def _read_features(source):
+    """Load the features of a local or http(s) GeoJSON file, gzipped if its name ends in .gz."""
+    if source.startswith(('http://', 'https://')):
+        response = requests.get(source, timeout=120)
+        response.raise_for_status()
+        data = response.content
+        if urlsplit(source).path.endswith('.gz'):
+            data = gzip.decompress(data)
+        return json.load(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8'))['features']
+
+    path = Path(source)
+    opener = gzip.open if path.suffix == '.gz' else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)['features']
+
+
+def _round_ring(ring, precision):
+    rounded = []
+    for x, y, *_ in ring:
+        point = [round(x, precision), round(y, precision)]
+        if not rounded or rounded[-1] != point:
+            rounded.append(point)
+    return rounded
+
+
+class Command(BaseCommand):
+    help = 'Install Nigerian LGA boundaries (GeoJSON, e.g. the GRID3/HDX LGA dataset) for offline reverse geocoding'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='GeoJSON FeatureCollection of LGA polygons (.geojson or .geojson.gz), a path or an http(s) URL')
+        parser.add_argument('--state-field', default='statename', help='Feature property holding the state name')
+        parser.add_argument('--lga-field', default='lganame', help='Feature property holding the LGA name')
+        parser.add_argument('--precision', type=int, default=5, help='Decimal places kept per coordinate (5 is ~1 m)')
+        parser.add_argument('--if-missing', action='store_true', help='Do nothing when boundaries are already installed (for deploy scripts)')
+
+    def handle(self, *args, **options):
+        destination = Path(settings.GEOCODER_BOUNDARIES_PATH)
+        if options['if_missing'] and destination.exists():
+            self.stdout.write(f"LGA boundaries already installed at {destination}")
+            return
+
+        source = options['source']
+        try:
+            features = _read_features(source)
+        except (OSError, ValueError, KeyError, requests.RequestException) as e:
+            raise CommandError(f"Could not read {source}: {e}")
+
+        precision = options['precision']
+        output = []
+        for feature in features:
+            properties, geometry = feature.get('properties') or {}, feature.get('geometry') or {}
+            if geometry.get('type') not in ('Polygon', 'MultiPolygon'):
+                continue
+            try:
+                state, lga = properties[options['state_field']], properties[options['lga_field']]
+            except KeyError as e:
+                raise CommandError(f"Feature is missing property {e}; pass --state-field/--lga-field")
+
+            polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+            output.append({
+                'type': 'Feature',
+                'properties': {'state': _state_name(state), 'lga': lga.strip()},
+                'geometry': {
+                    'type': 'MultiPolygon',
+                    'coordinates': [[_round_ring(ring, precision) for ring in polygon] for polygon in polygons],
+                },
+            })
+
+        # Fails loudly here rather than on the first verification request
+        BoundaryIndex(output)
+
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        opener = gzip.open if destination.suffix == '.gz' else open
+        with opener(destination, 'wt', encoding='utf-8') as f:
+            json.dump({'type': 'FeatureCollection', 'features': output}, f, separators=(',', ':'))
+
+        self.stdout.write(self.style.SUCCESS(f"Installed {len(output)} LGA boundaries at {destination}; restart workers to load them"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users.referrals import refresh_referral_leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Recount referrals and rebuild the precomputed referral leaderboard (run from cron, e.g. hourly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=None, help='Rows to keep (default REFERRAL_LEADERBOARD_SIZE)')
+
+    def handle(self, *args, **options):
+        count = refresh_referral_leaderboard(size=options['size'])
+        self.stdout.write(self.style.SUCCESS(f'Referral leaderboard rebuilt with {count} entries'))
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_referrals(apps, schema_editor):
+    """Fill referral_count from the referrals made before it existed"""
+    Profile = apps.get_model('users', 'Profile')
+    direct = (
+        Profile.objects.filter(referred_by_id=OuterRef('user_id'))
+        .order_by().values('referred_by_id').annotate(total=Count('pk')).values('total')
+    )
+    Profile.objects.update(referral_count=Coalesce(Subquery(direct), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0015_profile_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='referral_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_existing_referrals, reverse_code=migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='ReferralLeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField(unique=True)),
+                ('direct_referrals', models.PositiveIntegerField()),
+                ('network_size', models.PositiveIntegerField(help_text='Referrals at every level below this user')),
+                ('refreshed_at', models.DateTimeField()),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='referral_leaderboard_entry', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Referral leaderboard',
+                'ordering': ['rank'],
+            },
+        ),
+    ]
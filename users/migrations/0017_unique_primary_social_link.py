@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:29
+
+from django.db import migrations, models
+
+
+def keep_one_primary_link(apps, schema_editor):
+    """Leave each profile with a single primary link, its newest"""
+    SocialMediaLink = apps.get_model('users', 'SocialMediaLink')
+    seen = set()
+    demote = []
+    for pk, profile_id in SocialMediaLink.objects.filter(is_primary=True).order_by('profile_id', '-created_at', '-pk').values_list('pk', 'profile_id'):
+        if profile_id in seen:
+            demote.append(pk)
+        seen.add(profile_id)
+    SocialMediaLink.objects.filter(pk__in=demote).update(is_primary=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0016_referral_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_one_primary_link, reverse_code=migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='socialmedialink',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_primary', True)), fields=('profile',), name='unique_primary_social_link'),
+        ),
+    ]
@@ -29,13 +29,23 @@ class Profile(models.Model):
     business_page_url = models.URLField(max_length=500, blank=True, null=True, help_text=_("Your Instagram, Facebook, or WhatsApp Business link."))
     referral_code = models.CharField(max_length=20, unique=True, blank=True, help_text=_("Unique referral code for this user"))
     referred_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='referrals')
-
+    # Direct referrals, kept up to date by users.signals when referred_by changes
+    referral_count = models.PositiveIntegerField(default=0, editable=False)
     
     location_verified = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     def save(self, *args, **kwargs):
         if not self.referral_code:
             self.referral_code = self.user.username
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # referral_count only changes through F() updates; writing back the
+            # value loaded with this instance would undo concurrent referrals
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'referral_count' and field.attname not in deferred
+            ]
         super().save(*args, **kwargs)
     
     def get_referral_url(self):
@@ -50,7 +60,7 @@ class Profile(models.Model):
     
     @property
     def successful_referrals_count(self):
-        return self.user.referrals.count()
+        return self.referral_count
 
 class SocialMediaLink(models.Model):
     PLATFORM_CHOICES = [
@@ -74,6 +84,13 @@ class SocialMediaLink(models.Model):
     
     class Meta:
         ordering = ['-is_primary', 'platform']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['profile'],
+                condition=models.Q(is_primary=True),
+                name='unique_primary_social_link',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.profile.user.username} - {self.get_platform_display()}"
@@ -104,4 +121,20 @@ class Certificate(models.Model):
         if self.expiry_date:
             from datetime import date
             return self.expiry_date < date.today()
-        return False
\ No newline at end of file
+        return False
+
+
+class ReferralLeaderboardEntry(models.Model):
+    """One row of the precomputed referral leaderboard, rebuilt by `manage.py refresh_referral_leaderboard`"""
+    rank = models.PositiveIntegerField(unique=True)
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='referral_leaderboard_entry')
+    direct_referrals = models.PositiveIntegerField()
+    network_size = models.PositiveIntegerField(help_text=_("Referrals at every level below this user"))
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['rank']
+        verbose_name_plural = 'Referral leaderboard'
+
+    def __str__(self):
+        return f"#{self.rank} {self.user.username}"
@@ -0,0 +1,201 @@
+"""
+Referral counts, leaderboard and network tree.
+
+Profile.referral_count holds each user's direct referrals and is moved by
+users.signals whenever a profile's referred_by changes, so showing it costs
+nothing. The leaderboard is rebuilt offline by
+`manage.py refresh_referral_leaderboard` into ReferralLeaderboardEntry and
+read a page at a time. Multi-level networks come from a recursive CTE over
+users_profile.referred_by, one query however deep the tree goes.
+
+Signups are credited by attribute_referral(), the one place every signup path
+(form signup, Google signup and the social login signal) goes through.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Exists, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from notifications.grouping import notify
+from notifications.models import Notification
+
+from .models import Profile, ReferralLeaderboardEntry
+
+logger = logging.getLogger(__name__)
+
+REFERRAL_SESSION_KEY = 'referral_code'
+REFERRER_CACHE_TIMEOUT = 60 * 5
+
+
+def adjust_referral_count(user_id, delta):
+    """Add delta to the user's stored referral count, never going below zero."""
+    Profile.objects.filter(user_id=user_id).update(referral_count=Greatest(F('referral_count') + delta, 0))
+
+
+def resolve_referrer(code):
+    """
+    The id of the user a referral link code belongs to, or None. Codes are
+    usernames, or legacy Profile.referral_code values; a username wins.
+    """
+    code = (code or '').strip()
+    if not code:
+        return None
+    key = f"referrals:code:{hashlib.sha256(code.encode()).hexdigest()}"
+    referrer_id = cache.get(key)
+    if referrer_id is None:
+        # Both unique lookups in one round trip
+        by_username = User.objects.filter(username=code).annotate(priority=Value(0)).values_list('pk', 'priority')
+        by_code = Profile.objects.filter(referral_code=code).annotate(priority=Value(1)).values_list('user_id', 'priority')
+        match = by_username.union(by_code, all=True).order_by('priority').first()
+        referrer_id = match[0] if match else 0   # cache misses too
+        cache.set(key, referrer_id, REFERRER_CACHE_TIMEOUT)
+    return referrer_id or None
+
+
+def attribute_referral(user, code):
+    """
+    Credit `user`'s signup to the owner of `code` and notify them, in one
+    transaction. Only the first attribution for a user takes effect, so every
+    signup path can call this. Returns the referrer's id when this call made it.
+    """
+    referrer_id = resolve_referrer(code)
+    if referrer_id is None or referrer_id == user.pk:
+        return None
+
+    with transaction.atomic():
+        # Compare-and-set: of several concurrent calls exactly one updates the row.
+        # A queryset update skips the post_save counter signal, so count here.
+        attributed = Profile.objects.filter(
+            Exists(User.objects.filter(pk=referrer_id)),
+            user=user,
+            referred_by__isnull=True,
+        ).update(referred_by_id=referrer_id)
+        if not attributed:
+            return None
+        adjust_referral_count(referrer_id, 1)
+        notify(
+            recipient=User(pk=referrer_id),
+            message=_(f"Congratulations! {user.username or user.email} signed up using your referral link."),
+            verb=Notification.Verb.REFERRAL,
+            target=User(pk=referrer_id),
+        )
+
+    # Keep an already loaded profile from saving referred_by back to empty
+    profile_rel = Profile._meta.get_field('user').remote_field
+    if profile_rel.is_cached(user):
+        profile = profile_rel.get_cached_value(user)
+        profile.referred_by_id = profile._original_referred_by_id = referrer_id
+    return referrer_id
+
+
+def attribute_session_referral(request, user):
+    """attribute_referral() for the code the signup link stored in the session, which is used up."""
+    code = request.session.pop(REFERRAL_SESSION_KEY, None)
+    return attribute_referral(user, code) if code else None
+
+
+def referral_tree(user, max_depth=None):
+    """
+    The user's referral network, depth-first: a list of dicts with user_id,
+    username, depth (1 = referred directly) and referral_count.
+    """
+    max_depth = max_depth or settings.REFERRAL_TREE_MAX_DEPTH
+    profiles, users = Profile._meta.db_table, User._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH RECURSIVE network (user_id, referred_by_id, depth) AS (
+                SELECT user_id, referred_by_id, 1 FROM {profiles} WHERE referred_by_id = %s
+                UNION ALL
+                SELECT p.user_id, p.referred_by_id, n.depth + 1
+                FROM {profiles} p JOIN network n ON p.referred_by_id = n.user_id
+                WHERE n.depth < %s
+            )
+            SELECT n.user_id, n.referred_by_id, n.depth, u.username, p.referral_count
+            FROM network n
+            JOIN {users} u ON u.id = n.user_id
+            JOIN {profiles} p ON p.user_id = n.user_id
+            ORDER BY u.username
+            """,
+            [user.pk, max_depth],
+        )
+        rows = cursor.fetchall()
+
+    children = {}
+    for user_id, referred_by_id, depth, username, referral_count in rows:
+        children.setdefault(referred_by_id, []).append({
+            'user_id': user_id, 'username': username, 'depth': depth, 'referral_count': referral_count,
+        })
+
+    tree, stack = [], list(reversed(children.get(user.pk, [])))
+    while stack:
+        node = stack.pop()
+        tree.append(node)
+        stack.extend(reversed(children.get(node['user_id'], [])))
+    return tree
+
+
+def network_sizes(max_depth=None):
+    """Map of user_id -> referrals at every level below that user, for users with any."""
+    max_depth = max_depth or settings.REFERRAL_TREE_MAX_DEPTH
+    profiles = Profile._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH RECURSIVE network (root_id, user_id, depth) AS (
+                SELECT referred_by_id, user_id, 1 FROM {profiles} WHERE referred_by_id IS NOT NULL
+                UNION ALL
+                SELECT n.root_id, p.user_id, n.depth + 1
+                FROM {profiles} p JOIN network n ON p.referred_by_id = n.user_id
+                WHERE n.depth < %s
+            )
+            SELECT root_id, COUNT(*) FROM network GROUP BY root_id
+            """,
+            [max_depth],
+        )
+        return dict(cursor.fetchall())
+
+
+def recount_referrals():
+    """
+    Recompute stored referral counts from referred_by, repairing any drift.
+    Only rows whose count is wrong are written; returns how many there were.
+    """
+    direct = (
+        Profile.objects.filter(referred_by_id=OuterRef('user_id'))
+        .order_by().values('referred_by_id').annotate(total=Count('pk')).values('total')
+    )
+    actual = Coalesce(Subquery(direct), 0)
+    return Profile.objects.alias(actual=actual).exclude(referral_count=F('actual')).update(referral_count=actual)
+
+
+def refresh_referral_leaderboard(size=None):
+    """Rebuild the top `size` leaderboard rows; returns how many were written."""
+    size = size or settings.REFERRAL_LEADERBOARD_SIZE
+    recount_referrals()
+    sizes = network_sizes()
+
+    counts = Profile.objects.filter(referral_count__gt=0).values_list('user_id', 'referral_count')
+    ranked = sorted(counts, key=lambda row: (-row[1], -sizes.get(row[0], 0), row[0]))[:size]
+
+    now = timezone.now()
+    entries = [
+        ReferralLeaderboardEntry(
+            rank=rank, user_id=user_id, direct_referrals=direct,
+            network_size=sizes.get(user_id, direct), refreshed_at=now,
+        )
+        for rank, (user_id, direct) in enumerate(ranked, start=1)
+    ]
+    with transaction.atomic():
+        ReferralLeaderboardEntry.objects.all().delete()
+        ReferralLeaderboardEntry.objects.bulk_create(entries)
+
+    logger.info(f"Referral leaderboard refreshed with {len(entries)} entries")
+    return len(entries)
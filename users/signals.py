@@ -1,10 +1,14 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from allauth.socialaccount.signals import pre_social_login
-from .models import Profile
-from notifications.models import Notification
-from django.utils.translation import gettext_lazy as _
+from academy.models import LearningPathway, PathwayModule
+from marketplace.models import Booking, Service
+from .caching import bump_storefront_version
+from .models import Certificate, Profile, SocialMediaLink
+from .referrals import adjust_referral_count, attribute_session_referral
+
+UNKNOWN = object()
 
 
 @receiver(post_save, sender=User)
@@ -14,34 +18,85 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
         Profile.objects.create(user=instance)
 
 
+@receiver(post_init, sender=Profile)
+def remember_referrer(sender, instance, **kwargs):
+    """Remember referred_by so post_save can tell when it changes"""
+    # Deferred (not loaded) fields are absent from __dict__; their changes can't be tracked
+    instance._original_referred_by_id = instance.__dict__.get('referred_by_id', UNKNOWN)
+
+
+@receiver(post_save, sender=Profile)
+def update_referral_counts(sender, instance, created, raw=False, **kwargs):
+    """Keep the referrers' stored referral counts in step with referred_by"""
+    previous = None if created else instance._original_referred_by_id
+    if raw or previous is UNKNOWN or 'referred_by_id' not in instance.__dict__:
+        return
+    current = instance.referred_by_id
+    if previous != current:
+        if previous:
+            adjust_referral_count(previous, -1)
+        if current:
+            adjust_referral_count(current, 1)
+    instance._original_referred_by_id = current
+
+
+@receiver(post_delete, sender=Profile)
+def release_referral_count(sender, instance, **kwargs):
+    if instance.__dict__.get('referred_by_id'):
+        adjust_referral_count(instance.referred_by_id, -1)
+
+
 @receiver(pre_social_login)
 def capture_referral_on_social_login(sender, request, sociallogin, **kwargs):
-    """Capture referral username when user signs up via Google OAuth"""
-    referral_code = request.session.get('referral_code')  # Note: session key kept for backward compatibility
-    
-    if referral_code and sociallogin.is_existing:
+    """Credit the referral link a new social-login user arrived through"""
+    if sociallogin.is_existing or not sociallogin.user.pk:
         return
-    
-    if referral_code:
-        try:
-            # Try to find referrer by username (new system) or referral_code (legacy)
-            try:
-                referrer_user = User.objects.get(username=referral_code)
-            except User.DoesNotExist:
-                referrer_profile = Profile.objects.get(referral_code=referral_code)
-                referrer_user = referrer_profile.user
-            
-            if not sociallogin.is_existing:
-                user = sociallogin.user
-                if user.pk:
-                    profile, created = Profile.objects.get_or_create(user=user)
-                    if not profile.referred_by:
-                        profile.referred_by = referrer_user
-                        profile.save()
-                        
-                        Notification.objects.create(
-                            recipient=referrer_user,
-                            message=_(f"Congratulations! A new user signed up using your referral link.")
-                        )
-        except (User.DoesNotExist, Profile.DoesNotExist):
-            pass
+    attribute_session_referral(request, sociallogin.user)
+
+
+@receiver(post_save, sender=User)
+def invalidate_storefront_for_user(sender, instance, update_fields=None, **kwargs):
+    """Names are shown on the storefront; logins only touch last_login"""
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        bump_storefront_version(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=LearningPathway)
+@receiver(post_delete, sender=LearningPathway)
+def invalidate_storefront(sender, instance, **kwargs):
+    """Bump the storefront version when its profile, services or pathways change"""
+    bump_storefront_version(instance.artisan_id if sender is Service else instance.user_id)
+
+
+@receiver(post_save, sender=Certificate)
+@receiver(post_delete, sender=Certificate)
+@receiver(post_save, sender=SocialMediaLink)
+@receiver(post_delete, sender=SocialMediaLink)
+def invalidate_storefront_for_profile_item(sender, instance, **kwargs):
+    """Bump the storefront version when a certificate or social link changes"""
+    user_id = Profile.objects.filter(pk=instance.profile_id).values_list('user_id', flat=True).first()
+    if user_id:
+        bump_storefront_version(user_id)
+
+
+@receiver(post_save, sender=PathwayModule)
+@receiver(post_delete, sender=PathwayModule)
+def invalidate_storefront_for_module(sender, instance, **kwargs):
+    """Completing (or adding) a module can change which pathways show as completed"""
+    try:
+        bump_storefront_version(instance.pathway.user_id)
+    except LearningPathway.DoesNotExist:
+        pass
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_storefront_for_booking(sender, instance, **kwargs):
+    """The artisan's own view of the storefront shows booking counts"""
+    try:
+        bump_storefront_version(instance.service.artisan_id)
+    except Service.DoesNotExist:
+        pass
@@ -1,3 +1,305 @@
-from django.test import TestCase
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import without_static_manifest
+from marketplace.models import Category, Service
+from notifications.models import Notification
+
+from . import geocoding
+from .geocoding import NOMINATIM_LOCK_KEY, BoundaryIndex, reverse_geocode
+from .models import Profile, ReferralLeaderboardEntry, SocialMediaLink
+from .referrals import (
+    REFERRAL_SESSION_KEY, attribute_referral, attribute_session_referral, network_sizes, recount_referrals,
+    referral_tree,
+)
+from .views import _save_social_links
+
+
+class ReferralAttributionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.referrer = User.objects.create_user('referrer')
+        self.newcomer = User.objects.create_user('newcomer')
+
+    def referral_count(self):
+        return Profile.objects.get(user=self.referrer).referral_count
+
+    def test_only_the_first_attribution_counts(self):
+        self.assertEqual(attribute_referral(self.newcomer, 'referrer'), self.referrer.pk)
+        self.assertIsNone(attribute_referral(self.newcomer, 'referrer'))
+
+        self.assertEqual(self.referral_count(), 1)
+        self.assertEqual(Notification.objects.filter(recipient=self.referrer).count(), 1)
+        self.assertEqual(Profile.objects.get(user=self.newcomer).referred_by_id, self.referrer.pk)
+
+    def test_loaded_profile_does_not_undo_the_attribution(self):
+        profile = self.newcomer.profile
+        attribute_referral(self.newcomer, 'referrer')
+        profile.bio = 'Tailor in Aba'
+        profile.save()
+
+        self.assertEqual(Profile.objects.get(user=self.newcomer).referred_by_id, self.referrer.pk)
+        self.assertEqual(self.referral_count(), 1)
+
+    def test_self_and_unknown_referrals_are_ignored(self):
+        self.assertIsNone(attribute_referral(self.referrer, 'referrer'))
+        self.assertIsNone(attribute_referral(self.newcomer, 'nobody'))
+        self.assertEqual(self.referral_count(), 0)
+
+    def test_session_code_is_used_up(self):
+        request = RequestFactory().get('/')
+        request.session = {REFERRAL_SESSION_KEY: 'referrer'}
+        self.assertEqual(attribute_session_referral(request, self.newcomer), self.referrer.pk)
+        self.assertNotIn(REFERRAL_SESSION_KEY, request.session)
+        self.assertIsNone(attribute_session_referral(request, self.newcomer))
+
+
+class ReferralNetworkTests(TestCase):
+    def setUp(self):
+        # root -> alice -> carol -> dave, and root -> bob
+        self.users = {name: User.objects.create_user(name) for name in ('root', 'alice', 'bob', 'carol', 'dave')}
+        for name, referrer in (('alice', 'root'), ('bob', 'root'), ('carol', 'alice'), ('dave', 'carol')):
+            # A queryset update skips the counter signal, leaving the stored counts to recount_referrals
+            Profile.objects.filter(user=self.users[name]).update(referred_by=self.users[referrer])
+
+    def pk(self, name):
+        return self.users[name].pk
+
+    def test_tree_is_depth_first(self):
+        recount_referrals()
+        tree = referral_tree(self.users['root'])
+        self.assertEqual(
+            [(node['username'], node['depth'], node['referral_count']) for node in tree],
+            [('alice', 1, 1), ('carol', 2, 1), ('dave', 3, 0), ('bob', 1, 0)],
+        )
+        self.assertEqual([node['username'] for node in referral_tree(self.users['root'], max_depth=2)], ['alice', 'carol', 'bob'])
+
+    def test_network_sizes_count_every_level(self):
+        self.assertEqual(network_sizes(), {self.pk('root'): 4, self.pk('alice'): 2, self.pk('carol'): 1})
+        self.assertEqual(network_sizes(max_depth=1), {self.pk('root'): 2, self.pk('alice'): 1, self.pk('carol'): 1})
+
+    def test_recount_only_writes_drifted_rows(self):
+        self.assertEqual(recount_referrals(), 3)
+        self.assertEqual(recount_referrals(), 0)
+        Profile.objects.filter(user=self.users['bob']).update(referral_count=7)
+        self.assertEqual(recount_referrals(), 1)
+        self.assertEqual(Profile.objects.get(user=self.users['bob']).referral_count, 0)
+
+    def test_leaderboard_command_ranks_by_direct_then_network(self):
+        call_command('refresh_referral_leaderboard', stdout=StringIO())
+        entries = ReferralLeaderboardEntry.objects.order_by('rank')
+        self.assertEqual(
+            [(entry.rank, entry.user_id, entry.direct_referrals, entry.network_size) for entry in entries],
+            [(1, self.pk('root'), 2, 4), (2, self.pk('alice'), 1, 2), (3, self.pk('carol'), 1, 1)],
+        )
+
+        call_command('refresh_referral_leaderboard', size=1, stdout=StringIO())
+        self.assertEqual(list(ReferralLeaderboardEntry.objects.values_list('user_id', flat=True)), [self.pk('root')])
+
+
+class SocialLinkTests(TestCase):
+    def setUp(self):
+        self.profile = User.objects.create_user('artisan').profile
+
+    def form_data(self, *rows, removed=''):
+        data = {'social_links_count': str(len(rows)), 'removed_social_links': removed}
+        for i, (link_id, platform, url, primary) in enumerate(rows):
+            data.update({f'social_id_{i}': str(link_id or ''), f'social_platform_{i}': platform, f'social_url_{i}': url})
+            if primary:
+                data[f'social_primary_{i}'] = 'on'
+        return data
+
+    def stored(self):
+        return {link.platform: (link.url, link.is_primary) for link in self.profile.social_links.all()}
+
+    def test_form_is_applied_as_a_diff(self):
+        _save_social_links(self.profile, self.form_data(
+            (None, 'instagram', 'https://instagram.com/a', True),
+            (None, 'facebook', 'https://facebook.com/a', False),
+        ))
+        instagram = self.profile.social_links.get(platform='instagram')
+        facebook = self.profile.social_links.get(platform='facebook')
+
+        # Switch the primary, edit one link, drop the other and add a new one
+        _save_social_links(self.profile, self.form_data(
+            (instagram.pk, 'instagram', 'https://instagram.com/b', False),
+            (None, 'website', 'https://example.com', True),
+            removed=str(facebook.pk),
+        ))
+        self.assertEqual(self.stored(), {
+            'instagram': ('https://instagram.com/b', False),
+            'website': ('https://example.com', True),
+        })
+        self.assertEqual(self.profile.social_links.get(platform='instagram').pk, instagram.pk)
+
+    def test_last_ticked_primary_wins(self):
+        _save_social_links(self.profile, self.form_data(
+            (None, 'instagram', 'https://instagram.com/a', True),
+            (None, 'facebook', 'https://facebook.com/a', True),
+        ))
+        self.assertEqual(self.stored()['facebook'], ('https://facebook.com/a', True))
+        self.assertEqual(self.profile.social_links.filter(is_primary=True).count(), 1)
+
+    def test_other_profiles_links_are_ignored(self):
+        other = SocialMediaLink.objects.create(
+            profile=User.objects.create_user('someone').profile, platform='github', url='https://github.com/x',
+        )
+        _save_social_links(self.profile, self.form_data(
+            (other.pk, 'github', 'https://github.com/hijacked', False), removed=str(other.pk),
+        ))
+        other.refresh_from_db()
+        self.assertEqual(other.url, 'https://github.com/x')
+        self.assertFalse(self.profile.social_links.exists())
+
+    def test_database_allows_one_primary_link(self):
+        SocialMediaLink.objects.create(profile=self.profile, platform='instagram', url='https://instagram.com/a', is_primary=True)
+        # bulk_create skips SocialMediaLink.save(), which would demote the first link
+        with self.assertRaises(IntegrityError):
+            SocialMediaLink.objects.bulk_create([
+                SocialMediaLink(profile=self.profile, platform='facebook', url='https://facebook.com/a', is_primary=True),
+            ])
+
+
+@without_static_manifest
+class ArtisanStorefrontTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.artisan = User.objects.create_user('tailor', first_name='Ada')
+        self.profile = self.artisan.profile
+        self.profile.is_verified_artisan = True
+        self.profile.bio = 'Tailor in Aba'
+        self.profile.profile_picture = 'profile_pics/ada.jpg'
+        self.profile.save()
+        category = Category.objects.create(name='Fashion', slug='fashion')
+        self.services = [
+            Service.objects.create(
+                artisan=self.artisan, category=category, title=f'Service {i}', description='x', price=10,
+                image='service_images/suit.jpg',
+            )
+            for i in range(3)
+        ]
+        for platform in ('instagram', 'whatsapp'):
+            SocialMediaLink.objects.create(profile=self.profile, platform=platform, url=f'https://{platform}.com/ada')
+        self.url = reverse('users:artisan-storefront', kwargs={'username': 'tailor'})
+
+    def test_query_count_does_not_grow_with_content(self):
+        # The artisan with profile, then one query per section
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Service 2')
+        # Every section comes from the fragment cache
+        with self.assertNumQueries(1):
+            self.assertContains(self.client.get(self.url), 'Service 2')
+
+    def test_profile_edit_refreshes_the_cached_sections(self):
+        self.client.get(self.url)
+        self.profile.bio = 'Bespoke suits in Aba'
+        self.profile.save()
+        self.assertContains(self.client.get(self.url), 'Bespoke suits in Aba')
+
+    def test_service_edit_refreshes_the_cached_sections(self):
+        self.client.get(self.url)
+        self.services[0].title = 'Wedding gowns'
+        self.services[0].save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Wedding gowns')
+        self.assertNotContains(response, 'Service 0')
+
+
+def square(min_x, min_y, max_x, max_y):
+    return [[min_x, min_y], [max_x, min_y], [max_x, max_y], [min_x, max_y], [min_x, min_y]]
+
+
+# Ikeja with a hole in the middle, and Epe as two separate polygons
+LGA_FEATURES = [
+    {
+        'properties': {'lga': 'Ikeja', 'state': 'Lagos State'},
+        'geometry': {'type': 'Polygon', 'coordinates': [square(3.0, 6.0, 4.0, 7.0), square(3.4, 6.4, 3.6, 6.6)]},
+    },
+    {
+        'properties': {'lga': 'Epe', 'state': 'Lagos State'},
+        'geometry': {'type': 'MultiPolygon', 'coordinates': [[square(5.0, 6.0, 5.2, 6.2)], [square(5.5, 6.0, 5.7, 6.2)]]},
+    },
+]
+
+
+class BoundaryIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = BoundaryIndex(LGA_FEATURES)
+
+    def test_point_in_polygon(self):
+        self.assertEqual(self.index.lookup(6.2, 3.2), ('Ikeja', 'Lagos State'))
+        self.assertEqual(self.index.lookup(6.1, 5.6), ('Epe', 'Lagos State'))
+
+    def test_holes_and_gaps_are_outside(self):
+        self.assertIsNone(self.index.lookup(6.5, 3.5))
+        self.assertIsNone(self.index.lookup(6.1, 5.35))  # between Epe's two polygons
+        self.assertIsNone(self.index.lookup(9.0, 7.5))
+
+    def test_import_command_installs_a_loadable_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source, destination = Path(directory) / 'lgas.geojson', Path(directory) / 'installed.geojson.gz'
+            source.write_text(json.dumps({'type': 'FeatureCollection', 'features': [
+                {'properties': {'statename': 'Lagos', 'lganame': 'Ikeja '}, 'geometry': LGA_FEATURES[0]['geometry']},
+            ]}))
+            with override_settings(GEOCODER_BOUNDARIES_PATH=str(destination)):
+                call_command('import_lga_boundaries', str(source), stdout=StringIO())
+                self.assertEqual(BoundaryIndex.load(destination).lookup(6.2, 3.2), ('Ikeja', 'Lagos State'))
+
+                out = StringIO()
+                call_command('import_lga_boundaries', 'https://example.invalid/lgas.geojson', if_missing=True, stdout=out)
+                self.assertIn('already installed', out.getvalue())
+
+
+@override_settings(GEOCODER_NOMINATIM_WAIT=0)
+@mock.patch('users.geocoding.requests.get')
+class ReverseGeocodeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.enterContext(mock.patch.dict(geocoding._boundaries, {'index': BoundaryIndex(LGA_FEATURES)}))
+
+    def nominatim_answers(self, get, address):
+        get.return_value.json.return_value = {'address': address}
+
+    def test_boundaries_answer_and_the_cell_is_cached(self, get):
+        self.assertEqual(reverse_geocode(6.2, 3.2), geocoding.Place('Ikeja', 'Lagos State', 'boundaries'))
+        self.assertEqual(reverse_geocode(6.2001, 3.2001), geocoding.Place('Ikeja', 'Lagos State', 'cache'))
+        get.assert_not_called()
+
+    def test_points_outside_the_boundaries_fall_back_to_nominatim(self, get):
+        self.nominatim_answers(get, {'town': 'Kafanchan', 'state': 'Kaduna State'})
+        self.assertEqual(reverse_geocode(9.58, 8.29), geocoding.Place('Kafanchan', 'Kaduna State', 'nominatim'))
+        self.assertEqual(get.call_args.kwargs['timeout'], geocoding.settings.GEOCODER_NOMINATIM_TIMEOUT)
+        self.assertEqual(reverse_geocode(9.58, 8.29).source, 'cache')
+
+    def test_without_a_boundary_file_nominatim_answers(self, get):
+        geocoding._boundaries['index'] = False
+        self.nominatim_answers(get, {'city': 'Ikeja', 'state': 'Lagos State'})
+        self.assertEqual(reverse_geocode(6.2, 3.2).source, 'nominatim')
+
+    def test_timeout_is_not_cached(self, get):
+        get.side_effect = requests.Timeout('read timed out')
+        with self.assertLogs('users.geocoding', 'WARNING'):
+            self.assertIsNone(reverse_geocode(9.58, 8.29))
+
+        cache.delete(NOMINATIM_LOCK_KEY)  # the next second's slot
+        get.side_effect = None
+        self.nominatim_answers(get, {'town': 'Kafanchan', 'state': 'Kaduna State'})
+        self.assertEqual(reverse_geocode(9.58, 8.29).source, 'nominatim')
+
+    def test_rate_limited_lookup_is_skipped(self, get):
+        cache.add(NOMINATIM_LOCK_KEY, 1, timeout=1)
+        with self.assertLogs('users.geocoding', 'WARNING'):
+            self.assertIsNone(reverse_geocode(9.58, 8.29))
+        get.assert_not_called()
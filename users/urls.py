@@ -10,6 +10,8 @@ urlpatterns = [
     path('verify-location/', views.verify_location_view, name='verify-location'),
     path('verify-email/<uuid:token>/', views.verify_email, name='verify-email'),
     path('delete-account/', views.delete_account, name='delete-account'),
+    path('referrals/leaderboard/', views.ReferralLeaderboardView.as_view(), name='referral-leaderboard'),
+    path('referrals/network/', views.referral_network_view, name='referral-network'),
     path('artisan/<str:username>/', views.ArtisanStorefrontView.as_view(), name='artisan-storefront'),
     path('logout/', views.custom_logout, name='logout'),
 ]
\ No newline at end of file
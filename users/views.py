@@ -1,13 +1,11 @@
 import json
 import logging
 import urllib.parse
-import requests  # 🚀 FIX ADDED: This line was missing
 
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
 from django.db import transaction
 from django.db.models import Count, Q
 from django.http import JsonResponse
@@ -18,19 +16,26 @@ from django.utils.translation import gettext_lazy as _
 from django.views import generic
 
 from academy.models import LearningPathway
+from core.outbox import queue_email
+from marketplace.models import Service
 from notifications.models import Notification
 
 from .forms import (AccountDeleteForm, CustomUserCreationForm,
                     ProfileUpdateForm)
-from .models import Profile, SocialMediaLink, User
+from .caching import STOREFRONT_FRAGMENT_TIMEOUT, get_storefront_version
+from .geocoding import reverse_geocode
+from .models import (Certificate, Profile, ReferralLeaderboardEntry,
+                     SocialMediaLink, User)
+from .referrals import (REFERRAL_SESSION_KEY, attribute_session_referral,
+                        referral_tree)
 
 logger = logging.getLogger(__name__)
 
 
 def signup(request):
-    referral_code = request.GET.get('ref', request.session.get('referral_code'))
+    referral_code = request.GET.get('ref', request.session.get(REFERRAL_SESSION_KEY))
     if referral_code:
-        request.session['referral_code'] = referral_code
+        request.session[REFERRAL_SESSION_KEY] = referral_code
     
     if request.method == 'POST':
         form = CustomUserCreationForm(request.POST)
@@ -38,51 +43,27 @@ def signup(request):
             try:
                 with transaction.atomic():
                     user = form.save()
-                    
-                    referral_code_to_use = request.session.get('referral_code')
-                    
-                    if referral_code_to_use:
-                        try:
-                            # Try to find referrer by username (new system) or referral_code (legacy)
-                            try:
-                                referrer_user = User.objects.get(username=referral_code_to_use)
-                            except User.DoesNotExist:
-                                referrer_profile = Profile.objects.get(referral_code=referral_code_to_use)
-                                referrer_user = referrer_profile.user
-
-                            profile, created = Profile.objects.get_or_create(user=user)
-                            if not profile.referred_by:
-                                profile.referred_by = referrer_user
-                                profile.save()
-
-                                Notification.objects.create(
-                                    recipient=referrer_user,
-                                    message=_(f"Congratulations! {user.username} signed up using your referral link.")
-                                )
-                        except (User.DoesNotExist, Profile.DoesNotExist):
-                            pass
-                    
-                    if 'referral_code' in request.session:
-                        del request.session['referral_code']
+                    attribute_session_referral(request, user)
+
+                    # Stored with the account, sent by the outbox worker
+                    profile = user.profile  # created by the post_save signal
+                    verification_url = request.build_absolute_uri(f'/users/verify-email/{profile.email_verification_token}/')
+                    context = {'user': user, 'verification_url': verification_url}
+                    html_message = render_to_string('registration/email_verification.html', context)
+                    plain_message = strip_tags(html_message)
+                    queue_email(
+                        _('Verify Your Email - Kiri.ng'),
+                        plain_message,
+                        [user.email],
+                        from_email=settings.DEFAULT_FROM_EMAIL,
+                        html_message=html_message,
+                    )
 
             except Exception as e:
                 logger.error(f"Signup transaction failed and was rolled back for user {form.cleaned_data.get('username')}: {e}")
                 messages.error(request, _("An unexpected error occurred during signup. Please try again."))
                 return render(request, 'registration/signup.html', {'form': form})
 
-            profile, created = Profile.objects.get_or_create(user=user)
-            verification_url = request.build_absolute_uri(f'/users/verify-email/{profile.email_verification_token}/')
-            context = {'user': user, 'verification_url': verification_url}
-            html_message = render_to_string('registration/email_verification.html', context)
-            plain_message = strip_tags(html_message)
-            send_mail(
-                _('Verify Your Email - Kiri.ng'),
-                plain_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-                html_message=html_message,
-            )
-            
             login(request, user, backend='django.contrib.auth.backends.ModelBackend')
             
             messages.info(request, _('Please check your email to verify your account.'))
@@ -103,16 +84,68 @@ def send_welcome_artisan_email(user, profile):
     context = {'user': user, 'google_link': google_link}
     html_message = render_to_string('registration/welcome_artisan_email.html', context)
     plain_message = strip_tags(html_message)
-    logger.info(f"Sending welcome artisan email to {user.email}")
-    send_mail(
+    logger.info(f"Queueing welcome artisan email to {user.email}")
+    queue_email(
         _('Welcome to Kiri.ng!'),
         plain_message,
-        settings.DEFAULT_FROM_EMAIL,
         [user.email],
+        from_email=settings.DEFAULT_FROM_EMAIL,
         html_message=html_message,
     )
 
 
+def _save_social_links(profile, data):
+    """
+    Apply the social links section of the profile form as one diff: at most
+    one delete, one primary demotion, one bulk_update and one bulk_create.
+    Returns the profile's links as they are afterwards.
+    """
+    existing = {link.pk: link for link in profile.social_links.all()}
+    stored_primary = {pk for pk, link in existing.items() if link.is_primary}
+    removed = {int(lid) for lid in data.get('removed_social_links', '').split(',') if lid.isdigit()} & existing.keys()
+    links = {pk: link for pk, link in existing.items() if pk not in removed}
+
+    submitted, to_create, primary = [], [], None
+    for i in range(int(data.get('social_links_count') or 0)):
+        platform, url = data.get(f'social_platform_{i}'), data.get(f'social_url_{i}')
+        if not (platform and url):
+            continue
+        link_id = data.get(f'social_id_{i}', '')
+        if link_id:
+            # Ids of removed links, or of other users' links, are ignored
+            link = links.get(int(link_id)) if link_id.isdigit() else None
+            if link is None:
+                continue
+        else:
+            link = SocialMediaLink(profile=profile)
+            to_create.append(link)
+        link.platform, link.url = platform, url
+        link.is_primary = data.get(f'social_primary_{i}') == 'on'
+        submitted.append(link)
+        if link.is_primary:
+            primary = link
+
+    # One primary link per profile (unique_primary_social_link): the last one ticked wins
+    if primary is not None:
+        for link in [*links.values(), *to_create]:
+            if link is not primary:
+                link.is_primary = False
+
+    if removed:
+        SocialMediaLink.objects.filter(pk__in=removed).delete()
+    # Clear the stored primary first, the constraint is checked row by row
+    demoted = [pk for pk, link in links.items() if pk in stored_primary and not link.is_primary]
+    if demoted:
+        SocialMediaLink.objects.filter(pk__in=demoted).update(is_primary=False)
+    to_update = [link for link in submitted if link.pk]
+    if to_update:
+        SocialMediaLink.objects.bulk_update(to_update, ['platform', 'url', 'is_primary'])
+    if to_create:
+        SocialMediaLink.objects.bulk_create(to_create)
+
+    return [*links.values(), *to_create]
+
+
 @login_required
 def profile_edit_view(request):
     profile = get_object_or_404(Profile, user=request.user)
@@ -121,50 +154,32 @@ def profile_edit_view(request):
     if request.method == 'POST':
         form = ProfileUpdateForm(request.POST, request.FILES, instance=profile)
         if form.is_valid():
-            updated_profile = form.save() 
-            
-            # Handle social media links
-            social_links_count = int(request.POST.get('social_links_count', 0))
-            removed_links = request.POST.get('removed_social_links', '')
-            if removed_links:
-                link_ids = [int(lid) for lid in removed_links.split(',') if lid]
-                SocialMediaLink.objects.filter(id__in=link_ids, profile=profile).delete()
-            
-            for i in range(social_links_count):
-                platform = request.POST.get(f'social_platform_{i}')
-                url = request.POST.get(f'social_url_{i}')
-                is_primary = request.POST.get(f'social_primary_{i}') == 'on'
-                link_id = request.POST.get(f'social_id_{i}')
-                
-                if platform and url:
-                    link_data = {'platform': platform, 'url': url, 'is_primary': is_primary}
-                    if link_id:
-                        SocialMediaLink.objects.filter(id=int(link_id), profile=profile).update(**link_data)
-                    else:
-                        SocialMediaLink.objects.create(profile=profile, **link_data)
-
-            # Verification logic
-            has_social_link = SocialMediaLink.objects.filter(profile=updated_profile).exists()
-            if updated_profile.location_verified and has_social_link:
-                updated_profile.is_verified_artisan = True
-                if not updated_profile.google_maps_link:
-                    query = f"{updated_profile.street_address}, {updated_profile.city}, {updated_profile.state}, Nigeria"
-                    encoded_query = urllib.parse.quote_plus(query)
-                    updated_profile.google_maps_link = f"https://www.google.com/maps/search/?api=1&query={encoded_query}"
-            else:
-                updated_profile.is_verified_artisan = False
-            updated_profile.save()
-
-            Notification.objects.create(
-                recipient=request.user,
-                message=_("Your profile was updated successfully.")
-            )
+            # The profile, its links and the welcome email commit together
+            with transaction.atomic():
+                updated_profile = form.save(commit=False)
+                social_links = _save_social_links(updated_profile, request.POST)
+
+                # Verification logic
+                if updated_profile.location_verified and social_links:
+                    updated_profile.is_verified_artisan = True
+                    if not updated_profile.google_maps_link:
+                        query = f"{updated_profile.street_address}, {updated_profile.city}, {updated_profile.state}, Nigeria"
+                        encoded_query = urllib.parse.quote_plus(query)
+                        updated_profile.google_maps_link = f"https://www.google.com/maps/search/?api=1&query={encoded_query}"
+                else:
+                    updated_profile.is_verified_artisan = False
+                updated_profile.save()
+
+                Notification.objects.create(
+                    recipient=request.user,
+                    message=_("Your profile was updated successfully.")
+                )
 
-            if updated_profile.is_verified_artisan and not was_verified_before:
-                messages.success(request, _('Congratulations! You are now a Kiri.ng Verified Artisan.'))
-                send_welcome_artisan_email(request.user, updated_profile)
-            else:
-                messages.success(request, _('Your profile has been updated successfully!'))
+                if updated_profile.is_verified_artisan and not was_verified_before:
+                    messages.success(request, _('Congratulations! You are now a Kiri.ng Verified Artisan.'))
+                    send_welcome_artisan_email(request.user, updated_profile)
+                else:
+                    messages.success(request, _('Your profile has been updated successfully!'))
             return redirect('users:profile-detail')
     else:
         form = ProfileUpdateForm(instance=profile)
@@ -179,21 +194,14 @@ def verify_location_view(request):
             data = json.loads(request.body)
             latitude, longitude = data.get('latitude'), data.get('longitude')
             if latitude is not None and longitude is not None:
-                url = f"https://nominatim.openstreetmap.org/reverse?format=json&lat={latitude}&lon={longitude}&zoom=18"
-                response = requests.get(url, headers={'User-Agent': 'Kiri.ng/1.0'})
-                response.raise_for_status()
-                address_data = response.json().get('address', {})
-
-                city = (
-                    address_data.get('city') or address_data.get('village') or
-                    address_data.get('county') or address_data.get('town') or
-                    address_data.get('locality') or address_data.get('municipality') or
-                    address_data.get('district') or address_data.get('suburb') or ''
-                )
-                state = (
-                    address_data.get('state') or address_data.get('region') or
-                    address_data.get('state_district') or ''
-                )
+                latitude, longitude = float(latitude), float(longitude)
+                if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                    return JsonResponse({'status': 'error', 'message': 'Invalid coordinates.'}, status=400)
+
+                place = reverse_geocode(latitude, longitude)
+                if place is None:
+                    return JsonResponse({'status': 'error', 'message': 'Location lookup is busy. Please try again in a moment.'}, status=503)
+                city, state = place.city, place.state
 
                 profile.city, profile.state = city, state
                 profile.verified_city, profile.verified_state = city, state
@@ -213,23 +221,57 @@ class ArtisanStorefrontView(generic.DetailView):
     context_object_name = 'artisan'
     slug_field = 'username'
     slug_url_kwarg = 'username'
-    
+
+    def get_queryset(self):
+        return User.objects.select_related('profile')
+
     def get_context_data(self, **kwargs):
+        """
+        Sections are lazy querysets, each run at most once and only when its
+        cached fragment (keyed on storefront_version) has to be re-rendered.
+        """
         context = super().get_context_data(**kwargs)
-        artisan = self.get_object()
-        
-        pathways_qs = LearningPathway.objects.filter(
-            user=artisan
-        ).prefetch_related('modules').annotate(
-            total_modules=Count('modules'),
-            incomplete_modules=Count('modules', filter=Q(modules__is_completed=False))
-        )
-        
-        context['completed_pathways'] = pathways_qs.filter(total_modules__gt=0, incomplete_modules=0)
-        
+        artisan = self.object
+        is_owner = self.request.user.pk == artisan.pk
+
+        services = Service.objects.filter(artisan=artisan)
+        if is_owner:
+            services = services.annotate(booking_count=Count('bookings'))
+
+        context.update({
+            'is_owner': is_owner,
+            'storefront_version': get_storefront_version(artisan.pk),
+            'fragment_timeout': STOREFRONT_FRAGMENT_TIMEOUT,
+            'social_links': SocialMediaLink.objects.filter(profile__user=artisan),
+            'certificates': Certificate.objects.filter(profile__user=artisan),
+            'completed_pathways': LearningPathway.objects.filter(user=artisan).select_related('category').annotate(
+                total_modules=Count('modules'),
+                incomplete_modules=Count('modules', filter=Q(modules__is_completed=False)),
+            ).filter(total_modules__gt=0, incomplete_modules=0),
+            'services': services,
+        })
         return context
 
 
+class ReferralLeaderboardView(generic.ListView):
+    """Top referrers, read from the table `manage.py refresh_referral_leaderboard` rebuilds"""
+    template_name = 'users/referral_leaderboard.html'
+    context_object_name = 'entries'
+    paginate_by = 25
+
+    def get_queryset(self):
+        return ReferralLeaderboardEntry.objects.select_related('user')
+
+
+@login_required
+def referral_network_view(request):
+    tree = referral_tree(request.user)
+    return render(request, 'users/referral_network.html', {
+        'tree': tree,
+        'max_depth': settings.REFERRAL_TREE_MAX_DEPTH,
+    })
+
+
 def custom_logout(request):
     logout(request)
     messages.success(request, _("You have been successfully logged out."))